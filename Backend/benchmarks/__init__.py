@@ -0,0 +1 @@
+# Standalone benchmarks; run from Backend/ with `python -m benchmarks.<name>`.
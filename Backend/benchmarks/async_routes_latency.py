@@ -0,0 +1,96 @@
+"""
+p99 latency of /styles while a slow /pieces/search/{query} is in flight.
+
+"before" reproduces the old data path (blocking pymongo calls inside async
+handlers), "after" uses an awaitable DAO like AsyncMusicalPieceDAO. The slow
+query is simulated so the benchmark runs without a Mongo server:
+
+    python -m benchmarks.async_routes_latency
+"""
+
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from src.database.pagination import Page
+from src.routes import routes
+
+SLOW_QUERY_SECONDS = 0.5
+STYLES_REQUESTS = 50
+
+
+class BlockingDAO:
+    """Old behaviour: a synchronous driver call made from an async handler."""
+
+    async def search_pieces_page(self, query: str, **page) -> Page:
+        time.sleep(SLOW_QUERY_SECONDS)
+        return Page(items=[])
+
+    async def get_all_styles(self) -> list[str]:
+        time.sleep(0.001)
+        return ["Baroque", "Romantic"]
+
+
+class AwaitingDAO:
+    """New behaviour: the driver call yields to the event loop while waiting."""
+
+    async def search_pieces_page(self, query: str, **page) -> Page:
+        await asyncio.sleep(SLOW_QUERY_SECONDS)
+        return Page(items=[])
+
+    async def get_all_styles(self) -> list[str]:
+        await asyncio.sleep(0.001)
+        return ["Baroque", "Romantic"]
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+async def _measure(dao) -> list[float]:
+    routes.piece_dao = dao
+    app = FastAPI()
+    app.include_router(routes.router)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def timed_styles(offset: float) -> float:
+            # Requests arrive at a steady rate; latency is measured from the
+            # scheduled arrival so time spent queued behind the loop counts.
+            start = origin + offset
+            await asyncio.sleep(max(0.0, start - time.perf_counter()))
+            response = await client.get("/styles")
+            response.raise_for_status()
+            return time.perf_counter() - start
+
+        origin = time.perf_counter()
+        slow = asyncio.create_task(client.get("/pieces/search/bach"))
+        spacing = SLOW_QUERY_SECONDS / STYLES_REQUESTS
+        latencies = await asyncio.gather(
+            *(timed_styles(i * spacing) for i in range(STYLES_REQUESTS))
+        )
+        await slow
+    return list(latencies)
+
+
+def main() -> None:
+    original = routes.piece_dao
+    try:
+        for label, dao in (("before", BlockingDAO()), ("after", AwaitingDAO())):
+            latencies = asyncio.run(_measure(dao))
+            print(
+                f"{label:>6}: /styles p50={statistics.median(latencies) * 1000:.1f}ms "
+                f"p99={_percentile(latencies, 99) * 1000:.1f}ms "
+                f"(slow search {SLOW_QUERY_SECONDS * 1000:.0f}ms in flight)"
+            )
+    finally:
+        routes.piece_dao = original
+
+
+if __name__ == "__main__":
+    main()
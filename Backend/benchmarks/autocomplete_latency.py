@@ -0,0 +1,87 @@
+"""
+Autocomplete lookups against a synthetic 100k-piece catalog, compared with
+the per-keystroke regex scan the search box used to trigger. An autocomplete
+lookup should stay under TARGET_SECONDS:
+
+    python -m benchmarks.autocomplete_latency
+"""
+
+import random
+import statistics
+import sys
+import time
+
+from benchmarks.search_latency import regex_scan
+from src.search.autocomplete import AutocompleteIndex
+
+CATALOG_SIZE = 100_000
+TARGET_SECONDS = 0.001
+KEYSTROKES = ["c", "ch", "cho", "chop", "s", "so", "son", "sona", "dv", "ba", "pièc", "vio"]
+
+SYLLABLES = ["ba", "cho", "so", "na", "ta", "dvo", "rak", "pin", "li", "szt", "mo", "zart", "vio", "lin"]
+STYLES = ["Baroque", "Classical", "Romantic", "Modern", "Renaissance", "Folk"]
+INSTRUMENTS = ["Piano", "Violin", "Organ", "Guitar", "Piano/Violin", "Voice, Piano", "Cello"]
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))).capitalize()
+
+
+def synthetic_catalog(size: int, seed: int = 11) -> list[dict]:
+    rng = random.Random(seed)
+    composers = [f"{_word(rng)} {_word(rng)}" for _ in range(size // 20)]
+    return [
+        {
+            "_id": i,
+            "title": " ".join(_word(rng) for _ in range(rng.randint(2, 5))),
+            "composer": rng.choice(composers),
+            "style": rng.choice(STYLES),
+            "instruments": rng.choice(INSTRUMENTS),
+        }
+        for i in range(size)
+    ]
+
+
+def _report(label: str, samples: list[float]) -> float:
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, round(0.99 * (len(ordered) - 1)))]
+    print(
+        f"{label:>12}: p50={statistics.median(samples) * 1000:.3f}ms "
+        f"p99={p99 * 1000:.3f}ms"
+    )
+    return p99
+
+
+def _timings(func, rounds: int) -> list[float]:
+    samples = []
+    for _ in range(rounds):
+        for keystroke in KEYSTROKES:
+            start = time.perf_counter()
+            func(keystroke)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main() -> None:
+    docs = synthetic_catalog(CATALOG_SIZE)
+    index = AutocompleteIndex()
+    start = time.perf_counter()
+    index.rebuild(docs)
+    elapsed = (time.perf_counter() - start) * 1000
+    keys = sum(len(prefix._keys) for prefix in index.fields.values())
+    key_bytes = sum(
+        sys.getsizeof(key) for prefix in index.fields.values() for key in prefix._keys
+    )
+    print(
+        f"built over {len(docs)} docs in {elapsed:.0f}ms: "
+        f"{keys} keys, ~{key_bytes / 2**20:.1f}MiB of key strings"
+    )
+
+    _report("regex scan", _timings(lambda q: regex_scan(docs, q), rounds=1))
+    p99 = _report("autocomplete", _timings(lambda q: index.suggest(q, limit=10), rounds=200))
+    verdict = "ok" if p99 < TARGET_SECONDS else "over target"
+    print(f"target {TARGET_SECONDS * 1000:.0f}ms per lookup: {verdict}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Misspelled-composer lookups in a FuzzyMatcher over 5k random names plus the
+real composers. A lookup should stay under TARGET_SECONDS:
+
+    python -m benchmarks.fuzzy_latency
+"""
+
+import random
+import statistics
+import time
+
+from src.search.fuzzy import FuzzyMatcher
+
+CATALOG_SIZE = 5_000
+TARGET_SECONDS = 0.005
+COMPOSERS = [
+    "Frédéric Chopin (1810-1849)",
+    "Ludwig van Beethoven",
+    "Pyotr Ilyich Tchaikovsky",
+    "Johann Sebastian Bach",
+    "Antonín Dvořák",
+]
+QUERIES = ["Shopin", "Bethoven", "Tchaikovski", "Dvorak", "Bahc"]
+
+
+def synthetic_names(size: int, seed: int = 3) -> list[str]:
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return [
+        " ".join("".join(rng.choices(letters, k=rng.randint(4, 10))) for _ in range(3))
+        for _ in range(size)
+    ]
+
+
+def main() -> None:
+    matcher = FuzzyMatcher()
+    matcher.rebuild(synthetic_names(CATALOG_SIZE) + COMPOSERS)
+
+    samples = []
+    for _ in range(20):
+        for query in QUERIES:
+            start = time.perf_counter()
+            matcher.resolve(query)
+            samples.append(time.perf_counter() - start)
+    per_lookup = statistics.mean(samples)
+    verdict = "ok" if per_lookup < TARGET_SECONDS else "over target"
+    print(
+        f"{len(matcher)} names: {per_lookup * 1000:.3f}ms/lookup "
+        f"(p50 {statistics.median(samples) * 1000:.3f}ms, "
+        f"target {TARGET_SECONDS * 1000:.0f}ms: {verdict})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Time to first line and peak memory of `GET /pieces?stream=1` vs. building
+the whole list page, over a generated 10k-document cursor (no Mongo server
+needed):
+
+    python -m benchmarks.ndjson_streaming
+"""
+
+import asyncio
+import time
+import tracemalloc
+
+from fastapi import Request, Response
+
+from src.database.musical_piece_dao import AsyncMusicalPieceDAO
+from src.routes import routes
+
+DOCUMENTS = 10_000
+
+
+class GeneratedCursor:
+    """Documents made on demand, like a driver cursor over a big collection."""
+
+    def __init__(self, count: int):
+        self._ids = iter(range(count))
+
+    def sort(self, *_args):
+        return self
+
+    def limit(self, *_args):
+        return self
+
+    def batch_size(self, *_args):
+        return self
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        try:
+            i = next(self._ids)
+        except StopIteration:
+            raise StopAsyncIteration
+        return {
+            "_id": i,
+            "title": f"Piece {i}",
+            "composer": "Anonymous",
+            "notes": [{"time": f"0:{n}:0", "note": "C4"} for n in range(4)],
+        }
+
+
+class GeneratedCollection:
+    def find(self, *_args):
+        return GeneratedCursor(DOCUMENTS)
+
+
+class GeneratedDatabase:
+    async_pieces_collection = GeneratedCollection()
+    pieces_collection = None
+
+
+def _ndjson_request() -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/pieces",
+            "query_string": b"",
+            "headers": [(b"accept", b"application/x-ndjson")],
+        }
+    )
+
+
+async def _stream() -> tuple[float, float]:
+    start = time.perf_counter()
+    response = await routes.get_all_pieces(_ndjson_request(), Response(), stream=True)
+    first_line = None
+    async for _line in response.body_iterator:
+        if first_line is None:
+            first_line = time.perf_counter() - start
+    return first_line, time.perf_counter() - start
+
+
+def _peak(run) -> int:
+    tracemalloc.start()
+    try:
+        asyncio.run(run())
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main() -> None:
+    original = routes.piece_dao
+    routes.piece_dao = dao = AsyncMusicalPieceDAO(GeneratedDatabase())
+    try:
+        first_line, total = asyncio.run(_stream())
+        stream_peak = _peak(_stream)
+        list_peak = _peak(dao.get_all_pieces_page)
+    finally:
+        routes.piece_dao = original
+    print(
+        f"stream: first line {first_line * 1000:.1f}ms of {total * 1000:.0f}ms "
+        f"({DOCUMENTS} documents)"
+    )
+    print(
+        f"memory: stream peak {stream_peak / 1024:.0f} KiB, "
+        f"list page peak {list_peak / 1024:.0f} KiB"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Size and decode speed of stored notes: JSON text, the BSON array Mongo
+stored before, and the packed binary encoding from src.utils.notes_codec:
+
+    python -m benchmarks.notes_encoding
+"""
+
+import json
+import random
+import time
+
+import bson
+
+from src.utils.notes_codec import decode_notes, encode_notes
+
+EVENTS = 600
+ROUNDS = 200
+
+PITCHES = ["C4", "D4", "E4", "F4", "G4", "A4", "B4", "C5", "E3", "G3", "C3"]
+DURATIONS = ["4n", "8n", "16n", "2n", "8n."]
+
+
+def synthetic_notes(size: int, seed: int = 5) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "time": f"{i // 16}:{(i // 4) % 4}:{i % 4}",
+            "note": rng.choice(PITCHES),
+            "duration": rng.choice(DURATIONS),
+            "velocity": rng.choice([0.6, 0.7, 0.8, 0.9]),
+        }
+        for i in range(size)
+    ]
+
+
+def _best(func) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    notes = synthetic_notes(EVENTS)
+    as_json = json.dumps(notes).encode()
+    as_bson = bson.encode({"notes": notes})
+    packed = encode_notes(notes)
+    as_packed_bson = bson.encode({"notes": packed})
+    assert decode_notes(packed) == notes
+
+    print(f"{EVENTS} events")
+    print(f"{'json':>12}: {len(as_json):>7} bytes")
+    print(f"{'bson array':>12}: {len(as_bson):>7} bytes")
+    print(f"{'packed':>12}: {len(as_packed_bson):>7} bytes (as a BSON binary field)")
+
+    timings = {
+        "json": _best(lambda: json.loads(as_json)),
+        "bson array": _best(lambda: bson.decode(as_bson)),
+        "packed": _best(lambda: decode_notes(bson.decode(as_packed_bson)["notes"])),
+    }
+    for label, seconds in timings.items():
+        print(f"{label:>12}: decode {seconds * 1e6:8.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Piece page and piece list parsing with each installed parser backend over
+the saved pages in `benchmarks/fixtures/mutopia/`, asserting every backend
+builds the same MusicalPiece objects as html.parser. The piece list is
+scaled up to the size of Mutopia's (~2,100 rows). Then the pages are parsed
+in the crawler's process pool:
+
+    python -m benchmarks.parser_backends
+"""
+
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import src.config as config
+from src.scrapping import parsers
+
+FIXTURES = Path(__file__).parent / "fixtures" / "mutopia"
+PAGES = [page.read_bytes() for page in sorted(FIXTURES.glob("piece-[0-9]*.html"))]
+URL = "https://www.mutopiaproject.org/cgibin/piece-info.cgi?id=1"
+ROUNDS = 300
+LISTING_ROWS = 2_100
+POOLED_PAGES = 1_200
+
+
+def large_listing() -> bytes:
+    """piece-list.html with its table rows repeated under fresh piece ids."""
+    html = (FIXTURES / "piece-list.html").read_text()
+    row = re.search(r"\s*<tr>.*?</tr>", html).group(0)
+    rows = "".join(
+        re.sub(r"id=\d+\">\d+<", f'id={n}">{n}<', row).replace("Piece 1", f"Piece {n}")
+        for n in range(1, LISTING_ROWS + 1)
+    )
+    return re.sub(r"(\s*<tr>.*</tr>)", rows, html, flags=re.S).encode()
+
+
+def _timed(func, *args, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(*args)
+    return result, (time.perf_counter() - start) / repeat
+
+
+def parse_pages(backend: str) -> list:
+    return [parsers.parse_piece_page(URL, page, backend) for page in PAGES]
+
+
+def parse_pooled(backend: str, workers: int) -> float:
+    pages = [PAGES[n % len(PAGES)] for n in range(POOLED_PAGES)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(parsers.parse_piece_page, [URL] * 4, pages[:4], [backend] * 4))
+        start = time.perf_counter()
+        list(
+            pool.map(
+                parsers.parse_piece_page,
+                [URL] * len(pages),
+                pages,
+                [backend] * len(pages),
+                chunksize=16,
+            )
+        )
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    listing = large_listing()
+    backends = parsers.available_backends()
+    expected_pieces = parse_pages("html.parser")
+    expected_urls = parsers.parse_piece_list_page(listing, URL)
+    assert len(expected_urls) == LISTING_ROWS
+
+    print(f"{len(PAGES)} fixture pages x {ROUNDS}, piece list of {LISTING_ROWS} rows")
+    timings = {}
+    for backend in backends:
+        pieces, page_s = _timed(parse_pages, backend, repeat=ROUNDS)
+        urls, list_s = _timed(parsers.parse_piece_list_page, listing, URL, backend, repeat=3)
+        assert pieces == expected_pieces, f"{backend}: pieces differ from html.parser"
+        assert urls == expected_urls, f"{backend}: piece list differs from html.parser"
+        timings[backend] = page_s / len(PAGES)
+        print(
+            f"  {backend:<12} {timings[backend] * 1000:6.2f} ms/page   "
+            f"piece list {list_s * 1000:7.1f} ms"
+        )
+    missing = set(parsers.PARSER_BACKENDS) - set(backends)
+    if missing:
+        print(f"  not installed: {', '.join(sorted(missing))}")
+    print("  identical MusicalPiece output across backends")
+
+    workers = config.SCRAPPING_PARSE_WORKERS
+    print(f"{POOLED_PAGES} pages, in-process vs a pool of {workers} processes")
+    for backend in dict.fromkeys([parsers.resolve_backend("auto"), "html.parser"]):
+        sequential = timings[backend] * POOLED_PAGES
+        pooled = parse_pooled(backend, workers)
+        print(f"  {backend:<12} {sequential:6.2f}s  vs  {pooled:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
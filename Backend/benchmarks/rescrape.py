@@ -0,0 +1,72 @@
+"""
+Re-scraping an unchanged catalog: full crawl vs. the incremental modes,
+against the local Mutopia stand-in of `benchmarks.scrape_throughput`:
+
+    python -m benchmarks.rescrape
+"""
+
+import asyncio
+import contextlib
+import io
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+from benchmarks.scrape_throughput import (
+    CONCURRENCY,
+    LATENCY,
+    PIECES,
+    RATE_PER_HOST,
+    CollectingDAO,
+    MutopiaStandIn,
+)
+from src.database.bulk_writer import PieceBulkWriter
+from src.scrapping import mutopia
+from src.scrapping.crawler import Crawler
+from src.scrapping.incremental import KnownPieces
+
+
+def scrape(list_url: str, mode: str, known: KnownPieces | None = None):
+    dao = CollectingDAO()
+
+    async def _run() -> dict:
+        async with Crawler(
+            concurrency=CONCURRENCY, rate_per_host=RATE_PER_HOST
+        ) as crawler:
+            return await mutopia.crawl(
+                crawler=crawler,
+                piece_list_url=list_url,
+                writer=PieceBulkWriter(dao),
+                enrich=lambda piece: None,
+                mode=mode,
+                known=known,
+            )
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        stats = asyncio.run(_run())
+    return dao, stats, time.perf_counter() - start
+
+
+def main() -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MutopiaStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    list_url = f"http://127.0.0.1:{server.server_port}/piece-list.html"
+    try:
+        dao, _, full_s = scrape(list_url, "full")
+        known = KnownPieces(piece.model_dump() for piece in dao.pieces)
+        _, new_stats, new_s = scrape(list_url, "new", known)
+        _, changed_stats, changed_s = scrape(list_url, "changed", known)
+    finally:
+        server.shutdown()
+
+    assert new_stats["known"] == PIECES and new_stats["inserted"] == 0
+    assert changed_stats["unchanged"] == PIECES and changed_stats["inserted"] == 0
+    print(f"{PIECES} unchanged pages, {LATENCY * 1000:.0f}ms simulated latency")
+    print(f"  full:    {full_s:.2f}s (every page fetched, parsed and written)")
+    print(f"  changed: {changed_s:.2f}s (conditional GETs, all 304)")
+    print(f"  new:     {new_s:.2f}s (piece-list.html only)")
+
+
+if __name__ == "__main__":
+    main()
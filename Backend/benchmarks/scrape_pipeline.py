@@ -0,0 +1,77 @@
+"""
+Crawl pipeline with a slow enrich stage (a stand-in for the Pexels lookup),
+against the local Mutopia stand-in of `benchmarks.scrape_throughput`. Prints
+the per-stage report for one and for the default number of enrich workers:
+
+    python -m benchmarks.scrape_pipeline
+"""
+
+import asyncio
+import contextlib
+import io
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import src.config as config
+from benchmarks.scrape_throughput import (
+    CONCURRENCY,
+    PIECES,
+    RATE_PER_HOST,
+    CollectingDAO,
+    MutopiaStandIn,
+)
+from src.database.bulk_writer import PieceBulkWriter
+from src.scrapping import mutopia
+from src.scrapping.crawler import Crawler
+from src.scrapping.progress import CrawlProgress
+
+IMAGE_LOOKUP = 0.2
+
+
+def slow_enrich(piece) -> None:
+    time.sleep(IMAGE_LOOKUP)
+
+
+def scrape(list_url: str, enrich_workers: int) -> tuple[CrawlProgress, float]:
+    progress = CrawlProgress()
+
+    async def _run() -> None:
+        async with Crawler(
+            concurrency=CONCURRENCY, rate_per_host=RATE_PER_HOST
+        ) as crawler:
+            await mutopia.crawl(
+                crawler=crawler,
+                piece_list_url=list_url,
+                writer=PieceBulkWriter(CollectingDAO()),
+                enrich=slow_enrich,
+                progress=progress,
+                enrich_workers=enrich_workers,
+            )
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(_run())
+    return progress, time.perf_counter() - start
+
+
+def main() -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MutopiaStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    list_url = f"http://127.0.0.1:{server.server_port}/piece-list.html"
+    try:
+        runs = [
+            (workers, *scrape(list_url, workers))
+            for workers in (1, config.SCRAPPING_ENRICH_WORKERS)
+        ]
+    finally:
+        server.shutdown()
+
+    print(f"{PIECES} pages, {IMAGE_LOOKUP * 1000:.0f}ms image lookup per piece")
+    for workers, progress, seconds in runs:
+        print(f"\nenrich workers: {workers}, {seconds:.2f}s")
+        mutopia._print_stages(progress.stage_report())
+
+
+if __name__ == "__main__":
+    main()
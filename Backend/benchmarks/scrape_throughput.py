@@ -0,0 +1,153 @@
+"""
+Sequential `requests` scrape loop vs. the asyncio crawler against a local
+HTTP stand-in for mutopiaproject.org. The stand-in serves the pages in
+`benchmarks/fixtures/mutopia/` (modeled on Mutopia's piece-info markup) with
+an artificial per-request latency, cycling them under many piece ids:
+
+    python -m benchmarks.scrape_throughput
+"""
+
+import asyncio
+import contextlib
+import io
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+import src.config as config
+from src.database.bulk_writer import BulkWriteReport, PieceBulkWriter
+from src.scrapping import mutopia
+from src.scrapping.crawler import Crawler
+
+PIECES = 200
+LATENCY = 0.05
+RATE_PER_HOST = 100.0
+CONCURRENCY = 8
+
+FIXTURES = Path(__file__).parent / "fixtures" / "mutopia"
+PAGES = sorted(FIXTURES.glob("piece-[0-9]*.html"))
+
+
+def piece_list(count: int) -> bytes:
+    rows = "".join(
+        f'<tr><td><a href="cgibin/piece-info.cgi?id={n}">{n}</a></td></tr>'
+        for n in range(1, count + 1)
+    )
+    return f"<html><body><table>{rows}</table></body></html>".encode()
+
+
+class MutopiaStandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real site
+    listing = piece_list(PIECES)
+    pages = [page.read_bytes() for page in PAGES]
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        if url.path == "/piece-list.html":
+            body = self.listing
+        elif url.path == "/cgibin/piece-info.cgi":
+            piece_id = int(parse_qs(url.query)["id"][0])
+            body = self.pages[(piece_id - 1) % len(self.pages)]
+        else:
+            self.send_error(404)
+            return
+        time.sleep(LATENCY)
+        etag = f'"{hash(body):x}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        return None
+
+
+def sequential_scrape(list_url: str) -> list:
+    """The previous loop (without its sleep between pages)."""
+    session = requests.Session()
+    resp = session.get(list_url, timeout=20)
+    urls = mutopia.parse_piece_list(mutopia._make_soup(resp), base_url=list_url)
+    pieces = []
+    for url in urls:
+        resp = session.get(url, timeout=20)
+        resp.raise_for_status()
+        pieces.append(mutopia.extract_piece_metadata(url, soup=mutopia._make_soup(resp)))
+    return pieces
+
+
+class CollectingDAO:
+    def __init__(self) -> None:
+        self.pieces: list = []
+
+    def upsert_pieces(self, pieces: list) -> BulkWriteReport:
+        self.pieces.extend(pieces)
+        return BulkWriteReport(inserted=len(pieces))
+
+
+def concurrent_scrape(list_url: str) -> list:
+    dao = CollectingDAO()
+
+    async def _run() -> None:
+        async with Crawler(
+            concurrency=CONCURRENCY, rate_per_host=RATE_PER_HOST
+        ) as crawler:
+            await mutopia.crawl(
+                crawler=crawler,
+                piece_list_url=list_url,
+                writer=PieceBulkWriter(dao),
+                enrich=lambda piece: None,
+            )
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(_run())
+    return dao.pieces
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MutopiaStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    list_url = f"http://127.0.0.1:{server.server_port}/piece-list.html"
+    try:
+        before, before_s = _timed(sequential_scrape, list_url)
+        after, after_s = _timed(concurrent_scrape, list_url)
+    finally:
+        server.shutdown()
+
+    key = lambda piece: piece.music_id_number + piece.pdf_url  # noqa: E731
+    assert sorted(map(key, before)) == sorted(map(key, after)), "pieces differ"
+    sleeps = PIECES * 1.0
+    print(f"{PIECES} pages, {LATENCY * 1000:.0f}ms simulated latency")
+    print(
+        f"  sequential: {before_s:.2f}s ({PIECES / before_s:.1f} pages/s, "
+        f"+{sleeps:.0f}s with the old 1s delay)"
+    )
+    print(
+        f"  crawler:    {after_s:.2f}s ({PIECES / after_s:.1f} pages/s, "
+        f"{CONCURRENCY} workers, {RATE_PER_HOST:.0f} req/s per host)"
+    )
+    print(f"  speedup:    {before_s / after_s:.1f}x")
+    print(
+        f"  at config.SCRAPPING_RATE_PER_HOST={config.SCRAPPING_RATE_PER_HOST:g} "
+        f"the crawl is rate-bound at ~{PIECES / config.SCRAPPING_RATE_PER_HOST:.0f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
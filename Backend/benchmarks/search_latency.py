@@ -0,0 +1,76 @@
+"""
+Ranked SearchIndex vs. the previous unanchored regex scan on a synthetic
+20k-document catalog. The regex side evaluates the same four-field `$or`
+per document that Mongo ran as a collection scan:
+
+    python -m benchmarks.search_latency
+"""
+
+import random
+import re
+import statistics
+import time
+
+from src.search.search_index import SearchIndex
+
+CORPUS_SIZE = 20_000
+QUERIES = ["dvorak", "nocturne", "sonata piano", "bach", "pièces", "romantic waltz", "fug"]
+
+COMPOSERS = ["Bach", "Beethoven", "Chopin", "Dvořák", "Satie", "Händel", "Mozart", "Liszt"]
+FORMS = ["Sonata", "Nocturne", "Waltz", "Fugue", "Prelude", "Étude", "Pièces", "Dance"]
+STYLES = ["Baroque", "Classical", "Romantic", "Modern"]
+INSTRUMENTS = ["Piano", "Violin", "Organ", "Guitar", "Piano/Violin", "Voice, Piano"]
+
+
+def synthetic_corpus(size: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "_id": i,
+            "title": f"{rng.choice(FORMS)} No. {rng.randint(1, 40)} in {rng.choice('ABCDEFG')}",
+            "composer": rng.choice(COMPOSERS),
+            "style": rng.choice(STYLES),
+            "instruments": rng.choice(INSTRUMENTS),
+        }
+        for i in range(size)
+    ]
+
+
+def regex_scan(docs: list[dict], query: str) -> list[dict]:
+    matcher = re.compile(re.escape(query), re.IGNORECASE)
+    fields = ("title", "composer", "style", "instruments")
+    return [doc for doc in docs if any(matcher.search(doc.get(f) or "") for f in fields)]
+
+
+def _timings(func, rounds: int = 20) -> list[float]:
+    samples = []
+    for _ in range(rounds):
+        for query in QUERIES:
+            start = time.perf_counter()
+            func(query)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _report(label: str, samples: list[float]) -> None:
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, round(0.99 * (len(ordered) - 1)))]
+    print(
+        f"{label:>12}: p50={statistics.median(samples) * 1000:.2f}ms "
+        f"p99={p99 * 1000:.2f}ms"
+    )
+
+
+def main() -> None:
+    docs = synthetic_corpus(CORPUS_SIZE)
+    index = SearchIndex()
+    start = time.perf_counter()
+    index.rebuild(docs)
+    print(f"built index over {len(index)} docs in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    _report("regex scan", _timings(lambda q: regex_scan(docs, q), rounds=3))
+    _report("bm25 index", _timings(lambda q: index.search(q, limit=20)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Repository._serialize throughput on 10k stamped documents: full Pydantic
+validation (the previous read path) vs. the trusted-read dict shaping:
+
+    python -m benchmarks.serialize_throughput
+"""
+
+import time
+
+from bson import ObjectId
+
+from src.database.db_shared_repository import SCHEMA_VERSION, Repository
+from src.schemas.musical_piece import MusicalPiece
+
+DOCUMENTS = 10_000
+ROUNDS = 5
+
+
+def synthetic_documents(size: int) -> list[dict]:
+    notes = [{"time": f"0:{i}", "note": "C4", "duration": "8n"} for i in range(100)]
+    return [
+        {
+            "_id": ObjectId(),
+            "title": f"Prelude No. {i}",
+            "composer": "Johann Sebastian Bach",
+            "instruments": "Harpsichord, Piano",
+            "style": "Baroque",
+            "opus": f"BWV {800 + i}",
+            "date_of_composition": "1722",
+            "source": "Mutopia",
+            "copyright": "Public Domain",
+            "last_updated": "2020/01/01",
+            "music_id_number": f"Mutopia-2020/01/01-{i}",
+            "pdf_url": f"https://example.org/{i}.pdf",
+            "style_key": "baroque",
+            "instrument_keys": ["harpsichord", "piano"],
+            # One piece in ten has AI notes.
+            "notes": notes if i % 10 == 0 else None,
+            "schema_version": SCHEMA_VERSION,
+        }
+        for i in range(size)
+    ]
+
+
+def _throughput(label: str, serialize, docs: list[dict]) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for doc in docs:
+            serialize(doc)
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:>10}: {best * 1000:7.1f}ms for {len(docs)} docs ({len(docs) / best:,.0f} docs/s)")
+    return best
+
+
+def main() -> None:
+    docs = synthetic_documents(DOCUMENTS)
+    repo = Repository(collection=None, model_cls=MusicalPiece)
+    assert all(repo._serialize(doc) == repo._validate(doc) for doc in docs[:100])
+
+    validated = _throughput("validated", repo._validate, docs)
+    trusted = _throughput("trusted", repo._serialize, docs)
+    print(f"speedup: {validated / trusted:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
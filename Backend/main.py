@@ -1,9 +1,13 @@
 from contextlib import asynccontextmanager
+import logging
+import os
 
 from fastapi import FastAPI
+from pymongo.errors import PyMongoError
 import uvicorn
 
 from src.DI.container import get_container
+from src.database.indexes import ensure_indexes
 from src.routes import routes
 
 # FastAPI provides already a way to save instance and reuse (singleton) but we use also DI container for tests and more complex cases
@@ -14,10 +18,35 @@ async def lifespan(app: FastAPI):
     container = get_container()
     db = container.db
     app.state.db = db
+    try:
+        await ensure_indexes(db.async_pieces_collection)
+        await container.async_piece_dao.rebuild_catalog()
+    except PyMongoError as exc:
+        # Keep serving (e.g. /health) when Mongo is not reachable at boot;
+        # the in-memory catalog is then built lazily on first use.
+        logging.warning("Skipping catalog bootstrap, Mongo unavailable: %s", exc)
+    # Background note generation spends model budget, so it is opt-in.
+    pretranscription = None
+    if os.getenv("NOTES_PRETRANSCRIBE", "false").lower() == "true":
+        pretranscription = container.pretranscription
+        try:
+            await pretranscription.start()
+        except PyMongoError as exc:
+            logging.warning("Notes pre-transcription not started: %s", exc)
+    # Resumes scrape jobs orphaned by a previous process.
+    scrape_jobs = container.scrape_jobs
+    try:
+        await scrape_jobs.start()
+    except PyMongoError as exc:
+        logging.warning("Scrape job recovery not started: %s", exc)
     try:
         yield
     finally:
+        await scrape_jobs.stop()
+        if pretranscription is not None:
+            await pretranscription.stop()
         db.client.close()
+        await db.close_async()
 
 
 def create_app() -> FastAPI:
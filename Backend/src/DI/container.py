@@ -1,13 +1,58 @@
 from functools import lru_cache
 
+from src.ai_agent.cached_transcription import CachedTranscriber
+from src.ai_agent.notes_generation import NotesGenerator
+from src.ai_agent.pretranscription import PretranscriptionPool
+from src.database.ai_output_cache import AIOutputCache
 from src.database.database import Database
-from src.database.musical_piece_dao import MusicalPieceDAO
+from src.database.facet_cache import FacetCache
+from src.database.info_cache import InfoCache
+from src.database.musical_piece_dao import AsyncMusicalPieceDAO, MusicalPieceDAO
+from src.database.notes_jobs import NotesJobQueue
+from src.database.scrape_jobs import ScrapeJobStore
+from src.schemas.agent_output import AgentInfosOutput
+from src.schemas.composer_piece_info import ComposerPieceInfo
+from src.scrapping.jobs import ScrapeJobManager
+from src.search.catalog import CatalogIndex
 
 
 class Container:
     def __init__(self) -> None:
         self.db = Database()
-        self.piece_dao = MusicalPieceDAO(db=self.db)
+        # Shared by both DAOs (the facet cache too): the sync one (scraper) feeds it on insert,
+        # the async one (routes) queries it.
+        self.catalog = CatalogIndex()
+        self.facets = FacetCache()
+        self.piece_dao = MusicalPieceDAO(
+            db=self.db, catalog=self.catalog, facets=self.facets
+        )
+        self.async_piece_dao = AsyncMusicalPieceDAO(
+            db=self.db, catalog=self.catalog, facets=self.facets
+        )
+        # One generator for the notes route and the background workers, so
+        # they share in-flight transcriptions.
+        self.ai_cache = AIOutputCache(self.db.async_collection("ai_outputs"))
+        self.transcriber = CachedTranscriber(self.ai_cache)
+        self.notes_generator = NotesGenerator(
+            self.async_piece_dao, transcribe=self.transcriber
+        )
+        self.notes_jobs = NotesJobQueue(self.db.async_collection("notes_jobs"))
+        self.pretranscription = PretranscriptionPool(
+            self.async_piece_dao,
+            self.notes_jobs,
+            self.notes_generator,
+            cached_notes=self.transcriber.cached,
+        )
+        self.scrape_jobs = ScrapeJobManager(
+            ScrapeJobStore(self.db.async_collection("scrape_jobs")), self.piece_dao
+        )
+        info_collection = self.db.async_collection("agent_info_cache")
+        self.composer_info_cache = InfoCache(
+            info_collection, ComposerPieceInfo, namespace="composer"
+        )
+        self.piece_info_cache = InfoCache(
+            info_collection, AgentInfosOutput, namespace="piece"
+        )
 
 
 @lru_cache
@@ -21,3 +66,31 @@ def get_db() -> Database:
 
 def get_piece_dao() -> MusicalPieceDAO:
     return get_container().piece_dao
+
+
+def get_async_piece_dao() -> AsyncMusicalPieceDAO:
+    return get_container().async_piece_dao
+
+
+def get_notes_generator() -> NotesGenerator:
+    return get_container().notes_generator
+
+
+def get_pretranscription_pool() -> PretranscriptionPool:
+    return get_container().pretranscription
+
+
+def get_ai_cache() -> AIOutputCache:
+    return get_container().ai_cache
+
+
+def get_composer_info_cache() -> InfoCache[ComposerPieceInfo]:
+    return get_container().composer_info_cache
+
+
+def get_piece_info_cache() -> InfoCache[AgentInfosOutput]:
+    return get_container().piece_info_cache
+
+
+def get_scrape_job_manager() -> ScrapeJobManager:
+    return get_container().scrape_jobs
@@ -15,16 +15,16 @@ for env_name in (".env.local", ".env.docker", ".env"):
         break
 
 
-def _get_model_name() -> str:
+def get_model_name() -> str:
     return (os.getenv("PYDANTIC_AI_MODEL") or DEFAULT_MODEL).strip()
 
 
 @lru_cache
 def get_agent() -> Agent:
-    if _get_model_name().startswith("gateway/"):
+    if get_model_name().startswith("gateway/"):
         if os.getenv("PYDANTIC_AI_GATEWAY_API_KEY") is None:
             raise RuntimeError("Missing PYDANTIC_AI_GATEWAY_API_KEY for gateway model")
     else:
         if os.getenv("ANTHROPIC_API_KEY") is None:
             raise RuntimeError("Missing ANTHROPIC_API_KEY for Anthropic model")
-    return Agent(_get_model_name())
+    return Agent(get_model_name())
@@ -0,0 +1,113 @@
+"""
+PDF-to-notes transcription behind the content-addressed AI output cache.
+
+The PDF is streamed once to hash it (the digest is then remembered per URL);
+the model is only called when no entry exists for (PDF digest,
+PROMPT_VERSION, model name). Entries are stored under the model that
+actually answered, which is the fallback one when the configured model is
+refused, and looked up in the order the models would be tried.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+import httpx
+
+from src.ai_agent.agent_instance import get_model_name
+from src.ai_agent.notes_agent import FALLBACK_MODEL, PROMPT_VERSION, transcribe_pdf
+from src.database.ai_output_cache import AIOutputCache
+from src.utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+PDF_FETCH_TIMEOUT = 30.0
+# PDF digests remembered per URL, least recently used dropped first.
+DIGEST_MEMO_SIZE = 4096
+
+
+async def pdf_digest(pdf_url: str) -> str:
+    """sha256 of the document at `pdf_url`, hashed while it streams in."""
+    digest = hashlib.sha256()
+    async with httpx.AsyncClient(
+        timeout=PDF_FETCH_TIMEOUT, follow_redirects=True
+    ) as client:
+        async with client.stream("GET", pdf_url) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                digest.update(chunk)
+    return f"sha256-{digest.hexdigest()}"
+
+
+def model_preference() -> list[str]:
+    """Models a transcription may come from, in the order they are tried."""
+    return list(dict.fromkeys([get_model_name(), FALLBACK_MODEL]))
+
+
+class CachedTranscriber:
+    def __init__(
+        self,
+        cache: AIOutputCache,
+        transcribe: Callable[[Any, str], Awaitable[tuple[list[dict], str]]] = transcribe_pdf,
+        digest: Callable[[str], Awaitable[str]] = pdf_digest,
+        model_names: Callable[[], list[str]] = model_preference,
+        prompt_version: str = PROMPT_VERSION,
+        digest_memo_size: int = DIGEST_MEMO_SIZE,
+    ) -> None:
+        self.cache = cache
+        self.transcribe = transcribe
+        self.digest = digest
+        self.model_names = model_names
+        self.prompt_version = prompt_version
+        self.digest_memo_size = digest_memo_size
+        self._digests: OrderedDict[str, str] = OrderedDict()
+        self._digesting = SingleFlight()
+
+    async def pdf_digest(self, pdf_url: str) -> str:
+        """Digest of the PDF, downloaded once per URL."""
+        digest = self._digests.get(pdf_url)
+        if digest is None:
+            digest = await self._digesting.run(pdf_url, lambda: self.digest(pdf_url))
+            self._digests[pdf_url] = digest
+            if len(self._digests) > self.digest_memo_size:
+                self._digests.popitem(last=False)
+        self._digests.move_to_end(pdf_url)
+        return digest
+
+    async def cached(self, pdf_url: str) -> list[dict] | None:
+        """Cached notes for the PDF, without calling the model (None on a miss)."""
+        try:
+            digest = await self.pdf_digest(pdf_url)
+        except httpx.HTTPError as exc:
+            logger.warning("Could not hash %s: %s", pdf_url, exc)
+            return None
+        return await self.cache.get_first(self._keys(digest))
+
+    def _keys(self, digest: str) -> list[str]:
+        return [
+            self.cache.key(digest, self.prompt_version, model)
+            for model in self.model_names()
+        ]
+
+    async def __call__(self, agent: Any, pdf_url: str) -> list[dict]:
+        try:
+            digest = await self.pdf_digest(pdf_url)
+        except httpx.HTTPError as exc:
+            # The model fetches the URL itself; only the cache is skipped.
+            logger.warning("Could not hash %s, transcribing uncached: %s", pdf_url, exc)
+            notes, _model = await self.transcribe(agent, pdf_url)
+            return notes
+
+        notes = await self.cache.get_first(self._keys(digest))
+        if notes is not None:
+            return notes
+        notes, model = await self.transcribe(agent, pdf_url)
+        key = self.cache.key(digest, self.prompt_version, model)
+        await self.cache.put(key, notes, pdf_url=pdf_url)
+        return notes
+
+
+__all__ = ["CachedTranscriber", "model_preference", "pdf_digest"]
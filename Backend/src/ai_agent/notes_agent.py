@@ -1,11 +1,12 @@
+import hashlib
 import re
 from pydantic_ai import Agent, DocumentUrl
 from pydantic_ai.exceptions import ModelHTTPError
+from src.ai_agent.agent_instance import get_model_name
 from src.schemas.agent_output import AgentNotesOutput
 
 
-async def ai_pdf_to_notes(agent, pdf_url: str):
-    SYSTEM_PROMPT = """You are receiving a PDF music sheet document. 
+SYSTEM_PROMPT = """You are receiving a PDF music sheet document. 
     Your task is to read the music notes and generate a time based event json code compatible with Tone.js library.
     I will give an exemple:
     
@@ -37,12 +38,29 @@ async def ai_pdf_to_notes(agent, pdf_url: str):
 -If the tempo or time signature are not indicated, guess correctly the tempo or assume a default tempo of 90bpm and a 4/4 time signature.
     """
 
+# Cached model outputs are keyed by this, so editing the prompt invalidates them.
+PROMPT_VERSION = hashlib.sha256(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:12]
+
+
+# Used when the configured model is not permitted (403).
+FALLBACK_MODEL = "gateway/anthropic:claude-sonnet-4-5"
+
+
+def _model_name(agent) -> str:
+    model = getattr(agent, "model", None)
+    return model if isinstance(model, str) else get_model_name()
+
+
+async def transcribe_pdf(agent, pdf_url: str) -> tuple[list, str]:
+    """Notes read from the PDF, and the name of the model that actually read them."""
+    model = _model_name(agent)
     try:
         result = await agent.run([DocumentUrl(pdf_url)], instructions=SYSTEM_PROMPT)
     except ModelHTTPError as e:
         # If the configured model isn't permitted, retry once with a safer fallback.
         if getattr(e, "status_code", None) == 403:
-            fallback_agent = Agent("gateway/anthropic:claude-sonnet-4-5")
+            model = FALLBACK_MODEL
+            fallback_agent = Agent(FALLBACK_MODEL)
             result = await fallback_agent.run(
                 [DocumentUrl(pdf_url)], instructions=SYSTEM_PROMPT
             )
@@ -58,4 +76,9 @@ async def ai_pdf_to_notes(agent, pdf_url: str):
     cleaned_output = _strip_markdown_fence(result.output)
     # pydantic validation
     validated = AgentNotesOutput.model_validate({"notes": cleaned_output})
-    return validated.notes
+    return validated.notes, model
+
+
+async def ai_pdf_to_notes(agent, pdf_url: str):
+    notes, _model = await transcribe_pdf(agent, pdf_url)
+    return notes
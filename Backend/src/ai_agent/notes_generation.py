@@ -0,0 +1,79 @@
+"""
+Deduplicated AI note generation.
+
+Concurrent requests for the same piece in one process await a single
+transcription (SingleFlight). Across uvicorn workers a lease stored on the
+piece document decides who calls the model; the others poll until the notes
+are saved or the lease expires, in which case they try to take it over.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+import uuid
+from typing import Any, Awaitable, Callable
+
+import src.config as config
+from src.ai_agent.agent_instance import get_agent
+from src.ai_agent.notes_agent import ai_pdf_to_notes
+from src.utils.single_flight import SingleFlight
+
+
+class NotesGenerationPending(RuntimeError):
+    """Another worker still holds the lease after the wait timed out."""
+
+
+class NotesGenerator:
+    def __init__(
+        self,
+        piece_dao: Any,
+        transcribe: Callable[[Any, str], Awaitable[list[dict]]] = ai_pdf_to_notes,
+        agent_factory: Callable[[], Any] = get_agent,
+        lease_seconds: float = config.NOTES_LEASE_SECONDS,
+        poll_seconds: float = config.NOTES_POLL_SECONDS,
+    ) -> None:
+        self.piece_dao = piece_dao
+        self.transcribe = transcribe
+        self.agent_factory = agent_factory
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._flights = SingleFlight()
+
+    async def generate(self, piece_id: str, pdf_url: str) -> list[dict] | None:
+        """
+        Notes for the piece, transcribed at most once at a time. Returns
+        None if the piece disappears while waiting.
+        """
+        return await self._flights.run(
+            piece_id, lambda: self._generate(piece_id, pdf_url)
+        )
+
+    async def _generate(self, piece_id: str, pdf_url: str) -> list[dict] | None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lease_seconds
+        while True:
+            if await self.piece_dao.acquire_notes_lease(
+                piece_id, self.owner, self.lease_seconds
+            ):
+                try:
+                    notes = await self.transcribe(self.agent_factory(), pdf_url)
+                    await self.piece_dao.update_notes(piece_id, notes)
+                    return notes
+                finally:
+                    await self.piece_dao.release_notes_lease(piece_id, self.owner)
+
+            # Someone else is transcribing (or just finished).
+            piece = await self.piece_dao.get_piece_by_id(piece_id, fields=["notes"])
+            if piece is None:
+                return None
+            if piece.get("notes") is not None:
+                return piece["notes"]
+            if loop.time() >= deadline:
+                raise NotesGenerationPending(piece_id)
+            await asyncio.sleep(self.poll_seconds)
+
+
+__all__ = ["NotesGenerationPending", "NotesGenerator"]
@@ -0,0 +1,174 @@
+"""
+Background pre-transcription of notes for pieces that have none.
+
+A fixed number of asyncio workers claim jobs from `NotesJobQueue` (most
+popular first). Pieces that already have notes are skipped and PDFs already
+in the AI output cache are served from it; only the others wait for a token
+of the model budget, then go through the same `NotesGenerator` as the notes
+route, so a listener asking for a piece being pre-transcribed joins that
+call instead of starting another.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+from pymongo.errors import PyMongoError
+
+import src.config as config
+from src.ai_agent.notes_generation import NotesGenerator
+from src.database.notes_jobs import NotesJobQueue
+from src.utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+THROUGHPUT_WINDOW = 60.0
+
+# Pieces to pre-transcribe: no notes yet but a PDF to read them from.
+MISSING_NOTES = {"notes": None, "pdf_url": {"$type": "string"}}
+
+
+class PretranscriptionPool:
+    def __init__(
+        self,
+        piece_dao: Any,
+        jobs: NotesJobQueue,
+        generator: NotesGenerator,
+        workers: int = config.NOTES_WORKERS,
+        requests_per_minute: float = config.NOTES_REQUESTS_PER_MINUTE,
+        idle_seconds: float = config.NOTES_WORKER_IDLE_SECONDS,
+        cached_notes: Callable[[str], Awaitable[list[dict] | None]] | None = None,
+    ) -> None:
+        self.piece_dao = piece_dao
+        self.jobs = jobs
+        self.generator = generator
+        self.workers = workers
+        self.requests_per_minute = requests_per_minute
+        self.idle_seconds = idle_seconds
+        # Cached notes for a PDF URL, checked before spending a model token.
+        self.cached_notes = cached_notes
+        self.budget = TokenBucket.per_minute(requests_per_minute)
+        self._tasks: list[asyncio.Task] = []
+        self._finished: deque[float] = deque()
+        self.completed = 0
+        self.failed = 0
+        self.from_cache = 0
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        await self.jobs.ensure_indexes()
+        # Anything still running after a full lease belongs to a dead worker.
+        await self.jobs.requeue_stale(config.NOTES_LEASE_SECONDS)
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"notes-worker-{n}")
+            for n in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def seed(self) -> int:
+        """
+        Queue every piece without notes. Priority is the number of pieces of
+        its composer in the catalog, so the most represented composers come
+        first. Returns the number of new jobs.
+        """
+        facets = await self.piece_dao.get_facets()
+        popularity = {row["value"]: row["count"] for row in facets["composers"]}
+        created = 0
+        pieces = self.piece_dao.stream_all_pieces(
+            query=MISSING_NOTES, fields=["pdf_url", "composer"]
+        )
+        async for piece in pieces:
+            priority = popularity.get(piece.get("composer"), 0)
+            if await self.jobs.enqueue(piece["_id"], piece["pdf_url"], priority):
+                created += 1
+        return created
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                job = await self.jobs.claim(self.generator.owner)
+                if job is not None:
+                    await self._run(job)
+                    continue
+            except PyMongoError as exc:
+                # A claimed job whose outcome was not saved stays "running"
+                # until requeue_stale puts it back on the next start.
+                logger.warning("Notes worker could not reach the job queue: %s", exc)
+            await asyncio.sleep(self.idle_seconds)
+
+    async def _run(self, job: dict) -> None:
+        try:
+            piece = await self.piece_dao.get_piece_by_id(job["_id"], fields=["notes"])
+            if piece is None:
+                await self.jobs.fail(job, "piece not found", retry=False)
+                self._record(ok=False)
+                return
+            if piece.get("notes") is None:
+                await self._transcribe(job)
+            await self.jobs.complete(job["_id"])
+            self._record(ok=True)
+        except asyncio.CancelledError:
+            try:
+                await asyncio.shield(self.jobs.fail(job, "worker stopped"))
+            except PyMongoError as exc:
+                logger.warning("Could not requeue %s: %s", job["_id"], exc)
+            raise
+        except Exception as exc:
+            logger.warning("Pre-transcription of %s failed: %s", job["_id"], exc)
+            await self.jobs.fail(job, str(exc) or type(exc).__name__)
+            self._record(ok=False)
+
+    async def _transcribe(self, job: dict) -> None:
+        if self.cached_notes is not None:
+            notes = await self.cached_notes(job["pdf_url"])
+            if notes is not None:
+                await self.piece_dao.update_notes(job["_id"], notes)
+                self.from_cache += 1
+                return
+        await self.budget.acquire()
+        await self.generator.generate(job["_id"], job["pdf_url"])
+
+    def _record(self, ok: bool) -> None:
+        if not ok:
+            self.failed += 1
+            return
+        self.completed += 1
+        self._finished.append(time.monotonic())
+
+    def throughput(self) -> float:
+        """Jobs completed over the last minute."""
+        cutoff = time.monotonic() - THROUGHPUT_WINDOW
+        while self._finished and self._finished[0] < cutoff:
+            self._finished.popleft()
+        return float(len(self._finished))
+
+    async def stats(self) -> dict:
+        queue = await self.jobs.counts()
+        return {
+            "running": self.running,
+            "workers": self.workers,
+            "requests_per_minute": self.requests_per_minute,
+            "queue_depth": queue["queued"],
+            "jobs": queue,
+            "completed": self.completed,
+            "failed": self.failed,
+            "from_cache": self.from_cache,
+            "throughput_per_minute": self.throughput(),
+        }
+
+
+__all__ = ["MISSING_NOTES", "PretranscriptionPool"]
@@ -2,4 +2,35 @@ from __future__ import annotations
 
 
 MAX_PIECES = 20
-SCRAPPING_DELAY = 1.0
+# Crawler: parallel page fetches, requests per second per host, retries.
+SCRAPPING_CONCURRENCY = 8
+SCRAPPING_RATE_PER_HOST = 4.0
+SCRAPPING_RETRIES = 3
+SCRAPPING_BACKOFF = 0.5
+SCRAPPING_BATCH_SIZE = 100
+# Crawl pipeline (fetch -> parse -> enrich -> write): workers of the parse and
+# enrich stages (fetch uses SCRAPPING_CONCURRENCY) and room between stages.
+SCRAPPING_PARSE_WORKERS = 2
+SCRAPPING_ENRICH_WORKERS = 4
+SCRAPPING_QUEUE_SIZE = 16
+# "auto" (fastest installed), "selectolax", "lxml" or "html.parser"; the crawl
+# parses pages in a pool of SCRAPPING_PARSE_WORKERS processes.
+SCRAPPING_PARSER = "auto"
+# Default for /start-scrapping: "full", "new" or "changed" (see scrapping.incremental).
+SCRAPPING_MODE = "new"
+# Scrape jobs save their progress this often; a job without a heartbeat for
+# SCRAPE_JOB_STALE_SECONDS is taken to be orphaned and resumed.
+SCRAPE_JOB_CHECKPOINT_SECONDS = 5.0
+SCRAPE_JOB_STALE_SECONDS = 30.0
+MAX_PAGE_SIZE = 200
+STREAM_BATCH_SIZE = 500
+MAX_AUTOCOMPLETE = 50
+FACET_CACHE_TTL = 300.0
+NOTES_LEASE_SECONDS = 300.0
+NOTES_POLL_SECONDS = 2.0
+NOTES_WORKERS = 2
+NOTES_REQUESTS_PER_MINUTE = 6.0
+NOTES_WORKER_IDLE_SECONDS = 30.0
+NOTES_JOB_MAX_ATTEMPTS = 3
+INFO_CACHE_TTL = 30 * 24 * 3600.0
+INFO_CACHE_SIZE = 1024
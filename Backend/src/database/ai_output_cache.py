@@ -0,0 +1,73 @@
+"""
+Content-addressed cache of AI model outputs (`ai_outputs` collection).
+
+Entries are keyed by what actually determines the output: the digest of the
+input document, the prompt version and the model name. The same PDF served
+under two pieces, a re-scraped piece or a wiped `notes` field all hit the
+same entry, while a prompt or model change simply misses.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from pymongo.asynchronous.collection import AsyncCollection
+
+from src.utils.notes_codec import decode_notes, try_encode_notes
+
+
+class AIOutputCache:
+    def __init__(self, collection: AsyncCollection) -> None:
+        self.collection = collection
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(digest: str, prompt_version: str, model: str) -> str:
+        return f"{digest}:{prompt_version}:{model}"
+
+    async def get(self, key: str) -> list[dict] | None:
+        return await self.get_first([key])
+
+    async def get_first(self, keys: list[str]) -> list[dict] | None:
+        """Notes of the first of `keys` that has an entry (one lookup)."""
+        docs = {
+            doc["_id"]: doc
+            async for doc in self.collection.find({"_id": {"$in": keys}}, {"notes": 1})
+        }
+        doc = next((docs[key] for key in keys if key in docs), None)
+        if doc is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        notes = doc["notes"]
+        return decode_notes(notes) if isinstance(notes, bytes) else notes
+
+    async def put(self, key: str, notes: list[dict], **meta: str) -> None:
+        packed = try_encode_notes(notes)
+        await self.collection.update_one(
+            {"_id": key},
+            {
+                "$set": {
+                    "notes": packed if packed is not None else notes,
+                    "created_at": datetime.now(timezone.utc),
+                    **meta,
+                }
+            },
+            upsert=True,
+        )
+
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    async def stats(self) -> dict:
+        return {
+            "entries": await self.collection.estimated_document_count(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hit_ratio(), 4),
+        }
+
+
+__all__ = ["AIOutputCache"]
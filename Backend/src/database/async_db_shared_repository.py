@@ -0,0 +1,261 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Type
+
+from pydantic import BaseModel
+from pymongo.asynchronous.collection import AsyncCollection
+
+from src.database.db_shared_repository import FACET_FIELDS, BaseRepository
+from src.database.facet_cache import FacetCache
+from src.database.pagination import Page, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRepository(BaseRepository):
+    """
+    Async counterpart of Repository, backed by pymongo's AsyncMongoClient so
+    route handlers await Mongo instead of blocking the event loop.
+    """
+
+    def __init__(
+        self,
+        collection: AsyncCollection,
+        model_cls: Type[BaseModel],
+        facet_cache: FacetCache | None = None,
+        summary_cls: Type[BaseModel] | None = None,
+    ) -> None:
+        super().__init__(collection, model_cls, summary_cls)
+        self.facets = facet_cache or FacetCache()
+        self.add_write_listener(self.facets.on_write)
+
+    async def _explain(self, query: dict) -> None:
+        if self._should_explain(query):
+            self._check_plan(query, await self.collection.find(query).explain())
+
+    async def _find(self, query: dict, fields: list[str] | None = None) -> list[dict]:
+        await self._explain(query)
+        fields = self._list_fields(fields)
+        cursor = self.collection.find(query, self._projection(fields))
+        return [
+            piece async for doc in cursor if (piece := self._serialize(doc, fields))
+        ]
+
+    async def _find_page(
+        self,
+        query: dict,
+        limit: int | None = None,
+        after: Any = None,
+        fields: list[str] | None = None,
+    ) -> Page:
+        """
+        Keyset page over `_id`: fetch one extra document to know whether a
+        next page exists, and hand back the last raw `_id` as the cursor.
+        """
+        await self._explain(query)
+        fields = self._list_fields(fields)
+        cursor = self.collection.find(
+            self._page_query(query, after), self._projection(fields)
+        ).sort("_id", 1)
+        if limit is not None:
+            cursor = cursor.limit(limit + 1)
+        docs = [doc async for doc in cursor]
+        next_cursor = None
+        if limit is not None and len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor(docs[-1]["_id"])
+        items = [piece for doc in docs if (piece := self._serialize(doc, fields))]
+        return Page(items=items, next_cursor=next_cursor)
+
+    async def iter_objects(
+        self,
+        query: dict | None = None,
+        fields: list[str] | None = None,
+        batch_size: int = 500,
+        limit: int | None = None,
+        after: Any = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Yield serialized documents one by one while the driver fetches them
+        in `batch_size` chunks, so callers never hold the whole result.
+        `limit`/`after` select the same `_id` range as `_find_page`.
+        """
+        await self._explain(query or {})
+        fields = self._list_fields(fields)
+        cursor = self.collection.find(
+            self._page_query(query or {}, after), self._projection(fields)
+        ).batch_size(batch_size)
+        if limit is not None or after is not None:
+            cursor = cursor.sort("_id", 1)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        async for doc in cursor:
+            if piece := self._serialize(doc, fields):
+                yield piece
+
+    async def iter_documents(self, projection: dict | None = None) -> AsyncIterator[dict]:
+        """Raw documents (no validation), e.g. to build in-memory indexes."""
+        async for doc in self.collection.find({}, projection):
+            yield doc
+
+    async def get_objects_by_ids(
+        self, ids: list[Any], fields: list[str] | None = None
+    ) -> list[dict]:
+        """Fetch documents by `_id`, returned in the order of `ids`."""
+        if not ids:
+            return []
+        fields = self._list_fields(fields)
+        cursor = self.collection.find({"_id": {"$in": ids}}, self._projection(fields))
+        by_id = {str(doc["_id"]): doc async for doc in cursor}
+        return [
+            piece
+            for object_id in ids
+            if (doc := by_id.get(str(object_id)))
+            and (piece := self._serialize(doc, fields))
+        ]
+
+    async def get_objects_by_values(self, field: str, values: list[Any]) -> list[dict]:
+        return await self._find({field: {"$in": values}})
+
+    async def get_objects_by_values_page(
+        self, field: str, values: list[Any], **page: Any
+    ) -> Page:
+        return await self._find_page({field: {"$in": values}}, **page)
+
+    async def insert_object_to_db(self, obj: BaseModel):
+        payload = self._insert_payload(obj)
+        await self.collection.insert_one(payload)
+        self._notify("insert", payload)
+
+    async def get_object_by_field(self, field: str, value: str) -> dict | None:
+        await self._explain({field: value})
+        doc = await self.collection.find_one({field: value})
+        if doc is None:
+            return None
+        return self._serialize(doc)
+
+    async def get_object_by_title(self, title: str) -> list[dict]:
+        return await self._find(self._title_query(title))
+
+    async def get_object_by_composer(self, composer: str) -> list[dict]:
+        return await self._find(self._composer_query(composer))
+
+    async def get_object_by_style(self, style: str) -> list[dict]:
+        return await self._find(self._style_query(style))
+
+    async def get_object_by_instrument(self, instrument: str) -> list[dict]:
+        return await self._find(self._instrument_query(instrument))
+
+    async def _distinct(self, field: str) -> list[str]:
+        return self._clean_distinct(await self.collection.distinct(field))
+
+    async def get_all_styles(self) -> list[str]:
+        return await self.facets.get("style", lambda: self._distinct("style"))
+
+    async def get_all_instruments(self) -> list[str]:
+        return await self.facets.get("instruments", lambda: self._distinct("instruments"))
+
+    async def get_all_composers(self) -> list[str]:
+        return await self.facets.get("composer", lambda: self._distinct("composer"))
+
+    async def get_facets(
+        self,
+        style: str | None = None,
+        composer: str | None = None,
+        instrument: str | None = None,
+    ) -> dict:
+        """
+        Filtered total and per-value counts of styles, composers and
+        instruments, computed in a single aggregation round trip.
+        """
+        pipeline = self._facets_pipeline(
+            style=style, composer=composer, instrument=instrument
+        )
+        cursor = await self.collection.aggregate(pipeline)
+        result = (await cursor.to_list(1) or [{}])[0]
+        total = result.get("total") or [{"count": 0}]
+        facets = {
+            name: self._facet_counts(result.get(name, []))
+            for name in FACET_FIELDS
+        }
+        return {"total": total[0]["count"], **facets}
+
+    async def count_objects(
+        self,
+        style: str | None = None,
+        composer: str | None = None,
+        exact: bool = False,
+    ) -> int:
+        query = self._filters_query(style=style, composer=composer)
+        if not query and not exact:
+            return await self.collection.estimated_document_count()
+        return await self.collection.count_documents(query)
+
+    async def get_object_by_id(
+        self, piece_id: str, fields: list[str] | None = None
+    ) -> dict | None:
+        await self._explain(self._id_query(piece_id))
+        doc = await self.collection.find_one(
+            self._id_query(piece_id), self._projection(fields)
+        )
+        if doc is None:
+            return None
+        return self._serialize(doc, fields)
+
+    async def get_all_objects(self) -> list[dict]:
+        return await self._find({})
+
+    async def update_notes(self, piece_id: str, notes: list[dict]) -> None:
+        logger.debug("Updating notes for piece id: %s", piece_id)
+        notes = self._validated_value("notes", notes)
+        await self.collection.update_one(
+            self._id_query(piece_id),
+            {"$set": {"notes": self._stored_notes(notes)}},
+        )
+        self._notify("update_notes", self._id_query(piece_id))
+
+    async def acquire_notes_lease(self, piece_id: str, owner: str, ttl: float) -> bool:
+        """
+        Claim the right to generate notes for a piece that has none, unless
+        another live lease exists. Works across processes: only one
+        conditional update can match.
+        """
+        now = datetime.now(timezone.utc)
+        result = await self.collection.update_one(
+            {
+                **self._id_query(piece_id),
+                "notes": None,
+                "$or": [
+                    {"notes_lease_expires": {"$exists": False}},
+                    {"notes_lease_expires": {"$lt": now}},
+                ],
+            },
+            {
+                "$set": {
+                    "notes_lease_owner": owner,
+                    "notes_lease_expires": now + timedelta(seconds=ttl),
+                }
+            },
+        )
+        return result.modified_count == 1
+
+    async def release_notes_lease(self, piece_id: str, owner: str) -> None:
+        await self.collection.update_one(
+            {**self._id_query(piece_id), "notes_lease_owner": owner},
+            {"$unset": {"notes_lease_owner": "", "notes_lease_expires": ""}},
+        )
+
+    async def search_pieces(self, query: str) -> list[dict]:
+        return await self._find(self._search_query(query))
+
+    async def get_all_objects_page(self, **page: Any) -> Page:
+        return await self._find_page({}, **page)
+
+    async def get_object_by_composer_page(self, composer: str, **page: Any) -> Page:
+        return await self._find_page(self._composer_query(composer), **page)
+
+    async def get_object_by_style_page(self, style: str, **page: Any) -> Page:
+        return await self._find_page(self._style_query(style), **page)
+
+    async def get_object_by_instrument_page(self, instrument: str, **page: Any) -> Page:
+        return await self._find_page(self._instrument_query(instrument), **page)
@@ -0,0 +1,96 @@
+"""
+Batched ingest for scraped pieces.
+
+`PieceBulkWriter` buffers pieces and flushes them as one unordered
+`bulk_write` of upserts keyed on `music_id_number` / `pdf_url` (both backed
+by unique indexes), replacing the find-then-insert round trips per piece.
+Overlapping scrapes can no longer insert the same piece twice: the loser of
+a race gets a duplicate-key error. Write errors are counted as failed,
+apart from pieces that matched a stored one without changing it (skipped).
+Stored pieces whose content did not change but whose page now has other
+HTTP validators only get those rewritten (`add_validators`).
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, fields
+from typing import Any, Callable
+
+import src.config as config
+from src.schemas.musical_piece import MusicalPiece
+
+# Unique keys identifying a scraped piece, in lookup order.
+UPSERT_KEYS = ("music_id_number", "pdf_url")
+# Never overwritten by a re-scrape: the cover picked on first insert and AI notes.
+INSERT_ONLY_FIELDS = ("image_url", "notes")
+
+
+@dataclass
+class BulkWriteReport:
+    inserted: int = 0
+    updated: int = 0
+    # Matched a stored piece with nothing to change.
+    skipped: int = 0
+    # Rejected by Mongo (duplicate key from a concurrent scrape, validation...).
+    failed: int = 0
+
+    def __add__(self, other: "BulkWriteReport") -> "BulkWriteReport":
+        return BulkWriteReport(
+            **{f.name: getattr(self, f.name) + getattr(other, f.name) for f in fields(self)}
+        )
+
+
+class PieceBulkWriter:
+    def __init__(
+        self,
+        piece_dao: Any,
+        batch_size: int = config.SCRAPPING_BATCH_SIZE,
+        on_batch: Callable[[BulkWriteReport], None] | None = None,
+    ) -> None:
+        self.piece_dao = piece_dao
+        self.batch_size = batch_size
+        self.on_batch = on_batch
+        self.totals = BulkWriteReport()
+        # Pieces arrive from several crawler threads.
+        self._lock = threading.Lock()
+        self._buffer: list[MusicalPiece] = []
+        self._validators: list[MusicalPiece] = []
+
+    def add(self, piece: MusicalPiece) -> BulkWriteReport | None:
+        """Buffer a piece; returns the batch report when this add flushed."""
+        with self._lock:
+            self._buffer.append(piece)
+            if len(self._buffer) < self.batch_size:
+                return None
+            return self._flush_locked()
+
+    def add_validators(self, piece: MusicalPiece) -> None:
+        """Buffer a stored piece's new source and HTTP validators, nothing else."""
+        with self._lock:
+            self._validators.append(piece)
+            if len(self._validators) >= self.batch_size:
+                self._flush_validators_locked()
+
+    def flush(self) -> BulkWriteReport | None:
+        with self._lock:
+            self._flush_validators_locked()
+            return self._flush_locked()
+
+    def _flush_validators_locked(self) -> None:
+        if self._validators:
+            batch, self._validators = self._validators, []
+            self.piece_dao.update_scrape_states(batch)
+
+    def _flush_locked(self) -> BulkWriteReport | None:
+        if not self._buffer:
+            return None
+        batch, self._buffer = self._buffer, []
+        report = self.piece_dao.upsert_pieces(batch)
+        self.totals += report
+        if self.on_batch is not None:
+            self.on_batch(report)
+        return report
+
+
+__all__ = ["BulkWriteReport", "INSERT_ONLY_FIELDS", "PieceBulkWriter", "UPSERT_KEYS"]
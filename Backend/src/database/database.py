@@ -1,12 +1,28 @@
 from __future__ import annotations
 
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient, MongoClient
 from pymongo.collection import Collection
 from pymongo.database import Database as MongoDatabase
 import os
 from functools import lru_cache
 
 
+class LazyAsyncCollection:
+    """
+    An async collection looked up on the current async client at every use.
+    DAOs and stores are built at import time, before any event loop runs, and
+    the client is replaced after `close_async`, so they must not keep a
+    handle on it.
+    """
+
+    def __init__(self, db: "Database", name: str) -> None:
+        self._db = db
+        self.name = name
+
+    def __getattr__(self, attr: str):
+        return getattr(self._db.async_client[self._db.db_name][self.name], attr)
+
+
 class Database:
     _instance: "Database" | None = None
     _init_done = False
@@ -30,6 +46,10 @@ class Database:
         )
         self._db: MongoDatabase = self._client[self.db_name]
         self._pieces_collection: Collection = self._db["pieces_metadata"]
+        # The async client is created by the first query, which binds it to
+        # the running event loop, and dropped by `close_async` so that the next
+        # lifespan gets a fresh one (the sync client stays for the scraper).
+        self._async_client: AsyncMongoClient | None = None
 
     @property
     def client(self) -> MongoClient:
@@ -43,6 +63,28 @@ class Database:
     def pieces_collection(self) -> Collection:
         return self._pieces_collection
 
+    @property
+    def async_client(self) -> AsyncMongoClient:
+        if self._async_client is None:
+            self._async_client = AsyncMongoClient(
+                self.mongo_uri,
+                serverSelectionTimeoutMS=5000,
+                connectTimeoutMS=5000,
+            )
+        return self._async_client
+
+    @property
+    def async_pieces_collection(self) -> LazyAsyncCollection:
+        return self.async_collection("pieces_metadata")
+
+    def async_collection(self, name: str) -> LazyAsyncCollection:
+        return LazyAsyncCollection(self, name)
+
+    async def close_async(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+
 
 # Singleton
 @lru_cache
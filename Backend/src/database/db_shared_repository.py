@@ -1,164 +1,530 @@
+import logging
+import os
 import re
-from typing import Optional, Type
+from typing import Any, Callable, Optional, Type
 
 from bson import ObjectId
 from bson.errors import InvalidId
 from pydantic import BaseModel, ValidationError
+from pymongo import InsertOne, UpdateOne
 from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError, PyMongoError
 
-from src.utils.util import fix_mojibake
+from src.database.bulk_writer import BulkWriteReport
+from src.database.indexes import CollectionScanError, is_collection_scan
+from src.utils.notes_codec import decode_notes, try_encode_notes
+from src.utils.util import (
+    normalize_key,
+    repair_text_fields,
+    split_instruments,
+)
 
+logger = logging.getLogger(__name__)
 
-class Repository:
+# Stamped on every document the repositories write; reads trust documents
+# carrying the current version (see BaseRepository._serialize).
+#   1: validated through the model on write
+#   2: string fields also repaired with fix_mojibake on write
+SCHEMA_VERSION = 2
+
+
+def search_keys(doc: dict) -> dict:
     """
-    Generic repository using a Pydantic model to validate/serialize Mongo documents.
+    Normalized shadow fields stored next to the raw values so style and
+    instrument lookups are exact, indexed matches.
     """
+    keys: dict = {}
+    if isinstance(doc.get("style"), str):
+        keys["style_key"] = normalize_key(doc["style"])
+    if isinstance(doc.get("instruments"), str):
+        keys["instrument_keys"] = split_instruments(doc["instruments"])
+    return keys
+
+
+# Shadow field of each field search_keys derives one from.
+SEARCH_KEY_SOURCES = {"style": "style_key", "instruments": "instrument_keys"}
+
+
+# Facet name -> (document field, filter argument it is selected with).
+FACET_FIELDS = {
+    "styles": ("style", "style"),
+    "composers": ("composer", "composer"),
+    "instruments": ("instruments", "instrument"),
+}
 
-    def __init__(self, collection: Collection, model_cls: Type[BaseModel]) -> None:
+
+class BaseRepository:
+    """
+    Driver-agnostic part of the repositories: query building and serialization.
+    The sync and async repositories only differ in how they talk to Mongo.
+    """
+
+    def __init__(
+        self,
+        collection: Any,
+        model_cls: Type[BaseModel],
+        summary_cls: Type[BaseModel] | None = None,
+    ) -> None:
         self.collection = collection
         self.model_cls = model_cls
+        # List reads only fetch the summary model's fields (e.g. no notes)
+        # unless the caller asks for specific fields.
+        self._summary_fields = (
+            [
+                field.alias or name
+                for name, field in summary_cls.model_fields.items()
+                if (field.alias or name) != "_id"
+            ]
+            if summary_cls is not None
+            else None
+        )
+        # Debug aid: "warn" logs and "raise" rejects filtered queries whose
+        # winning plan is a collection scan (costs an extra explain round trip).
+        self.explain_mode = os.getenv("MONGO_EXPLAIN_QUERIES", "off").lower()
+        # Documents written (and validated) by the app are shaped straight
+        # into dicts on read; set MONGO_TRUSTED_READS=0 to validate every read.
+        self.trusted_reads = os.getenv("MONGO_TRUSTED_READS", "1") != "0"
+        # Written by the app but never returned (e.g. crawler bookkeeping).
+        self._internal_fields = set(getattr(model_cls, "INTERNAL_FIELDS", ()))
+        self._output_keys = [
+            field.alias or name
+            for name, field in model_cls.model_fields.items()
+            if name not in self._internal_fields
+        ]
+        self._write_listeners: list[Callable[[str, dict], None]] = []
 
-    def _serialize(self, doc: dict) -> Optional[dict]:
-        payload = dict(doc)
+    def add_write_listener(self, listener: Callable[[str, dict], None]) -> None:
+        """
+        Register a callback run after each write as `listener(event, doc)`,
+        so in-memory structures (search index, caches) follow the catalog.
+        """
+        self._write_listeners.append(listener)
+
+    def _notify(self, event: str, doc: dict) -> None:
+        for listener in self._write_listeners:
+            try:
+                listener(event, doc)
+            except Exception:
+                # A stale cache must never fail the write that already happened.
+                logger.exception("Write listener failed for %s event", event)
+
+    def _should_explain(self, query: dict) -> bool:
+        return self.explain_mode in ("warn", "raise") and bool(query)
+
+    def _check_plan(self, query: dict, explain_output: dict) -> None:
+        if not is_collection_scan(explain_output):
+            return
+        message = f"COLLSCAN on {self.collection.name} for query {query!r}"
+        if self.explain_mode == "raise":
+            raise CollectionScanError(message)
+        logger.warning(message)
+
+    def _serialize(self, doc: dict, fields: list[str] | None = None) -> Optional[dict]:
+        if isinstance(doc.get("notes"), bytes):
+            doc = {**doc, "notes": decode_notes(doc["notes"])}
+        if self.trusted_reads and doc.get("schema_version") == SCHEMA_VERSION:
+            data = self._shape(doc)
+        else:
+            data = self._validate(doc)
+            if data is None:
+                return None
+        if fields is not None:
+            data = {
+                key: value
+                for key, value in data.items()
+                if key == "_id" or key in fields
+            }
+        return data
+
+    def _shape(self, doc: dict) -> dict:
+        """
+        Trusted read: build the same dict as `_validate` (model fields by
+        alias, defaults for missing ones, internal fields dropped) without
+        running validation or text repair again.
+        """
+        data = {key: doc.get(key) for key in self._output_keys}
+        if data.get("_id") is not None:
+            data["_id"] = str(data["_id"])
+        return data
+
+    def _validate(self, doc: dict) -> Optional[dict]:
+        # Documents from before ingest-time repair may still hold mojibake.
+        payload = repair_text_fields(doc)
         if "_id" in payload:
             payload["_id"] = str(payload["_id"])
-        for key, value in payload.items():
-            if isinstance(value, str):
-                payload[key] = fix_mojibake(value)
         try:
             # Use aliases so Mongo _id remains present for callers; add a small safety
             # net to reattach _id if the alias is ever omitted.
             piece = self.model_cls.model_validate(payload)
-            data = piece.model_dump(by_alias=True)
+            data = piece.model_dump(by_alias=True, exclude=self._internal_fields)
             if "_id" not in data and "db_id" in data:
                 data["_id"] = data["db_id"]
             return data
         except ValidationError:
             return None
 
-    def insert_object_to_db(self, obj: BaseModel):
+    @staticmethod
+    def _stored_notes(notes: Any) -> Any:
+        """
+        Notes as written to Mongo: packed binary when it decodes back to
+        exactly these events, else JSON as given.
+        """
+        packed = try_encode_notes(notes)
+        return packed if packed is not None else notes
+
+    def _validated_value(self, field: str, value: Any) -> Any:
+        """Run one model field's validation for a partial update."""
+        target = self.model_cls.model_construct()
+        self.model_cls.__pydantic_validator__.validate_assignment(target, field, value)
+        return getattr(target, field)
+
+    @staticmethod
+    def _insert_payload(obj: BaseModel) -> dict:
         # Avoid inserting a null _id; let Mongo assign one.
-        payload = obj.model_dump(by_alias=True, exclude_none=True)
+        payload = repair_text_fields(obj.model_dump(by_alias=True, exclude_none=True))
         if payload.get("_id") is None:
             payload.pop("_id", None)
+        payload.update(search_keys(payload))
+        if "notes" in payload:
+            payload["notes"] = BaseRepository._stored_notes(payload["notes"])
+        payload["schema_version"] = SCHEMA_VERSION
+        return payload
+
+    def _list_fields(self, fields: list[str] | None) -> list[str] | None:
+        return self._summary_fields if fields is None else fields
+
+    def _projection(self, fields: list[str] | None) -> dict | None:
+        """
+        Push a `fields=` selection down to Mongo. Required model fields are
+        always fetched so the document still validates before being trimmed.
+        """
+        if fields is None:
+            return None
+        required = {
+            name for name, field in self.model_cls.model_fields.items()
+            if field.is_required()
+        }
+        return {
+            name: 1 for name in sorted(set(fields) | required | {"schema_version"})
+        }
+
+    @staticmethod
+    def _page_query(query: dict, after: Any) -> dict:
+        if after is None:
+            return query
+        return {**query, "_id": {"$gt": after}}
+
+    @staticmethod
+    def _id_query(object_id: str) -> dict:
+        try:
+            return {"_id": ObjectId(object_id)}
+        except (InvalidId, TypeError):
+            return {"_id": object_id}
+
+    @staticmethod
+    def _title_query(title: str) -> dict:
+        return {"title": {"$regex": re.escape(title), "$options": "i"}}
+
+    @staticmethod
+    def _composer_query(composer: str) -> dict:
+        return {"composer": {"$regex": re.escape(composer), "$options": "i"}}
+
+    @staticmethod
+    def _style_query(style: str) -> dict:
+        return {"style_key": normalize_key(style)}
+
+    @staticmethod
+    def _instrument_query(instrument: str) -> dict:
+        return {"instrument_keys": normalize_key(instrument)}
+
+    @staticmethod
+    def _search_query(query: str) -> dict:
+        pattern = re.escape(query)
+        return {
+            "$or": [
+                {"title": {"$regex": pattern, "$options": "i"}},
+                {"composer": {"$regex": pattern, "$options": "i"}},
+                {"style": {"$regex": pattern, "$options": "i"}},
+                {"instruments": {"$regex": pattern, "$options": "i"}},
+            ]
+        }
+
+    @classmethod
+    def _filters_query(
+        cls,
+        style: str | None = None,
+        composer: str | None = None,
+        instrument: str | None = None,
+    ) -> dict:
+        """Combine the optional list filters into one Mongo query."""
+        query: dict = {}
+        if style:
+            query.update(cls._style_query(style))
+        if composer:
+            query.update(cls._composer_query(composer))
+        if instrument:
+            query.update(cls._instrument_query(instrument))
+        return query
+
+    @classmethod
+    def _facets_pipeline(cls, **filters: str | None) -> list[dict]:
+        """
+        One `$facet` aggregation returning the filtered total plus per-value
+        counts for each facet. A facet ignores its own filter, so the other
+        values of the current selection keep their counts.
+        """
+        facets: dict[str, list[dict]] = {
+            "total": [{"$match": cls._filters_query(**filters)}, {"$count": "count"}]
+        }
+        for name, (field, filter_name) in FACET_FIELDS.items():
+            others = {k: v for k, v in filters.items() if k != filter_name}
+            facets[name] = [
+                {
+                    "$match": {
+                        **cls._filters_query(**others),
+                        field: {"$type": "string", "$ne": ""},
+                    }
+                },
+                {"$sortByCount": f"${field}"},
+            ]
+        return [{"$facet": facets}]
+
+    @staticmethod
+    def _facet_counts(buckets: list[dict]) -> list[dict]:
+        # $sortByCount leaves ties unordered; break them by value.
+        ranked = sorted(buckets, key=lambda bucket: (-bucket["count"], bucket["_id"]))
+        return [{"value": b["_id"], "count": b["count"]} for b in ranked]
+
+    @staticmethod
+    def _clean_distinct(raw_values: list) -> list[str]:
+        return [value for value in raw_values if value and isinstance(value, str)]
+
+
+class Repository(BaseRepository):
+    """
+    Generic repository using a Pydantic model to validate/serialize Mongo documents.
+    """
+
+    def __init__(
+        self,
+        collection: Collection,
+        model_cls: Type[BaseModel],
+        summary_cls: Type[BaseModel] | None = None,
+    ) -> None:
+        super().__init__(collection, model_cls, summary_cls)
+
+    def _explain(self, query: dict) -> None:
+        if self._should_explain(query):
+            self._check_plan(query, self.collection.find(query).explain())
+
+    def _find(self, query: dict, fields: list[str] | None = None) -> list[dict]:
+        self._explain(query)
+        fields = self._list_fields(fields)
+        cursor = self.collection.find(query, self._projection(fields))
+        return [piece for doc in cursor if (piece := self._serialize(doc, fields))]
+
+    def insert_object_to_db(self, obj: BaseModel):
+        payload = self._insert_payload(obj)
         self.collection.insert_one(payload)
+        self._notify("insert", payload)
+
+    def upsert_objects(
+        self,
+        objects: list[BaseModel],
+        keys: tuple[str, ...],
+        insert_only: tuple[str, ...] = (),
+    ) -> BulkWriteReport:
+        """
+        Insert or update `objects` in one unordered bulk_write, matching
+        existing documents on any of `keys`. `insert_only` fields are only
+        written when the document is created; the other fields an object
+        leaves unset (None) are removed from the stored document. Objects
+        without any key are inserted as is.
+        """
+        operations: list[InsertOne | UpdateOne] = []
+        # Full documents, handed to the write listeners once inserted.
+        documents: list[dict] = []
+        for obj in objects:
+            document = self._insert_payload(obj)
+            documents.append(document)
+            matches = [{key: document[key]} for key in keys if document.get(key)]
+            if not matches:
+                operations.append(InsertOne(document))
+                continue
+            changes = {k: v for k, v in document.items() if k not in insert_only}
+            update: dict = {"$set": changes}
+            if len(changes) < len(document):
+                update["$setOnInsert"] = {k: document[k] for k in insert_only if k in document}
+            if cleared := self._cleared_fields(obj, insert_only):
+                update["$unset"] = dict.fromkeys(cleared, "")
+            query = matches[0] if len(matches) == 1 else {"$or": matches}
+            operations.append(UpdateOne(query, update, upsert=True))
+        if not operations:
+            return BulkWriteReport()
+
+        try:
+            result = self.collection.bulk_write(operations, ordered=False).bulk_api_result
+        except BulkWriteError as exc:
+            # Unordered: the writes without an error still applied.
+            result = exc.details
+        upserted = {entry["index"]: entry["_id"] for entry in result.get("upserted", [])}
+        failed = {error["index"] for error in result.get("writeErrors", [])}
+        for error in result.get("writeErrors", []):
+            logger.warning(
+                "Bulk write of %r failed (code %s): %s",
+                documents[error["index"]].get("title"),
+                error.get("code"),
+                error.get("errmsg"),
+            )
+        inserted = result.get("nInserted", 0) + len(upserted)
+        updated = result.get("nModified", 0)
+
+        matched: list[dict] = []
+        for index, (operation, document) in enumerate(zip(operations, documents)):
+            if index in upserted:
+                self._notify("insert", {**document, "_id": upserted[index]})
+            elif index in failed:
+                continue
+            elif isinstance(operation, InsertOne):
+                self._notify("insert", document)
+            else:
+                matched.append(document)
+        if updated:
+            self._notify_updates(matched, keys)
+        return BulkWriteReport(
+            inserted=inserted,
+            updated=updated,
+            skipped=len(objects) - inserted - updated - len(failed),
+            failed=len(failed),
+        )
+
+    def update_objects(self, updates: list[tuple[dict, dict]]) -> int:
+        """
+        Apply `(query, update)` pairs in one unordered bulk_write, without
+        upserting or notifying the write listeners: for fields no in-memory
+        view is built from. Returns the number of documents modified.
+        """
+        if not updates:
+            return 0
+        result = self.collection.bulk_write(
+            [UpdateOne(query, update) for query, update in updates], ordered=False
+        )
+        return result.modified_count
+
+    @staticmethod
+    def _cleared_fields(obj: BaseModel, insert_only: tuple[str, ...]) -> list[str]:
+        """Stored fields to remove because `obj` no longer has a value for them."""
+        cleared = [
+            field
+            for field, value in obj.model_dump(by_alias=True).items()
+            if value is None and field != "_id" and field not in insert_only
+        ]
+        return cleared + [
+            SEARCH_KEY_SOURCES[field] for field in cleared if field in SEARCH_KEY_SOURCES
+        ]
+
+    def _notify_updates(self, documents: list[dict], keys: tuple[str, ...]) -> None:
+        """
+        Hand the updated documents to the write listeners with their `_id`,
+        looked up by upsert key. When that lookup fails, listeners get an
+        empty "update" and must reload what they keep.
+        """
+        matches = [{key: doc[key]} for doc in documents for key in keys if doc.get(key)]
+        try:
+            stored = list(self.collection.find({"$or": matches}, {key: 1 for key in keys}))
+        except PyMongoError:
+            logger.exception("Could not look up updated documents")
+            self._notify("update", {})
+            return
+        ids = {(key, doc[key]): doc["_id"] for doc in stored for key in keys if doc.get(key)}
+        for document in documents:
+            object_id = next(
+                (ids[(key, document[key])] for key in keys if (key, document.get(key)) in ids),
+                None,
+            )
+            if object_id is not None:
+                self._notify("update", {**document, "_id": object_id})
 
     def get_object_by_field(self, field: str, value: str) -> dict | None:
+        self._explain({field: value})
         doc = self.collection.find_one({field: value})
         if doc is None:
             return None
         return self._serialize(doc)
 
+    def get_field_values(self, fields: list[str]) -> list[dict]:
+        """Raw `fields` of every document in one query, without validation."""
+        projection = {field: 1 for field in fields} | {"_id": 0}
+        return list(self.collection.find({}, projection))
+
     def delete_all_objects_from_db(self):
         self.collection.delete_many({})
 
     def get_object_by_title(self, title: str) -> list[dict]:
-        pattern = re.escape(title)
-        cursor = self.collection.find({"title": {"$regex": pattern, "$options": "i"}})
-        return [piece for doc in cursor if (piece := self._serialize(doc))]
+        return self._find(self._title_query(title))
 
     def get_object_by_composer(self, composer: str) -> list[dict]:
-        pattern = re.escape(composer)
-        cursor = self.collection.find(
-            {"composer": {"$regex": pattern, "$options": "i"}}
-        )
-        return [piece for doc in cursor if (piece := self._serialize(doc))]
+        return self._find(self._composer_query(composer))
 
     def get_object_by_style(self, style: str) -> list[dict]:
-        variants = [style.lower(), style.capitalize(), style.upper()]
-        cursor = self.collection.find({"style": {"$in": variants}})
-        objects: list[dict] = []
-        for doc in cursor:
-            if piece := self._serialize(doc):
-                objects.append(piece)
-        return objects
+        return self._find(self._style_query(style))
 
     def get_object_by_instrument(self, instrument: str) -> list[dict]:
-        variants = [instrument.lower(), instrument.capitalize(), instrument.upper()]
-        cursor = self.collection.find({"instruments": {"$in": variants}})
-        objects: list[dict] = []
-        for doc in cursor:
-            if piece := self._serialize(doc):
-                objects.append(piece)
-        return objects
+        return self._find(self._instrument_query(instrument))
 
     def get_all_styles(self) -> list[str]:
         """
         Return the distinct set of style values stored in the collection.
         """
-        raw_styles = self.collection.distinct("style")
-        styles: list[str] = []
-        for style in raw_styles:
-            if not style:
-                continue
-            if isinstance(style, str):
-                styles.append(fix_mojibake(style))
-        return styles
+        return self._clean_distinct(self.collection.distinct("style"))
 
     def get_all_instruments(self) -> list[str]:
         """
         Return the distinct set of instruments stored in the collection.
         """
-        raw_instruments = self.collection.distinct("instruments")
-        instruments: list[str] = []
-        for instrument in raw_instruments:
-            if not instrument:
-                continue
-            if isinstance(instrument, str):
-                instruments.append(fix_mojibake(instrument))
-        return instruments
+        return self._clean_distinct(self.collection.distinct("instruments"))
 
     def get_all_composers(self) -> list[str]:
         """
         Return the distinct set of composers stored in the collection.
         """
-        raw_composers = self.collection.distinct("composer")
-        composers: list[str] = []
-        for composer in raw_composers:
-            if not composer:
-                continue
-            if isinstance(composer, str):
-                composers.append(fix_mojibake(composer))
-        return composers
+        return self._clean_distinct(self.collection.distinct("composer"))
 
-    def get_object_by_id(self, piece_id: str) -> dict | None:
-        doc = None
-        try:
-            doc = self.collection.find_one({"_id": ObjectId(piece_id)})
-        except (InvalidId, TypeError):
-            doc = self.collection.find_one({"_id": piece_id})
+    def count_objects(
+        self,
+        style: str | None = None,
+        composer: str | None = None,
+        exact: bool = False,
+    ) -> int:
+        """
+        Count documents without fetching them. An unfiltered count uses the
+        collection metadata unless `exact` is requested.
+        """
+        query = self._filters_query(style=style, composer=composer)
+        if not query and not exact:
+            return self.collection.estimated_document_count()
+        return self.collection.count_documents(query)
+
+    def get_object_by_id(
+        self, piece_id: str, fields: list[str] | None = None
+    ) -> dict | None:
+        self._explain(self._id_query(piece_id))
+        doc = self.collection.find_one(self._id_query(piece_id), self._projection(fields))
         if doc is None:
             return None
-        return self._serialize(doc)
+        return self._serialize(doc, fields)
 
     def get_all_objects(self) -> list[dict]:
-        cursor = self.collection.find({})
-        return [piece for doc in cursor if (piece := self._serialize(doc))]
+        return self._find({})
 
     def update_notes(self, piece_id: str, notes: list[dict]) -> None:
-        try:
-            print("Updating notes for piece objectid:", piece_id)
-            self.collection.update_one(
-                {"_id": ObjectId(piece_id)},
-                {"$set": {"notes": notes}},
-            )
-        except (InvalidId, TypeError):
-            print("Updating notes for piece id:", piece_id)
-            self.collection.update_one(
-                {"_id": piece_id},
-                {"$set": {"notes": notes}},
-            )
+        logger.debug("Updating notes for piece id: %s", piece_id)
+        notes = self._validated_value("notes", notes)
+        self.collection.update_one(
+            self._id_query(piece_id),
+            {"$set": {"notes": self._stored_notes(notes)}},
+        )
+        self._notify("update_notes", self._id_query(piece_id))
 
     def search_pieces(self, query: str) -> list[dict]:
-        pattern = re.escape(query)
-        cursor = self.collection.find(
-            {
-                "$or": [
-                    {"title": {"$regex": pattern, "$options": "i"}},
-                    {"composer": {"$regex": pattern, "$options": "i"}},
-                    {"style": {"$regex": pattern, "$options": "i"}},
-                    {"instruments": {"$regex": pattern, "$options": "i"}},
-                ]
-            }
-        )
-        return [piece for doc in cursor if (piece := self._serialize(doc))]
+        return self._find(self._search_query(query))
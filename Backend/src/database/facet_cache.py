@@ -0,0 +1,79 @@
+"""
+TTL cache for the facet lists (distinct styles, instruments, composers).
+
+Entries expire after `ttl` seconds and are dropped on every repository write
+(the cache is registered as a write listener). Concurrent misses for the same
+key share a single in-flight load, so a burst of requests after expiry runs
+one `distinct` instead of one per request.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Awaitable, Callable
+
+import src.config as config
+from src.utils.single_flight import SingleFlight
+
+
+class FacetCache:
+    def __init__(
+        self,
+        ttl: float = config.FACET_CACHE_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self._clock = clock
+        # Invalidation can come from the scraper thread, reads from the loop.
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[float, list[str]]] = {}
+        self._generation = 0
+        self._flights = SingleFlight()
+
+    def _fresh(self, key: str) -> list[str] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] > self._clock():
+            return entry[1]
+        return None
+
+    async def get(
+        self, key: str, loader: Callable[[], Awaitable[list[str]]]
+    ) -> list[str]:
+        """
+        Cached value for `key`, loading it with `loader()` on a miss. Callers
+        missing at the same time await the same load.
+        """
+        value = self._fresh(key)
+        if value is not None:
+            return list(value)
+        with self._lock:
+            generation = self._generation
+        # Keyed by generation: a load started before the last write may
+        # return stale values, so later callers start a fresh one.
+        value = await self._flights.run(
+            (key, generation), lambda: self._load(key, loader, generation)
+        )
+        return list(value)
+
+    async def _load(
+        self, key: str, loader: Callable[[], Awaitable[list[str]]], generation: int
+    ) -> list[str]:
+        value = await loader()
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (self._clock() + self.ttl, value)
+        return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def on_write(self, event: str, doc: dict) -> None:
+        """Repository write listener (see BaseRepository.add_write_listener)."""
+        self.invalidate()
+
+
+__all__ = ["FacetCache"]
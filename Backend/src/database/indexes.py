@@ -0,0 +1,108 @@
+"""
+Declarative index registry for `pieces_metadata` and query-plan helpers.
+
+Indexes are applied idempotently at startup (see `main.lifespan`); the plan
+helpers back the repositories' explain debug mode (`MONGO_EXPLAIN_QUERIES`).
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Iterator
+
+from pymongo import ASCENDING, TEXT, IndexModel
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+# Only real strings take part in the unique constraints: many scraped pieces
+# have no music_id_number, and missing values would otherwise collide as null.
+PIECE_INDEXES: list[IndexModel] = [
+    IndexModel(
+        [("music_id_number", ASCENDING)],
+        name="music_id_number_unique",
+        unique=True,
+        partialFilterExpression={"music_id_number": {"$type": "string"}},
+    ),
+    IndexModel(
+        [("pdf_url", ASCENDING)],
+        name="pdf_url_unique",
+        unique=True,
+        partialFilterExpression={"pdf_url": {"$type": "string"}},
+    ),
+    IndexModel([("composer", ASCENDING)], name="composer"),
+    IndexModel([("style", ASCENDING)], name="style"),
+    IndexModel([("instruments", ASCENDING)], name="instruments"),
+    # Normalized shadow fields written by the repositories (see migrations.py).
+    IndexModel([("style_key", ASCENDING)], name="style_key"),
+    IndexModel([("instrument_keys", ASCENDING)], name="instrument_keys"),
+    IndexModel(
+        [
+            ("title", TEXT),
+            ("composer", TEXT),
+            ("style", TEXT),
+            ("instruments", TEXT),
+        ],
+        name="pieces_text",
+        weights={"title": 10, "composer": 5, "style": 2, "instruments": 1},
+        # Titles and names are multilingual; stemming would only hurt.
+        default_language="none",
+    ),
+]
+
+
+async def ensure_indexes(
+    collection: AsyncCollection, indexes: list[IndexModel] | None = None
+) -> list[str]:
+    """
+    Create every registered index. Re-running is a no-op for indexes that
+    already exist with the same spec; a conflicting or unbuildable index
+    (e.g. duplicates under a unique key) is logged and skipped so the API
+    still starts.
+    """
+    created: list[str] = []
+    for index in indexes if indexes is not None else PIECE_INDEXES:
+        name = index.document["name"]
+        try:
+            await collection.create_indexes([index])
+            created.append(name)
+        except OperationFailure as exc:
+            logger.warning("Could not create index %s: %s", name, exc)
+    return created
+
+
+class CollectionScanError(RuntimeError):
+    """Raised in strict explain mode when a query falls back to a COLLSCAN."""
+
+
+def _iter_stages(plan: dict) -> Iterator[str]:
+    if not isinstance(plan, dict):
+        return
+    if "stage" in plan:
+        yield plan["stage"]
+    # Classic plans nest through inputStage(s); SBE plans wrap a queryPlan.
+    for key in ("queryPlan", "inputStage"):
+        if key in plan:
+            yield from _iter_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _iter_stages(child)
+
+
+def winning_plan_stages(explain_output: dict) -> list[str]:
+    winning = explain_output.get("queryPlanner", {}).get("winningPlan", {})
+    return list(_iter_stages(winning))
+
+
+def is_collection_scan(explain_output: dict) -> bool:
+    return "COLLSCAN" in winning_plan_stages(explain_output)
+
+
+__all__ = [
+    "CollectionScanError",
+    "PIECE_INDEXES",
+    "ensure_indexes",
+    "is_collection_scan",
+    "winning_plan_stages",
+]
@@ -0,0 +1,133 @@
+"""
+Two-tier cache for the composer / piece info agents.
+
+An in-process LRU sits in front of the `agent_info_cache` collection, whose
+TTL index lets Mongo drop stale entries. Lookups are keyed by the normalized
+name ("Bach", " bach", "BÁCH" share one entry) and concurrent misses for the
+same name share one model call.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Generic, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+from pymongo import ASCENDING, IndexModel
+from pymongo.asynchronous.collection import AsyncCollection
+
+import src.config as config
+from src.database.indexes import ensure_indexes
+from src.utils.single_flight import SingleFlight
+from src.utils.util import normalize_key
+
+INFO_CACHE_INDEXES: list[IndexModel] = [
+    # Mongo removes a document once `expires_at` is in the past.
+    IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+]
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+class InfoCache(Generic[ModelT]):
+    def __init__(
+        self,
+        collection: AsyncCollection,
+        model_cls: Type[ModelT],
+        namespace: str,
+        ttl: float = config.INFO_CACHE_TTL,
+        max_entries: int = config.INFO_CACHE_SIZE,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.collection = collection
+        self.model_cls = model_cls
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, ModelT]] = OrderedDict()
+        self._flights = SingleFlight()
+        self._indexed = False
+
+    def _id(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, name: str, loader: Callable[[], Awaitable[ModelT]]) -> ModelT:
+        """Cached value for `name`, from memory, then Mongo, then `loader()`."""
+        key = normalize_key(name)
+        value = self._recall(key)
+        if value is not None:
+            return value
+        return await self._flights.run(key, lambda: self._load(key, loader))
+
+    def _recall(self, key: str) -> ModelT | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _remember(self, key: str, value: ModelT, ttl: float) -> None:
+        self._entries[key] = (self._clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[ModelT]]) -> ModelT:
+        now = datetime.now(timezone.utc)
+        doc = await self.collection.find_one({"_id": self._id(key)})
+        stored = self._from_document(doc, now)
+        if stored is not None:
+            value, remaining = stored
+            self._remember(key, value, remaining)
+            return value
+
+        value = await loader()
+        await self._store(key, value, now)
+        self._remember(key, value, self.ttl)
+        return value
+
+    def _from_document(
+        self, doc: dict | None, now: datetime
+    ) -> tuple[ModelT, float] | None:
+        """Stored value and its remaining lifetime, unless missing or stale."""
+        if doc is None:
+            return None
+        # pymongo hands back naive UTC datetimes by default.
+        expires_at = doc["expires_at"].replace(tzinfo=timezone.utc)
+        # The TTL monitor only runs every minute: check expiry ourselves.
+        if expires_at <= now:
+            return None
+        try:
+            value = self.model_cls.model_validate(doc["value"])
+        except ValidationError:
+            return None
+        return value, (expires_at - now).total_seconds()
+
+    async def _store(self, key: str, value: ModelT, now: datetime) -> None:
+        if not self._indexed:
+            await ensure_indexes(self.collection, INFO_CACHE_INDEXES)
+            self._indexed = True
+        await self.collection.update_one(
+            {"_id": self._id(key)},
+            {
+                "$set": {
+                    "namespace": self.namespace,
+                    "value": value.model_dump(),
+                    "expires_at": now + timedelta(seconds=self.ttl),
+                }
+            },
+            upsert=True,
+        )
+
+    def clear(self) -> None:
+        """Drop the in-process tier (the Mongo tier expires on its own)."""
+        self._entries.clear()
+
+
+__all__ = ["INFO_CACHE_INDEXES", "InfoCache"]
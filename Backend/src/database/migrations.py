@@ -0,0 +1,145 @@
+"""
+One-shot data migrations for `pieces_metadata`.
+
+Run from Backend/ once Mongo is reachable (MONGO_URI / MONGO_CURRENT_DB):
+
+    python -m src.database.migrations backfill-search-keys
+    python -m src.database.migrations stamp-schema-version
+    python -m src.database.migrations pack-notes
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+
+from src.database.db_shared_repository import SCHEMA_VERSION, search_keys
+from src.schemas.musical_piece import MusicalPiece
+from src.utils.notes_codec import decode_notes, try_encode_notes
+from src.utils.util import repair_text_fields
+from src.env_loader import load_env_file
+
+# Documents whose raw style/instruments have no normalized shadow field yet.
+MISSING_SEARCH_KEYS = {
+    "$or": [
+        {"style": {"$type": "string"}, "style_key": {"$exists": False}},
+        {"instruments": {"$type": "string"}, "instrument_keys": {"$exists": False}},
+    ]
+}
+
+
+def _flush(collection: Collection, operations: list[UpdateOne]) -> int:
+    if not operations:
+        return 0
+    result = collection.bulk_write(operations, ordered=False)
+    operations.clear()
+    return result.modified_count
+
+
+def backfill_search_keys(collection: Collection, batch_size: int = 500) -> int:
+    """
+    Write `style_key` / `instrument_keys` on documents inserted before the
+    repositories started storing them. Safe to re-run: migrated documents
+    no longer match the filter.
+    """
+    cursor = collection.find(MISSING_SEARCH_KEYS, {"style": 1, "instruments": 1})
+    operations: list[UpdateOne] = []
+    modified = 0
+    for doc in cursor:
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": search_keys(doc)}))
+        if len(operations) >= batch_size:
+            modified += _flush(collection, operations)
+    modified += _flush(collection, operations)
+    return modified
+
+
+def stamp_schema_version(collection: Collection, batch_size: int = 500) -> int:
+    """
+    Bring documents written by older code to the current SCHEMA_VERSION:
+    repair mojibake in their text fields, validate them and store any value
+    the model normalizes (e.g. notes saved as a JSON string) along with the
+    search keys derived from the repaired text, then stamp them so reads
+    can trust them. Invalid documents are left alone and keep
+    being validated (and skipped) on read.
+    """
+    cursor = collection.find({"schema_version": {"$ne": SCHEMA_VERSION}})
+    operations: list[UpdateOne] = []
+    modified = 0
+    for doc in cursor:
+        repaired = repair_text_fields(doc)
+        packed_notes = isinstance(doc.get("notes"), bytes)
+        if packed_notes:
+            repaired["notes"] = decode_notes(doc["notes"])
+        try:
+            piece = MusicalPiece.model_validate({**repaired, "_id": str(doc["_id"])})
+        except ValidationError:
+            continue
+        validated = piece.model_dump(by_alias=True, exclude_none=True)
+        changes = {
+            key: value
+            for key, value in validated.items()
+            if key != "_id" and doc.get(key) != value
+            and not (key == "notes" and packed_notes)
+        }
+        # Keys built from the mojibake (on insert or by backfill-search-keys)
+        # would no longer match lookups on the repaired text.
+        changes.update(
+            (key, value)
+            for key, value in search_keys(validated).items()
+            if doc.get(key) != value
+        )
+        changes["schema_version"] = SCHEMA_VERSION
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": changes}))
+        if len(operations) >= batch_size:
+            modified += _flush(collection, operations)
+    modified += _flush(collection, operations)
+    return modified
+
+
+def pack_notes(collection: Collection, batch_size: int = 500) -> int:
+    """
+    Rewrite JSON `notes` arrays in the packed binary encoding. Arrays the
+    codec cannot represent exactly are left as JSON (and re-checked on the
+    next run).
+    """
+    cursor = collection.find({"notes": {"$type": "array"}}, {"notes": 1})
+    operations: list[UpdateOne] = []
+    modified = 0
+    for doc in cursor:
+        packed = try_encode_notes(doc["notes"])
+        if packed is None:
+            continue
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"notes": packed}}))
+        if len(operations) >= batch_size:
+            modified += _flush(collection, operations)
+    modified += _flush(collection, operations)
+    return modified
+
+
+MIGRATIONS = {
+    "backfill-search-keys": backfill_search_keys,
+    "stamp-schema-version": stamp_schema_version,
+    "pack-notes": pack_notes,
+}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("migration", choices=sorted(MIGRATIONS))
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    load_env_file(Path(".env.local"))
+    from src.database.database import get_database
+
+    collection = get_database().pieces_collection
+    modified = MIGRATIONS[args.migration](collection, batch_size=args.batch_size)
+    print(f"{args.migration}: {modified} documents updated")
+
+
+if __name__ == "__main__":
+    main()
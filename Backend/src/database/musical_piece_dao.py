@@ -1,6 +1,23 @@
+from typing import AsyncIterator
+
 from src.schemas.musical_piece import MusicalPiece
+from src.schemas.piece_summary import PieceSummary
 from src.database.database import Database
 from src.database.db_shared_repository import Repository
+from src.database.async_db_shared_repository import AsyncRepository
+from src.database.bulk_writer import INSERT_ONLY_FIELDS, UPSERT_KEYS, BulkWriteReport
+from src.database.facet_cache import FacetCache
+from src.database.pagination import Page
+from src.search.catalog import CATALOG_FIELDS, CatalogIndex
+
+# What a re-scrape needs to know about the pieces already stored.
+SCRAPE_STATE_FIELDS = [
+    "source_url",
+    "music_id_number",
+    "last_updated",
+    "http_etag",
+    "http_last_modified",
+]
 
 
 class MusicalPieceDAO:
@@ -8,18 +25,67 @@ class MusicalPieceDAO:
     DAO for MusicalPiece documents, backed by the shared Database instance.
     """
 
-    def __init__(self, db: Database):
+    def __init__(
+        self,
+        db: Database,
+        catalog: CatalogIndex | None = None,
+        facets: FacetCache | None = None,
+    ):
         self.db = db
         self.repository = Repository(
-            collection=db.pieces_collection, model_cls=MusicalPiece
+            collection=db.pieces_collection,
+            model_cls=MusicalPiece,
+            summary_cls=PieceSummary,
         )
+        if catalog is not None:
+            self.repository.add_write_listener(catalog.on_write)
+        if facets is not None:
+            self.repository.add_write_listener(facets.on_write)
 
     def insert_object_to_db(self, piece: MusicalPiece):
         self.repository.insert_object_to_db(piece)
 
+    def upsert_pieces(self, pieces: list[MusicalPiece]) -> BulkWriteReport:
+        return self.repository.upsert_objects(
+            pieces, keys=UPSERT_KEYS, insert_only=INSERT_ONLY_FIELDS
+        )
+
+    def update_scrape_states(self, pieces: list[MusicalPiece]) -> int:
+        """
+        Store only where `pieces` were scraped from and their HTTP validators,
+        on the stored pieces they match (see UPSERT_KEYS).
+        """
+        updates = []
+        for piece in pieces:
+            matches = [
+                {key: getattr(piece, key)} for key in UPSERT_KEYS if getattr(piece, key)
+            ]
+            if not matches:
+                continue
+            state = {field: getattr(piece, field) for field in MusicalPiece.INTERNAL_FIELDS}
+            update: dict = {"$set": {k: v for k, v in state.items() if v is not None}}
+            if missing := [k for k, v in state.items() if v is None]:
+                update["$unset"] = dict.fromkeys(missing, "")
+            query = matches[0] if len(matches) == 1 else {"$or": matches}
+            updates.append((query, update))
+        return self.repository.update_objects(updates)
+
     def get_all_pieces(self) -> list[dict]:
         return self.repository.get_all_objects()
 
+    def get_scrape_states(self) -> list[dict]:
+        return self.repository.get_field_values(SCRAPE_STATE_FIELDS)
+
+    def count_pieces(
+        self,
+        style: str | None = None,
+        composer: str | None = None,
+        exact: bool = False,
+    ) -> int:
+        return self.repository.count_objects(
+            style=style, composer=composer, exact=exact
+        )
+
     def get_pieces_by_title(self, title: str) -> list[dict]:
         return self.repository.get_object_by_title(title)
 
@@ -32,8 +98,10 @@ class MusicalPieceDAO:
     def get_pieces_by_instrument(self, instrument: str) -> list[dict]:
         return self.repository.get_object_by_instrument(instrument)
 
-    def get_piece_by_id(self, piece_id: str) -> dict | None:
-        return self.repository.get_object_by_id(piece_id)
+    def get_piece_by_id(
+        self, piece_id: str, fields: list[str] | None = None
+    ) -> dict | None:
+        return self.repository.get_object_by_id(piece_id, fields)
 
     def get_piece_by_music_id_number(self, music_id_number: str) -> dict | None:
         return self.repository.get_object_by_field("music_id_number", music_id_number)
@@ -55,3 +123,156 @@ class MusicalPieceDAO:
 
     def search_pieces(self, query: str) -> list[dict]:
         return self.repository.search_pieces(query)
+
+
+class AsyncMusicalPieceDAO:
+    """
+    Async DAO exposing the same surface as MusicalPieceDAO for the HTTP routes.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        catalog: CatalogIndex | None = None,
+        facets: FacetCache | None = None,
+    ):
+        self.db = db
+        self.repository = AsyncRepository(
+            collection=db.async_pieces_collection,
+            model_cls=MusicalPiece,
+            facet_cache=facets,
+            summary_cls=PieceSummary,
+        )
+        self.catalog = catalog or CatalogIndex()
+        self.repository.add_write_listener(self.catalog.on_write)
+
+    async def insert_object_to_db(self, piece: MusicalPiece):
+        await self.repository.insert_object_to_db(piece)
+
+    async def get_all_pieces(self) -> list[dict]:
+        return await self.repository.get_all_objects()
+
+    async def count_pieces(
+        self,
+        style: str | None = None,
+        composer: str | None = None,
+        exact: bool = False,
+    ) -> int:
+        return await self.repository.count_objects(
+            style=style, composer=composer, exact=exact
+        )
+
+    def stream_all_pieces(self, **options) -> AsyncIterator[dict]:
+        return self.repository.iter_objects(**options)
+
+    async def get_pieces_by_title(self, title: str) -> list[dict]:
+        return await self.repository.get_object_by_title(title)
+
+    async def get_pieces_by_style(self, style: str) -> list[dict]:
+        return await self.repository.get_object_by_style(style)
+
+    async def get_pieces_by_composer(self, composer: str) -> list[dict]:
+        return await self.repository.get_object_by_composer(composer)
+
+    async def get_pieces_by_instrument(self, instrument: str) -> list[dict]:
+        return await self.repository.get_object_by_instrument(instrument)
+
+    async def get_piece_by_id(
+        self, piece_id: str, fields: list[str] | None = None
+    ) -> dict | None:
+        return await self.repository.get_object_by_id(piece_id, fields)
+
+    async def get_piece_by_music_id_number(self, music_id_number: str) -> dict | None:
+        return await self.repository.get_object_by_field(
+            "music_id_number", music_id_number
+        )
+
+    async def get_piece_by_pdf_url(self, pdf_url: str) -> dict | None:
+        return await self.repository.get_object_by_field("pdf_url", pdf_url)
+
+    async def update_notes(self, piece_id: str, notes: list[dict]) -> None:
+        await self.repository.update_notes(piece_id, notes)
+
+    async def acquire_notes_lease(self, piece_id: str, owner: str, ttl: float) -> bool:
+        return await self.repository.acquire_notes_lease(piece_id, owner, ttl)
+
+    async def release_notes_lease(self, piece_id: str, owner: str) -> None:
+        await self.repository.release_notes_lease(piece_id, owner)
+
+    async def get_all_styles(self) -> list[str]:
+        return await self.repository.get_all_styles()
+
+    async def get_all_instruments(self) -> list[str]:
+        return await self.repository.get_all_instruments()
+
+    async def get_all_composers(self) -> list[str]:
+        return await self.repository.get_all_composers()
+
+    async def get_facets(self, **filters: str | None) -> dict:
+        return await self.repository.get_facets(**filters)
+
+    async def search_pieces(self, query: str) -> list[dict]:
+        return await self.repository.search_pieces(query)
+
+    async def get_all_pieces_page(self, **page) -> Page:
+        return await self.repository.get_all_objects_page(**page)
+
+    async def get_pieces_by_style_page(self, style: str, **page) -> Page:
+        return await self.repository.get_object_by_style_page(style, **page)
+
+    async def get_pieces_by_composer_page(self, composer: str, **page) -> Page:
+        return await self.repository.get_object_by_composer_page(composer, **page)
+
+    async def get_pieces_by_instrument_page(self, instrument: str, **page) -> Page:
+        return await self.repository.get_object_by_instrument_page(instrument, **page)
+
+    async def rebuild_catalog(self) -> None:
+        """Rebuild the in-memory search index and fuzzy matchers from Mongo."""
+        projection = dict.fromkeys(CATALOG_FIELDS, 1)
+        docs = [doc async for doc in self.repository.iter_documents(projection)]
+        self.catalog.rebuild(docs)
+
+    async def _ensure_catalog(self) -> None:
+        if not self.catalog.ready:
+            await self.rebuild_catalog()
+
+    async def search_pieces_ranked(
+        self,
+        query: str,
+        limit: int | None = None,
+        offset: int = 0,
+        fields: list[str] | None = None,
+    ) -> tuple[int, list[dict]]:
+        """
+        Ranked full-text search; returns the total hit count and one page.
+        """
+        await self._ensure_catalog()
+        hits = self.catalog.search.search(query, limit=limit, offset=offset)
+        pieces = await self.repository.get_objects_by_ids(hits.ids, fields)
+        return hits.total, pieces
+
+    async def get_pieces_by_composer_fuzzy(self, composer: str, **page) -> Page:
+        """
+        Resolve a possibly misspelled name ("Shopin") to the canonical
+        composer(s) and return their pieces with an exact, indexed match.
+        """
+        await self._ensure_catalog()
+        names = self.catalog.composers.resolve(composer)
+        if not names:
+            return Page(items=[])
+        return await self.repository.get_objects_by_values_page(
+            "composer", names, **page
+        )
+
+    async def autocomplete(
+        self, prefix: str, field: str | None = None, limit: int = 10
+    ) -> list[dict]:
+        await self._ensure_catalog()
+        return self.catalog.autocomplete.suggest(prefix, field=field, limit=limit)
+
+    async def get_pieces_by_title_fuzzy(self, title: str, limit: int = 20) -> list[dict]:
+        await self._ensure_catalog()
+        titles = [value for value, _score in self.catalog.titles.match(title, limit)]
+        pieces = await self.repository.get_objects_by_values("title", titles)
+        rank = {value: position for position, value in enumerate(titles)}
+        return sorted(pieces, key=lambda piece: rank.get(piece["title"], len(rank)))
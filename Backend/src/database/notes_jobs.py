@@ -0,0 +1,122 @@
+"""
+Persistent queue of note pre-transcription jobs (`notes_jobs` collection).
+
+One document per piece, `_id` being the piece id:
+
+    {"_id", "pdf_url", "priority", "status", "attempts", "error",
+     "owner", "created_at", "started_at", "finished_at"}
+
+`status` goes queued -> running -> done, or back to queued on a retryable
+failure until `max_attempts`, then failed. Claiming is one atomic
+`find_one_and_update`, so several workers (or processes) never take the same
+job.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument
+from pymongo.asynchronous.collection import AsyncCollection
+
+import src.config as config
+from src.database.indexes import ensure_indexes
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+NOTES_JOB_INDEXES: list[IndexModel] = [
+    IndexModel(
+        [("status", ASCENDING), ("priority", DESCENDING), ("created_at", ASCENDING)],
+        name="status_priority",
+    ),
+]
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class NotesJobQueue:
+    def __init__(
+        self,
+        collection: AsyncCollection,
+        max_attempts: int = config.NOTES_JOB_MAX_ATTEMPTS,
+    ) -> None:
+        self.collection = collection
+        self.max_attempts = max_attempts
+
+    async def ensure_indexes(self) -> list[str]:
+        return await ensure_indexes(self.collection, NOTES_JOB_INDEXES)
+
+    async def enqueue(self, piece_id: str, pdf_url: str, priority: int = 0) -> bool:
+        """
+        Queue a piece unless it already has a job; an existing job keeps its
+        status and only has its priority raised. Returns True if created.
+        """
+        result = await self.collection.update_one(
+            {"_id": piece_id},
+            {
+                "$setOnInsert": {
+                    "pdf_url": pdf_url,
+                    "status": "queued",
+                    "attempts": 0,
+                    "created_at": _now(),
+                },
+                "$max": {"priority": priority},
+            },
+            upsert=True,
+        )
+        return result.upserted_id is not None
+
+    async def claim(self, owner: str) -> dict | None:
+        """Take the most popular queued job (oldest first among equals)."""
+        return await self.collection.find_one_and_update(
+            {"status": "queued"},
+            {
+                "$set": {"status": "running", "owner": owner, "started_at": _now()},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("priority", DESCENDING), ("created_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def complete(self, job_id: str) -> None:
+        await self.collection.update_one(
+            {"_id": job_id},
+            {"$set": {"status": "done", "finished_at": _now()}, "$unset": {"error": ""}},
+        )
+
+    async def fail(self, job: dict, error: str, retry: bool = True) -> None:
+        """Requeue the job, or mark it failed once its attempts are used up."""
+        retry = retry and job.get("attempts", 0) < self.max_attempts
+        await self.collection.update_one(
+            {"_id": job["_id"]},
+            {
+                "$set": {
+                    "status": "queued" if retry else "failed",
+                    "error": error,
+                    "finished_at": _now(),
+                }
+            },
+        )
+
+    async def requeue_stale(self, older_than: float) -> int:
+        """Put back jobs left running by a worker that died mid-transcription."""
+        result = await self.collection.update_many(
+            {
+                "status": "running",
+                "started_at": {"$lt": _now() - timedelta(seconds=older_than)},
+            },
+            {"$set": {"status": "queued"}},
+        )
+        return result.modified_count
+
+    async def counts(self) -> dict[str, int]:
+        cursor = await self.collection.aggregate([{"$sortByCount": "$status"}])
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        for row in await cursor.to_list(None):
+            counts[row["_id"]] = row["count"]
+        return counts
+
+
+__all__ = ["JOB_STATUSES", "NOTES_JOB_INDEXES", "NotesJobQueue"]
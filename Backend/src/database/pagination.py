@@ -0,0 +1,58 @@
+"""Keyset pagination helpers shared by the repositories and routes."""
+
+from __future__ import annotations
+
+import base64
+import binascii
+from typing import Any, NamedTuple
+
+from bson import json_util
+
+
+class InvalidCursorError(ValueError):
+    """Raised when an `after` cursor cannot be decoded."""
+
+
+class Page(NamedTuple):
+    items: list[dict]
+    next_cursor: str | None = None
+
+
+def encode_cursor(last_id: Any) -> str:
+    """
+    Turn the last `_id` of a page into an opaque, URL-safe token.
+    Extended JSON keeps the BSON type so ObjectId and string ids round-trip.
+    """
+    raw = json_util.dumps({"after": last_id}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Any:
+    padded = token + "=" * (-len(token) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode("ascii"))
+        return json_util.loads(raw.decode("utf-8"))["after"]
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError) as exc:
+        raise InvalidCursorError(f"Invalid cursor: {token!r}") from exc
+
+
+def parse_fields(fields: str | None, allowed: set[str]) -> list[str] | None:
+    """
+    Parse a comma-separated `fields=` value into a projection list.
+    """
+    if fields is None:
+        return None
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = sorted(set(requested) - allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return requested or None
+
+
+__all__ = [
+    "InvalidCursorError",
+    "Page",
+    "decode_cursor",
+    "encode_cursor",
+    "parse_fields",
+]
@@ -0,0 +1,143 @@
+"""
+Persistent scrape job records (`scrape_jobs` collection).
+
+    {"_id", "catalog", "mode", "max_pieces", "status", "checkpoint",
+     "processed", "resumed_from", "total", "stats", "error",
+     "cancel_requested", "created_at", "started_at", "heartbeat_at",
+     "finished_at"}
+
+`status` goes running -> done, failed or cancelled. `checkpoint` is the
+position in the catalog listing below which every page has been handled
+and written, so a job left running by a dead process resumes from there.
+A partial unique index keeps one running job per catalog, even across
+processes.
+"""
+
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.errors import DuplicateKeyError
+
+from src.database.indexes import ensure_indexes
+
+SCRAPE_JOB_STATUSES = ("running", "done", "failed", "cancelled")
+
+SCRAPE_JOB_INDEXES: list[IndexModel] = [
+    IndexModel(
+        [("catalog", ASCENDING)],
+        name="one_running_per_catalog",
+        unique=True,
+        partialFilterExpression={"status": "running"},
+    ),
+    IndexModel([("status", ASCENDING), ("heartbeat_at", ASCENDING)], name="status_heartbeat"),
+    IndexModel([("created_at", DESCENDING)], name="created_at"),
+]
+
+
+class ScrapeJobConflict(RuntimeError):
+    """A crawl of the catalog is already running."""
+
+    def __init__(self, job_id: str) -> None:
+        super().__init__(f"Scrape job {job_id} is already running")
+        self.job_id = job_id
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class ScrapeJobStore:
+    def __init__(self, collection: AsyncCollection) -> None:
+        self.collection = collection
+
+    async def ensure_indexes(self) -> list[str]:
+        return await ensure_indexes(self.collection, SCRAPE_JOB_INDEXES)
+
+    async def create(self, catalog: str, mode: str, max_pieces: int | None) -> dict:
+        """Record a running job, or raise ScrapeJobConflict."""
+        running = await self.running(catalog)
+        if running is not None:
+            raise ScrapeJobConflict(running["_id"])
+        now = _now()
+        job = {
+            "_id": uuid.uuid4().hex,
+            "catalog": catalog,
+            "mode": mode,
+            "max_pieces": max_pieces,
+            "status": "running",
+            "checkpoint": 0,
+            "processed": 0,
+            "resumed_from": 0,
+            "total": None,
+            "stats": {},
+            "created_at": now,
+            "started_at": now,
+            "heartbeat_at": now,
+        }
+        try:
+            await self.collection.insert_one(job)
+        except DuplicateKeyError:
+            # Another process started one between our check and insert.
+            running = await self.running(catalog)
+            raise ScrapeJobConflict(running["_id"] if running else "?") from None
+        return job
+
+    async def get(self, job_id: str) -> dict | None:
+        return await self.collection.find_one({"_id": job_id})
+
+    async def running(self, catalog: str) -> dict | None:
+        return await self.collection.find_one({"catalog": catalog, "status": "running"})
+
+    async def checkpoint(self, job_id: str, **progress) -> dict | None:
+        """
+        Save progress (checkpoint, processed, total, stats) and heartbeat.
+        Returns the updated job, None once it is no longer running.
+        """
+        return await self.collection.find_one_and_update(
+            {"_id": job_id, "status": "running"},
+            {"$set": {**progress, "heartbeat_at": _now()}},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def request_cancel(self, job_id: str) -> bool:
+        """Flag a running job; the process running it stops at its next heartbeat."""
+        result = await self.collection.update_one(
+            {"_id": job_id, "status": "running"}, {"$set": {"cancel_requested": True}}
+        )
+        return result.modified_count > 0
+
+    async def finish(
+        self, job_id: str, status: str, error: str | None = None, **progress
+    ) -> None:
+        fields = {**progress, "status": status, "finished_at": _now()}
+        if error is not None:
+            fields["error"] = error
+        await self.collection.update_one({"_id": job_id}, {"$set": fields})
+
+    async def claim_stale(self, older_than: float) -> dict | None:
+        """
+        Take over a running job whose process stopped sending heartbeats
+        (crashed or restarted). Atomic, so only one process resumes it.
+        """
+        now = _now()
+        return await self.collection.find_one_and_update(
+            {
+                "status": "running",
+                "heartbeat_at": {"$lt": now - timedelta(seconds=older_than)},
+            },
+            {"$set": {"heartbeat_at": now, "started_at": now}},
+            sort=[("heartbeat_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+
+__all__ = [
+    "SCRAPE_JOB_INDEXES",
+    "SCRAPE_JOB_STATUSES",
+    "ScrapeJobConflict",
+    "ScrapeJobStore",
+]
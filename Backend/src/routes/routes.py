@@ -1,27 +1,100 @@
-from fastapi import APIRouter, BackgroundTasks, HTTPException
+import json
+import logging
+from typing import Annotated, AsyncIterator
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pymongo.errors import PyMongoError
 from pydantic_ai.exceptions import ModelHTTPError
 
 from src.scrapping import repository
 import src.config as config
-from src.DI.container import get_piece_dao
-from src.scrapping import mutopia
-from src.ai_agent.notes_agent import ai_pdf_to_notes
+from src.DI.container import (
+    get_ai_cache,
+    get_async_piece_dao,
+    get_composer_info_cache,
+    get_notes_generator,
+    get_piece_info_cache,
+    get_pretranscription_pool,
+    get_scrape_job_manager,
+)
+from src.database.scrape_jobs import ScrapeJobConflict
+from src.database.pagination import (
+    InvalidCursorError,
+    Page,
+    decode_cursor,
+    parse_fields,
+)
+from src.scrapping.incremental import SCRAPE_MODES
+from src.search.autocomplete import AUTOCOMPLETE_FIELDS
+from src.utils.notes_codec import NotesEncodingError, encode_notes
+from src.ai_agent.notes_generation import NotesGenerationPending
 from src.ai_agent.infos_agents import ai_infos
 from src.ai_agent.agent_instance import get_agent
 from src.schemas.agent_output import AgentInfosOutput
 from src.schemas.composer_piece_info import ComposerPieceInfo
+from src.schemas.musical_piece import MusicalPiece
+
 
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
-piece_dao = get_piece_dao()
+piece_dao = get_async_piece_dao()
+notes_generator = get_notes_generator()
+pretranscription = get_pretranscription_pool()
+ai_cache = get_ai_cache()
+composer_info_cache = get_composer_info_cache()
+piece_info_cache = get_piece_info_cache()
+scrape_jobs = get_scrape_job_manager()
+# `_id` is always returned, so only the other public model fields can be projected.
+PIECE_FIELDS = {
+    name
+    for name in MusicalPiece.model_fields
+    if name != "db_id" and name not in MusicalPiece.INTERNAL_FIELDS
+}
+
+
+def _page_params(
+    limit: int | None, after: str | None, fields: str | None
+) -> dict:
+    """
+    Validate the shared pagination query params (`limit`, `after`, `fields`).
+    """
+    if limit is not None and not 1 <= limit <= config.MAX_PAGE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"limit must be between 1 and {config.MAX_PAGE_SIZE}",
+        )
+    try:
+        return {
+            "limit": limit,
+            "after": decode_cursor(after) if after else None,
+            "fields": parse_fields(fields, PIECE_FIELDS),
+        }
+    except (InvalidCursorError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _page_response(response: Response, page: Page) -> list[dict]:
+    # The body stays a plain list for existing clients; the cursor for the
+    # next page travels in a header and is absent on the last page.
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return page.items
 
 
 @router.get("/pieces/styles/{style}")
-async def get_pieces_by_style(style: str) -> list[dict]:
+async def get_pieces_by_style(
+    style: str,
+    response: Response,
+    limit: int | None = None,
+    after: str | None = None,
+    fields: str | None = None,
+) -> list[dict]:
+    params = _page_params(limit, after, fields)
     try:
-        pieces = piece_dao.get_pieces_by_style(style)
-        return [piece for piece in pieces]
+        page = await piece_dao.get_pieces_by_style_page(style, **params)
+        return _page_response(response, page)
     except PyMongoError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -32,7 +105,7 @@ async def get_all_styles() -> dict:
     Return all distinct musical styles available in the collection.
     """
     try:
-        styles = piece_dao.get_all_styles()
+        styles = await piece_dao.get_all_styles()
         return {"styles": styles}
     except PyMongoError as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -44,7 +117,7 @@ async def get_all_instruments() -> dict:
     Return all distinct instruments available in the collection.
     """
     try:
-        instruments = piece_dao.get_all_instruments()
+        instruments = await piece_dao.get_all_instruments()
         return {"instruments": instruments}
     except PyMongoError as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -56,101 +129,292 @@ async def get_all_composers() -> dict:
     Return all distinct composers available in the collection.
     """
     try:
-        composers = piece_dao.get_all_composers()
+        composers = await piece_dao.get_all_composers()
         return {"composers": composers}
     except PyMongoError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/facets")
+async def get_facets(
+    style: str | None = None,
+    composer: str | None = None,
+    instrument: str | None = None,
+) -> dict:
+    """
+    Styles, composers and instruments with piece counts, plus the total,
+    in one round trip. Active filters narrow the counts of the other facets.
+    """
+    try:
+        return await piece_dao.get_facets(
+            style=style, composer=composer, instrument=instrument
+        )
+    except PyMongoError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/pieces/instruments/{instrument}")
-async def get_pieces_by_instrument(instrument: str) -> list[dict]:
+async def get_pieces_by_instrument(
+    instrument: str,
+    response: Response,
+    limit: int | None = None,
+    after: str | None = None,
+    fields: str | None = None,
+) -> list[dict]:
+    params = _page_params(limit, after, fields)
     try:
-        pieces = piece_dao.get_pieces_by_instrument(instrument)
-        return [piece for piece in pieces]
+        page = await piece_dao.get_pieces_by_instrument_page(instrument, **params)
+        return _page_response(response, page)
+    except PyMongoError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _scrape_mode(mode: str) -> str:
+    if mode not in SCRAPE_MODES:
+        raise HTTPException(
+            status_code=400, detail=f"mode must be one of {', '.join(SCRAPE_MODES)}"
+        )
+    return mode
+
+
+async def _submit_scrape(max_pieces: int | None, mode: str) -> dict:
+    try:
+        return await scrape_jobs.submit(_scrape_mode(mode), max_pieces)
+    except ScrapeJobConflict as e:
+        raise HTTPException(
+            status_code=409, detail={"message": str(e), "job_id": e.job_id}
+        )
     except PyMongoError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/start-scrapping")
 async def start_scrapping_endpoint(
-    background_tasks: BackgroundTasks, max_pieces: int | None = None
+    max_pieces: int | None = None, mode: str = config.SCRAPPING_MODE
 ):
     print("Starting scrapping...")
     limit = max_pieces if max_pieces is not None else config.MAX_PIECES
-    background_tasks.add_task(
-        mutopia.start_scrapping, max_pieces=limit, delay=config.SCRAPPING_DELAY
-    )
-    return {"status": "started", "max_pieces": limit}
+    job = await _submit_scrape(limit, mode)
+    return {"status": "started", "max_pieces": limit, "mode": mode, "job_id": job["id"]}
 
 
 @router.get("/start-scrapping/{max_pieces}")
 async def start_scrapping_endpoint_size_provided(
-    background_tasks: BackgroundTasks, max_pieces: int
+    max_pieces: int, mode: str = config.SCRAPPING_MODE
 ):
     print("Starting scrapping...")
-    background_tasks.add_task(
-        mutopia.start_scrapping, max_pieces=max_pieces, delay=config.SCRAPPING_DELAY
-    )
-    return {"status": "started"}
+    job = await _submit_scrape(max_pieces, mode)
+    return {"status": "started", "job_id": job["id"]}
+
+
+@router.get("/scrapping/jobs/{job_id}")
+async def scrape_job_status(job_id: str) -> dict:
+    """Progress of a scrape job: pages/sec, errors, ETA and counters."""
+    try:
+        job = await scrape_jobs.status(job_id)
+    except PyMongoError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Scrape job not found")
+    return job
+
+
+@router.post("/scrapping/jobs/{job_id}/cancel")
+async def cancel_scrape_job(job_id: str) -> dict:
+    try:
+        cancelled = await scrape_jobs.cancel(job_id)
+    except PyMongoError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not cancelled:
+        raise HTTPException(status_code=404, detail="No running scrape job with this id")
+    return {"status": "cancelling", "job_id": job_id}
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+async def _ndjson_lines(pieces: AsyncIterator[dict]) -> AsyncIterator[str]:
+    try:
+        async for piece in pieces:
+            yield json.dumps(piece, ensure_ascii=False) + "\n"
+    except PyMongoError as e:
+        # The status line is already sent: end the export with an error line
+        # so clients can tell it apart from a complete one.
+        logger.warning("Piece export interrupted: %s", e)
+        yield json.dumps({"error": str(e)}) + "\n"
 
 
 @router.get("/pieces")
-async def get_all_pieces() -> list[dict]:
+async def get_all_pieces(
+    request: Request,
+    response: Response,
+    limit: int | None = None,
+    after: str | None = None,
+    fields: str | None = None,
+    stream: bool = False,
+) -> list[dict]:
+    params = _page_params(limit, after, fields)
+    if stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        # Export mode: one JSON document per line, written as the cursor
+        # advances instead of building the whole list in memory.
+        pieces = piece_dao.stream_all_pieces(
+            batch_size=config.STREAM_BATCH_SIZE, **params
+        )
+        return StreamingResponse(
+            _ndjson_lines(pieces), media_type=NDJSON_MEDIA_TYPE
+        )
     try:
-        pieces = piece_dao.get_all_pieces()
-        return [piece for piece in pieces]
+        page = await piece_dao.get_all_pieces_page(**params)
+        return _page_response(response, page)
     except PyMongoError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/pieces/number")
-async def get_pieces_number() -> list[dict]:
+async def get_pieces_number(
+    style: str | None = None, composer: str | None = None, exact: bool = False
+) -> list[dict]:
+    """
+    Count pieces, optionally filtered by style and/or composer. The
+    unfiltered total comes from collection metadata unless `exact` is set.
+    """
     try:
-        pieces = len(piece_dao.get_all_pieces())
+        pieces = await piece_dao.count_pieces(
+            style=style, composer=composer, exact=exact
+        )
         return [{"number_of_pieces": pieces}]
     except PyMongoError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/pieces/title/{title}")
-async def get_pieces_by_name(title: str) -> list[dict]:
+async def get_pieces_by_name(title: str, fuzzy: bool = False) -> list[dict]:
+    """
+    Pieces whose title contains `title`; with `fuzzy=1`, typo-tolerant
+    matches ranked by closeness instead.
+    """
     try:
-        pieces = piece_dao.get_pieces_by_title(title)
+        if fuzzy:
+            return await piece_dao.get_pieces_by_title_fuzzy(title)
+        pieces = await piece_dao.get_pieces_by_title(title)
         return [piece for piece in pieces]
     except PyMongoError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/pieces/composers/{composer}")
-async def get_pieces_by_composer(composer: str) -> list[dict]:
+async def get_pieces_by_composer(
+    composer: str,
+    response: Response,
+    limit: int | None = None,
+    after: str | None = None,
+    fields: str | None = None,
+    fuzzy: bool = False,
+) -> list[dict]:
+    """
+    Pieces whose composer contains `composer`; with `fuzzy=1` a misspelled
+    name ("Shopin", "Bethoven") is first resolved to the canonical composer.
+    """
+    params = _page_params(limit, after, fields)
     try:
-        pieces = piece_dao.get_pieces_by_composer(composer)
-        return [piece for piece in pieces]
+        if fuzzy:
+            page = await piece_dao.get_pieces_by_composer_fuzzy(composer, **params)
+            return _page_response(response, page)
+        page = await piece_dao.get_pieces_by_composer_page(composer, **params)
+        return _page_response(response, page)
     except PyMongoError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/pieces/search/{query}")
-async def search_pieces(query: str) -> list[dict]:
+async def search_pieces(
+    query: str,
+    response: Response,
+    limit: int | None = None,
+    offset: int = 0,
+    fields: str | None = None,
+) -> list[dict]:
+    """
+    Ranked full-text search over title, composer, style and instruments
+    (accent-insensitive, prefix-aware). Total hits are in `X-Total-Count`.
+    """
+    params = _page_params(limit, None, fields)
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="offset must be >= 0")
     try:
-        pieces = piece_dao.search_pieces(query)
-        return [piece for piece in pieces]
+        total, pieces = await piece_dao.search_pieces_ranked(
+            query, limit=params["limit"], offset=offset, fields=params["fields"]
+        )
+        response.headers["X-Total-Count"] = str(total)
+        return pieces
     except PyMongoError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/autocomplete")
+async def autocomplete(q: str, field: str | None = None, limit: int = 10) -> dict:
+    """
+    Typeahead suggestions for a partial title, composer, style or
+    instrument, served from memory (no collection scan per keystroke).
+    """
+    if field is not None and field not in AUTOCOMPLETE_FIELDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"field must be one of: {', '.join(AUTOCOMPLETE_FIELDS)}",
+        )
+    if not 1 <= limit <= config.MAX_AUTOCOMPLETE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"limit must be between 1 and {config.MAX_AUTOCOMPLETE}",
+        )
+    try:
+        suggestions = await piece_dao.autocomplete(q, field=field, limit=limit)
+        return {"suggestions": suggestions}
+    except PyMongoError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+NOTES_FORMATS = ("json", "binary")
+NOTES_BINARY_MEDIA_TYPE = "application/octet-stream"
+
+
+def _notes_response(notes: list[dict], notes_format: str) -> dict | Response:
+    if notes_format == "json":
+        return {"notes": notes}
+    try:
+        # Canonical form: equivalent events, not necessarily the stored spelling.
+        return Response(
+            content=encode_notes(notes, exact=False), media_type=NOTES_BINARY_MEDIA_TYPE
+        )
+    except NotesEncodingError as e:
+        raise HTTPException(
+            status_code=406, detail=f"Notes cannot be sent as binary: {e}"
+        )
+
+
 @router.get("/pieces/get_notes_with_ai/{piece_id}")
-async def get_notes_with_ai(piece_id: str) -> dict:
+async def get_notes_with_ai(
+    piece_id: str, notes_format: Annotated[str, Query(alias="format")] = "json"
+) -> dict:
+    """
+    Notes of a piece, transcribed by the AI model on first request. With
+    `format=binary` they are sent in the packed encoding of
+    `src.utils.notes_codec` instead of JSON.
+    """
+    if notes_format not in NOTES_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"format must be one of: {', '.join(NOTES_FORMATS)}",
+        )
     try:
-        piece = piece_dao.get_piece_by_id(piece_id)
+        # Only the two fields needed here, not the whole (possibly large) piece.
+        piece = await piece_dao.get_piece_by_id(piece_id, fields=["notes", "pdf_url"])
         if piece is None:
             raise HTTPException(status_code=404, detail="Piece not found")
         pdf_notes = piece.get("notes")
-        print(piece)
-        print("Existing notes:", pdf_notes)
 
         if pdf_notes is not None:
-            return {"notes": pdf_notes}
+            return _notes_response(pdf_notes, notes_format)
 
         pdf_url = piece.get("pdf_url")
         if pdf_url is None:
@@ -158,10 +422,17 @@ async def get_notes_with_ai(piece_id: str) -> dict:
                 status_code=404, detail="PDF URL not found for this piece"
             )
 
-        notes = await ai_pdf_to_notes(get_agent(), pdf_url)
-        piece_dao.update_notes(piece_id, notes)
+        # Concurrent requests (in this or another worker) share one transcription.
+        notes = await notes_generator.generate(piece_id, pdf_url)
+        if notes is None:
+            raise HTTPException(status_code=404, detail="Piece not found")
 
-        return {"notes": notes}
+        return _notes_response(notes, notes_format)
+    except NotesGenerationPending:
+        raise HTTPException(
+            status_code=503,
+            detail="Notes are still being generated for this piece, retry later",
+        )
     except ModelHTTPError as e:
         # Surface AI model failures as a 503 to avoid masking as server errors
         raise HTTPException(
@@ -172,6 +443,34 @@ async def get_notes_with_ai(piece_id: str) -> dict:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/admin/notes-jobs")
+async def notes_jobs_stats() -> dict:
+    """Queue depth and throughput of the background notes pre-transcription."""
+    try:
+        return await pretranscription.stats()
+    except PyMongoError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/admin/ai-cache")
+async def ai_cache_stats() -> dict:
+    """Size and hit ratio of the AI output cache since this process started."""
+    try:
+        return await ai_cache.stats()
+    except PyMongoError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/admin/notes-jobs/seed")
+async def seed_notes_jobs() -> dict:
+    """Queue every piece that has no notes yet, most popular composers first."""
+    try:
+        queued = await pretranscription.seed()
+        return {"queued": queued}
+    except PyMongoError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get(
     "/composer/info/{composer_name}",
     response_model=ComposerPieceInfo,
@@ -179,8 +478,10 @@ async def get_notes_with_ai(piece_id: str) -> dict:
 )
 async def ai_composer_info(composer_name: str) -> ComposerPieceInfo:
     try:
-        info = await repository.composer_info(composer_name)
-        return info
+        # The model and Google Custom Search are paid: hit them once per composer.
+        return await composer_info_cache.get(
+            composer_name, lambda: repository.composer_info(composer_name)
+        )
     except ModelHTTPError as e:
         raise HTTPException(
             status_code=503,
@@ -192,9 +493,11 @@ async def ai_composer_info(composer_name: str) -> ComposerPieceInfo:
 
 @router.get("/piece_info/{piece_name}", response_model=AgentInfosOutput)
 async def ai_piece_info(piece_name: str) -> AgentInfosOutput:
+    async def load() -> AgentInfosOutput:
+        return AgentInfosOutput(info=await ai_infos(get_agent(), piece_name))
+
     try:
-        info = await ai_infos(get_agent(), piece_name)
-        return info
+        return await piece_info_cache.get(piece_name, load)
     except ModelHTTPError as e:
         raise HTTPException(
             status_code=503,
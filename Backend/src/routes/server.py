@@ -5,7 +5,7 @@ from fastapi.responses import FileResponse
 from pymongo.errors import PyMongoError
 
 from main import app
-from src.DI.container import get_db
+from src.DI.container import get_async_piece_dao, get_db
 
 
 @app.get("/")
@@ -30,9 +30,8 @@ async def health() -> dict[str, str]:
             db_status = "ok"
             pieces_info: dict[str, str | int] = {}
             try:
-                count = await asyncio.to_thread(
-                    db.pieces_collection.count_documents, {}
-                )
+                # Metadata-based estimate: O(1) regardless of collection size.
+                count = await get_async_piece_dao().count_pieces()
                 if count == 0:
                     pieces_info = {
                         "status": "empty",
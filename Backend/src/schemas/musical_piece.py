@@ -1,4 +1,5 @@
 import json
+from typing import ClassVar
 from fastapi import logger
 from pydantic import BaseModel, Field, field_validator
 
@@ -18,8 +19,20 @@ class MusicalPiece(BaseModel):
     format: str | None = None
     notes: list[dict] | None = None
     image_url: str | None = None
+    # Where the piece was scraped from and the page's HTTP validators, so a
+    # re-scrape can skip it or revalidate it with a conditional GET. Stored,
+    # but never part of API responses (see INTERNAL_FIELDS).
+    source_url: str | None = None
+    http_etag: str | None = None
+    http_last_modified: str | None = None
     db_id: str | None = Field(default=None, alias="_id")
 
+    INTERNAL_FIELDS: ClassVar[tuple[str, ...]] = (
+        "source_url",
+        "http_etag",
+        "http_last_modified",
+    )
+
     @field_validator("title")
     def title_must_not_be_empty(cls, v: str) -> str:
         if not v.strip():
@@ -0,0 +1,20 @@
+from pydantic import create_model
+
+from src.schemas.musical_piece import MusicalPiece
+
+# Fields a list or search result leaves out: the heavy `notes` array, which
+# is only served by the notes endpoint, and the crawler's bookkeeping.
+SUMMARY_EXCLUDED_FIELDS = ("notes", *MusicalPiece.INTERNAL_FIELDS)
+
+# Read model for list and search results, derived from MusicalPiece so a
+# field added there shows up here too.
+PieceSummary = create_model(
+    "PieceSummary",
+    __config__=MusicalPiece.model_config,
+    __module__=__name__,
+    **{
+        name: (field.annotation, field)
+        for name, field in MusicalPiece.model_fields.items()
+        if name not in SUMMARY_EXCLUDED_FIELDS
+    },
+)
@@ -0,0 +1,139 @@
+"""
+Async HTTP fetching for the scrapers.
+
+One keep-alive `httpx.AsyncClient` is shared by every request; a token
+bucket per host paces requests (replacing the fixed sleep between pages) and
+transient failures (connection errors, 429, 5xx) are retried with
+exponential backoff.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+from dataclasses import dataclass, field
+from typing import Mapping
+from urllib.parse import urlsplit
+
+import httpx
+from requests.compat import chardet
+
+import src.config as config
+from src.utils.rate_limit import TokenBucket
+
+USER_AGENT = "MutopiaA4Scraper/1.0 (personal use)"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def decode_html(content: bytes) -> str:
+    """
+    Decode with the detected encoding (what `requests` calls
+    `apparent_encoding`) so UTF-8 accents don't turn into mojibake.
+    """
+    encoding = chardet.detect(content).get("encoding") or "utf-8"
+    return content.decode(encoding, errors="replace")
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status: int
+    content: bytes
+    headers: Mapping[str, str] = field(default_factory=dict)
+
+    @property
+    def text(self) -> str:
+        return decode_html(self.content)
+
+
+class HostRateLimiter:
+    """One token bucket per host, created on first use."""
+
+    def __init__(self, rate: float, burst: float = 1.0) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._buckets: dict[str, TokenBucket] = {}
+
+    async def acquire(self, url: str) -> None:
+        host = urlsplit(url).netloc
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.rate, capacity=self.burst)
+        await bucket.acquire()
+
+
+class Crawler:
+    def __init__(
+        self,
+        concurrency: int = config.SCRAPPING_CONCURRENCY,
+        rate_per_host: float = config.SCRAPPING_RATE_PER_HOST,
+        retries: int = config.SCRAPPING_RETRIES,
+        backoff: float = config.SCRAPPING_BACKOFF,
+        timeout: float = 20.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.limiter = HostRateLimiter(rate_per_host)
+        self._slots = asyncio.Semaphore(concurrency)
+        self._client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            timeout=timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=concurrency, max_keepalive_connections=concurrency
+            ),
+            transport=transport,
+        )
+        self.requests = 0
+        self.retried = 0
+
+    async def __aenter__(self) -> "Crawler":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    def _delay(self, attempt: int, response: httpx.Response | None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff * 2**attempt * (1 + random.random() / 2)
+
+    async def fetch(self, url: str, headers: Mapping[str, str] | None = None) -> FetchResult:
+        """
+        GET `url`. Statuses below 400 (including 304 for conditional
+        requests) are returned; other errors raise once retries run out.
+        """
+        async with self._slots:
+            attempt = 0
+            while True:
+                await self.limiter.acquire(url)
+                self.requests += 1
+                response = None
+                try:
+                    response = await self._client.get(url, headers=headers)
+                except httpx.TransportError:
+                    if attempt >= self.retries:
+                        raise
+                else:
+                    retryable = response.status_code in RETRY_STATUSES
+                    if not retryable or attempt >= self.retries:
+                        if response.status_code >= 400:
+                            response.raise_for_status()
+                        return FetchResult(
+                            url=str(response.url),
+                            status=response.status_code,
+                            content=response.content,
+                            headers=response.headers,
+                        )
+                self.retried += 1
+                await asyncio.sleep(self._delay(attempt, response))
+                attempt += 1
+
+
+__all__ = ["Crawler", "FetchResult", "HostRateLimiter", "decode_html"]
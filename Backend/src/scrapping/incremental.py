@@ -0,0 +1,96 @@
+"""
+Incremental re-scrapes: what a previous scrape already stored.
+
+`KnownPieces` is loaded in one query over `pieces_metadata` and answers, for
+a piece page URL, whether the piece is stored and which validators to send
+with a conditional GET. Pieces scraped before `source_url` was recorded are
+recognised by their Music ID Number, whose trailing number is the
+piece-info.cgi id ("Mutopia-2008/01/28-1183" is piece-info.cgi?id=1183).
+
+Scrape modes:
+    full     fetch and upsert every listed page
+    new      only fetch pages of pieces that are not stored yet
+    changed  also revalidate stored pieces (If-None-Match /
+             If-Modified-Since); a 304 or an unchanged "Last updated" skips
+             the piece, apart from storing new validators
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Any, Iterable
+from urllib.parse import parse_qs, urlsplit
+
+SCRAPE_MODES = ("full", "new", "changed")
+
+_MUSIC_ID_PIECE = re.compile(r"-(\d+)\s*$")
+
+
+def piece_id_from_url(url: str) -> str | None:
+    """The `id` query parameter of a piece-info.cgi URL."""
+    values = parse_qs(urlsplit(url).query).get("id")
+    return values[0] if values else None
+
+
+def piece_id_from_music_id(music_id_number: str | None) -> str | None:
+    match = _MUSIC_ID_PIECE.search(music_id_number or "")
+    return match.group(1) if match else None
+
+
+@dataclass
+class KnownPiece:
+    last_updated: str | None = None
+    etag: str | None = None
+    last_modified: str | None = None
+
+    def conditional_headers(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class KnownPieces:
+    def __init__(self, states: Iterable[dict] = ()) -> None:
+        self._by_url: dict[str, KnownPiece] = {}
+        self._by_piece_id: dict[str, KnownPiece] = {}
+        for state in states:
+            self.add(state)
+
+    @classmethod
+    def load(cls, piece_dao: Any) -> "KnownPieces":
+        return cls(piece_dao.get_scrape_states())
+
+    def add(self, state: dict) -> None:
+        piece = KnownPiece(
+            last_updated=state.get("last_updated"),
+            etag=state.get("http_etag"),
+            last_modified=state.get("http_last_modified"),
+        )
+        if state.get("source_url"):
+            self._by_url[state["source_url"]] = piece
+        piece_id = piece_id_from_music_id(state.get("music_id_number"))
+        if piece_id is not None:
+            self._by_piece_id.setdefault(piece_id, piece)
+
+    def get(self, url: str) -> KnownPiece | None:
+        piece = self._by_url.get(url)
+        if piece is None:
+            piece_id = piece_id_from_url(url)
+            piece = self._by_piece_id.get(piece_id) if piece_id else None
+        return piece
+
+    def __contains__(self, url: str) -> bool:
+        return self.get(url) is not None
+
+
+__all__ = [
+    "KnownPiece",
+    "KnownPieces",
+    "SCRAPE_MODES",
+    "piece_id_from_music_id",
+    "piece_id_from_url",
+]
@@ -0,0 +1,264 @@
+"""
+Scrape jobs: crawls started from the API and tracked in `scrape_jobs`.
+
+Each job runs `mutopia.crawl` as a task on the app's event loop. Its
+progress (checkpoint, counters) is saved every
+`config.SCRAPE_JOB_CHECKPOINT_SECONDS`, which doubles as a heartbeat: a job
+whose heartbeat stops because its process died is picked up by the watcher
+of a live process and resumed from its checkpoint. One job per catalog runs
+at a time (see `ScrapeJobStore`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from concurrent.futures import Executor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable
+
+from pymongo.errors import PyMongoError
+
+import src.config as config
+from src.database.bulk_writer import BulkWriteReport, PieceBulkWriter
+from src.database.scrape_jobs import ScrapeJobStore
+from src.scrapping import parsers
+from src.scrapping.crawler import Crawler
+from src.scrapping.progress import CRAWL_COUNTERS, CrawlProgress
+
+logger = logging.getLogger(__name__)
+
+CATALOG = "mutopia"
+WRITE_COUNTERS = tuple(BulkWriteReport.__dataclass_fields__)
+
+
+def _aware(moment: datetime | None) -> datetime | None:
+    # pymongo hands back naive UTC datetimes by default.
+    if moment is not None and moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment
+
+
+@dataclass
+class _Run:
+    progress: CrawlProgress
+    writer: PieceBulkWriter
+    resumed_from: int
+    task: asyncio.Task | None = None
+    cancelled: bool = False
+
+
+class ScrapeJobManager:
+    def __init__(
+        self,
+        store: ScrapeJobStore,
+        piece_dao: Any,
+        catalog: str = CATALOG,
+        crawler_factory: Callable[[], Crawler] = Crawler,
+        crawl: Callable[..., Awaitable[dict]] | None = None,
+        executor_factory: Callable[[], Executor] = parsers.parser_pool,
+        checkpoint_seconds: float = config.SCRAPE_JOB_CHECKPOINT_SECONDS,
+        stale_seconds: float = config.SCRAPE_JOB_STALE_SECONDS,
+    ) -> None:
+        self.store = store
+        self.piece_dao = piece_dao
+        self.catalog = catalog
+        self.crawler_factory = crawler_factory
+        self._crawl = crawl
+        self.executor_factory = executor_factory
+        self.checkpoint_seconds = checkpoint_seconds
+        self.stale_seconds = stale_seconds
+        self._runs: dict[str, _Run] = {}
+        self._watcher: asyncio.Task | None = None
+        # The parse pool shared by the crawls, from start() to stop().
+        self._executor: Executor | None = None
+
+    async def start(self) -> None:
+        """Create the indexes and start resuming orphaned jobs."""
+        await self.store.ensure_indexes()
+        if self._executor is None:
+            self._executor = self.executor_factory()
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.create_task(self._watch(), name="scrape-jobs-watcher")
+
+    async def stop(self) -> None:
+        """
+        Stop the watcher and the jobs of this process. The jobs stay running
+        in Mongo and resume from their checkpoint once they look orphaned.
+        """
+        tasks = [run.task for run in self._runs.values() if run.task is not None]
+        if self._watcher is not None:
+            tasks.append(self._watcher)
+            self._watcher = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown)
+
+    async def submit(self, mode: str, max_pieces: int | None) -> dict:
+        """Start a crawl; raises ScrapeJobConflict if one is already running."""
+        job = await self.store.create(self.catalog, mode, max_pieces)
+        self._launch(job)
+        return self._report(job)
+
+    async def cancel(self, job_id: str) -> bool:
+        """Stop a running job, wherever it runs. False if it is not running."""
+        requested = await self.store.request_cancel(job_id)
+        run = self._runs.get(job_id)
+        if run is not None and run.task is not None:
+            run.cancelled = True
+            run.task.cancel()
+        return requested
+
+    async def status(self, job_id: str) -> dict | None:
+        job = await self.store.get(job_id)
+        if job is None:
+            return None
+        run = self._runs.get(job_id)
+        if run is not None:
+            job = {**job, **self._snapshot(run)}
+        return self._report(job)
+
+    async def resume_stale(self) -> list[str]:
+        """Resume every job whose process stopped sending heartbeats."""
+        resumed = []
+        while (job := await self.store.claim_stale(self.stale_seconds)) is not None:
+            if job["_id"] not in self._runs:
+                logger.info("Resuming scrape job %s at %s", job["_id"], job["checkpoint"])
+                self._launch(job)
+                resumed.append(job["_id"])
+        return resumed
+
+    async def _watch(self) -> None:
+        while True:
+            try:
+                await self.resume_stale()
+            except PyMongoError as exc:
+                logger.warning("Could not look for orphaned scrape jobs: %s", exc)
+            await asyncio.sleep(self.stale_seconds)
+
+    def _launch(self, job: dict) -> None:
+        stats = job.get("stats") or {}
+        writer = PieceBulkWriter(self.piece_dao)
+        writer.totals = BulkWriteReport(
+            **{key: stats.get(key, 0) for key in WRITE_COUNTERS}
+        )
+        run = _Run(
+            progress=CrawlProgress(
+                checkpoint=job["checkpoint"],
+                processed=job["processed"],
+                stats={key: stats.get(key, 0) for key in CRAWL_COUNTERS},
+            ),
+            writer=writer,
+            resumed_from=job["processed"],
+        )
+        self._runs[job["_id"]] = run
+        run.task = asyncio.create_task(self._run(job, run), name=f"scrape-{job['_id']}")
+
+    def _snapshot(self, run: _Run) -> dict:
+        progress = run.progress
+        return {
+            "checkpoint": progress.checkpoint,
+            "processed": progress.processed,
+            "resumed_from": run.resumed_from,
+            "total": progress.total,
+            "stats": {**progress.stats, **asdict(run.writer.totals)},
+            "stages": progress.stage_report(),
+        }
+
+    async def _crawl_catalog(self, **options) -> dict:
+        if self._crawl is not None:
+            return await self._crawl(**options)
+        # Imported here: mutopia builds its DAO from the container, which builds us.
+        from src.scrapping import mutopia
+
+        return await mutopia.crawl(**options)
+
+    async def _run(self, job: dict, run: _Run) -> None:
+        job_id = job["_id"]
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, run))
+        status, error = "done", None
+        try:
+            async with self.crawler_factory() as crawler:
+                await self._crawl_catalog(
+                    max_pieces=job["max_pieces"],
+                    crawler=crawler,
+                    writer=run.writer,
+                    mode=job["mode"],
+                    progress=run.progress,
+                    executor=self._executor,
+                )
+        except asyncio.CancelledError:
+            heartbeat.cancel()
+            # Keep what was already parsed, whatever the reason for stopping.
+            await self._flush(run)
+            if not run.cancelled:
+                # Shutdown: the job stays running and resumes from here.
+                await self.store.checkpoint(job_id, **self._snapshot(run))
+                self._runs.pop(job_id, None)
+                raise
+            status = "cancelled"
+        except Exception as exc:
+            logger.warning("Scrape job %s failed: %s", job_id, exc)
+            status, error = "failed", str(exc) or type(exc).__name__
+        heartbeat.cancel()
+        await self.store.finish(job_id, status, error, **self._snapshot(run))
+        self._runs.pop(job_id, None)
+
+    async def _flush(self, run: _Run) -> None:
+        try:
+            await asyncio.to_thread(run.progress.flush, run.writer)
+        except Exception as exc:
+            logger.warning("Could not write the last scraped pieces: %s", exc)
+
+    async def _heartbeat(self, job_id: str, run: _Run) -> None:
+        while True:
+            await asyncio.sleep(self.checkpoint_seconds)
+            try:
+                job = await self.store.checkpoint(job_id, **self._snapshot(run))
+            except PyMongoError as exc:
+                logger.warning("Could not checkpoint scrape job %s: %s", job_id, exc)
+                continue
+            if job is None or job.get("cancel_requested"):
+                # Cancelled through another process (or taken over).
+                run.cancelled = True
+                run.task.cancel()
+                return
+
+    def _report(self, job: dict) -> dict:
+        """The job record with its throughput and time to completion."""
+        now = datetime.now(timezone.utc)
+        started_at = _aware(job["started_at"])
+        finished_at = _aware(job.get("finished_at"))
+        elapsed = ((finished_at or now) - started_at).total_seconds()
+        done = job["processed"] - job.get("resumed_from", 0)
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if job["status"] == "running" and job["total"] is not None and rate > 0:
+            eta = round((job["total"] - job["processed"]) / rate, 1)
+        stats = job.get("stats") or {}
+        return {
+            "id": job["_id"],
+            "catalog": job["catalog"],
+            "mode": job["mode"],
+            "status": job["status"],
+            "max_pieces": job["max_pieces"],
+            "checkpoint": job["checkpoint"],
+            "processed": job["processed"],
+            "total": job["total"],
+            "errors": stats.get("errors", 0),
+            "pages_per_second": round(rate, 2),
+            "eta_seconds": eta,
+            "stats": stats,
+            "stages": job.get("stages") or {},
+            "error": job.get("error"),
+            "created_at": _aware(job["created_at"]),
+            "started_at": started_at,
+            "finished_at": finished_at,
+        }
+
+
+__all__ = ["CATALOG", "ScrapeJobManager"]
@@ -1,14 +1,26 @@
-import time
+import asyncio
+import logging
+from concurrent.futures import Executor
+from dataclasses import asdict, dataclass
+from typing import Callable
 from urllib.parse import urljoin
 
 import requests
-from bs4 import BeautifulSoup, NavigableString
+from bs4 import BeautifulSoup
 
+import src.config as config
 from src.DI.container import get_piece_dao
+from src.database.bulk_writer import BulkWriteReport, PieceBulkWriter
 from src.schemas.musical_piece import MusicalPiece
-from src.utils import util
+from src.scrapping import parsers
+from src.scrapping.crawler import Crawler, FetchResult
+from src.scrapping.incremental import SCRAPE_MODES, KnownPiece, KnownPieces
+from src.scrapping.pipeline import Pipeline, Stage
+from src.scrapping.progress import CrawlProgress
 from src.scrapping.image_api import search_images
 
+logger = logging.getLogger(__name__)
+
 piece_dao = get_piece_dao()
 
 BASE_URL = "https://www.mutopiaproject.org/"
@@ -30,7 +42,14 @@ def _make_soup(resp: requests.Response) -> BeautifulSoup:
         or "utf-8"
     )
     resp.encoding = encoding
-    return BeautifulSoup(resp.text, "html.parser")
+    return parsers.make_soup(resp.text, config.SCRAPPING_PARSER)
+
+
+def parse_piece_list(soup: BeautifulSoup, base_url: str = BASE_URL) -> list[str]:
+    """
+    Piece page URLs listed in piece-list.html, deduplicated in page order.
+    """
+    return parsers.piece_list_from_soup(soup, base_url)
 
 
 def get_piece_pages():
@@ -39,24 +58,7 @@ def get_piece_pages():
     """
     resp = session.get(PIECE_LIST_URL, timeout=20)
     resp.raise_for_status()
-    soup = _make_soup(resp)
-
-    urls = []
-    # Dans piece-list.html, chaque pièce est un lien numéroté vers cgibin/piece-info.cgi?id=XXX
-    for a in soup.find_all("a", href=True):
-        href = a["href"]
-        if "piece-info.cgi" in href:
-            full_url = urljoin(BASE_URL, href)
-            urls.append(full_url)
-
-    # supprimer les doublons en conservant l’ordre
-    seen = set()
-    unique_urls = []
-    for u in urls:
-        if u not in seen:
-            seen.add(u)
-            unique_urls.append(u)
-    return unique_urls
+    return parse_piece_list(_make_soup(resp))
 
 
 def fetch_piece_page(piece_url):
@@ -70,14 +72,7 @@ def find_pdf_link(piece_url, soup=None):
     Finds PDF link on the piece page.
     """
     soup = soup or fetch_piece_page(piece_url)
-
-    a_tag = soup.find("a", string=util.is_pdf_text)
-    if not a_tag:
-        return None
-
-    pdf_href = a_tag.get("href")
-    pdf_url = urljoin(piece_url, pdf_href)
-    return pdf_url
+    return parsers.pdf_link_from_soup(piece_url, soup)
 
 
 def extract_piece_metadata(piece_url, soup=None, allowed_keys=None) -> MusicalPiece:
@@ -85,107 +80,213 @@ def extract_piece_metadata(piece_url, soup=None, allowed_keys=None) -> MusicalPi
     Extract metadata from a piece page and return as MusicalPiece model.
     """
     soup = soup or fetch_piece_page(piece_url)
-    payload = {}
-
-    # Grab title and composer from the page header (h2/h4).
-    title_tag = soup.find("h2")
-    if title_tag:
-        payload["title"] = title_tag.get_text(strip=True)
-
-    composer_tag = soup.find("h4")
-    if composer_tag:
-        composer_text = composer_tag.get_text(" ", strip=True)
-        if composer_text.lower().startswith("by "):
-            composer_text = composer_text[3:].strip()
-        # Fix common mojibake for en dash ranges (e.g., 1784–1849)
-        composer_text = composer_text.replace("â\x80\x93", "-")
-        payload["composer"] = composer_text or None
-
-    table = soup.find("table", class_=lambda c: c and "result-table" in c.split())
-    if not table:
-        raise ValueError("No metadata table found on piece page")
-
-    table_label_to_key = {
-        "Instrument(s)": "instruments",
-        "Style": "style",
-        "Opus": "opus",
-        "Date of composition": "date_of_composition",
-        "Source": "source",
-        "Copyright": "copyright",
-        "Last updated": "last_updated",
-        "Music ID Number": "music_id_number",
-    }
-
-    # allowed_keys = set(allowed_keys) if allowed_keys else None
-    for td in table.find_all("td"):
-        label_tag = td.find("b")
-        if not label_tag:
-            continue
-        label = label_tag.get_text(strip=True).rstrip(":")
-        key = table_label_to_key.get(label)
-        # Skip unknown labels to avoid inserting None keys into metadata
-        if not key:
-            continue
-        # if not key or (allowed_keys is not None and key not in allowed_keys):
-        #     continue
-        # Prefer the text right after the label, fallback to the rest of the cell
-        value_node = label_tag.next_sibling
-        if isinstance(value_node, NavigableString):
-            value = str(value_node)
-        else:
-            value = td.get_text(" ", strip=True)
-            value = value.replace(label_tag.get_text(" ", strip=True), "", 1)
-        payload[key] = value.strip(' \n\t"') or None
-
-    pdf_url = find_pdf_link(piece_url, soup=soup)
-    if pdf_url:
-        payload["pdf_url"] = pdf_url
-        payload["format"] = "PDF"
-
-    return MusicalPiece.model_validate(payload)
-
-
-def start_scrapping(max_pieces=None, delay=1.0):
-    piece_pages = get_piece_pages()
-    if max_pieces is not None:
-        piece_pages = piece_pages[:max_pieces]
-
-    print(f"Found {len(piece_pages)} piece pages")
-
-    for i, url in enumerate(piece_pages, start=1):
-        print(f"[{i}/{len(piece_pages)}] {url}")
-        try:
-            soup = fetch_piece_page(url)
-            metadata = extract_piece_metadata(url, soup=soup)
-
-            print(f"  Metadata extracted. {len(metadata.model_dump())} fields found.")
-            if metadata:
-                print(f"  Metadata: {metadata}")
-                try:
-                    metadata.image_url = search_images(
-                        f"{metadata.style} {metadata.composer} music sheet {metadata.instruments}"
-                    )
-                except Exception as exc:
-                    print("  Image lookup failed:", exc)
-
-                # Skip insert if we already have the piece (dedupe on music_id_number or pdf_url).
-                duplicate = None
-                if metadata.music_id_number:
-                    duplicate = piece_dao.get_piece_by_music_id_number(
-                        metadata.music_id_number
-                    )
-                if not duplicate and metadata.pdf_url:
-                    duplicate = piece_dao.get_piece_by_pdf_url(metadata.pdf_url)
-
-                if duplicate:
-                    print(
-                        "  Skipping insert; already exists with _id:",
-                        duplicate.get("_id"),
-                    )
-                    delay = 0
-                else:
-                    piece_dao.insert_object_to_db(metadata)
-
-        except Exception as e:
-            print("  Error:", e)
-        time.sleep(delay)
+    return parsers.piece_from_soup(piece_url, soup)
+
+
+def attach_image(metadata: MusicalPiece) -> None:
+    """Pick a cover image (kept only if the piece is new, see bulk_writer)."""
+    try:
+        metadata.image_url = search_images(
+            f"{metadata.style} {metadata.composer} music sheet {metadata.instruments}"
+        )
+    except Exception as exc:
+        print("  Image lookup failed:", exc)
+
+
+def _print_batch(report: BulkWriteReport) -> None:
+    print(
+        f"  Batch written: {report.inserted} inserted, {report.updated} updated, "
+        f"{report.skipped} unchanged, {report.failed} failed"
+    )
+
+
+def _record_source(metadata: MusicalPiece, url: str, page: FetchResult) -> None:
+    metadata.source_url = url
+    metadata.http_etag = page.headers.get("ETag")
+    metadata.http_last_modified = page.headers.get("Last-Modified")
+
+
+def _print_stages(report: dict[str, dict]) -> None:
+    print(
+        f"  {'stage':<8} {'items':>5} {'errors':>7} {'busy(s)':>8} "
+        f"{'starved(s)':>11} {'blocked(s)':>11} {'queue peak':>11}"
+    )
+    for name, stage in report.items():
+        print(
+            f"  {name:<8} {stage['items']:>5} {stage['errors']:>7} "
+            f"{stage['busy_seconds']:>8.2f} {stage['starved_seconds']:>11.2f} "
+            f"{stage['blocked_seconds']:>11.2f} {stage['queue_peak']:>11}"
+        )
+
+
+@dataclass
+class _Page:
+    """A listed piece page on its way through the crawl pipeline."""
+
+    index: int
+    position: int
+    url: str
+    stored: KnownPiece | None = None
+    page: FetchResult | None = None
+    piece: MusicalPiece | None = None
+
+
+async def crawl(
+    max_pieces: int | None = None,
+    crawler: Crawler | None = None,
+    piece_list_url: str = PIECE_LIST_URL,
+    writer: PieceBulkWriter | None = None,
+    enrich: Callable[[MusicalPiece], None] = attach_image,
+    mode: str = "full",
+    known: KnownPieces | None = None,
+    progress: CrawlProgress | None = None,
+    parse_workers: int = config.SCRAPPING_PARSE_WORKERS,
+    enrich_workers: int = config.SCRAPPING_ENRICH_WORKERS,
+    queue_size: int = config.SCRAPPING_QUEUE_SIZE,
+    parser: str = config.SCRAPPING_PARSER,
+    executor: Executor | None = None,
+) -> dict:
+    """
+    Fetch piece-list.html, then run the piece pages through a pipeline of
+    bounded queues: fetch (`crawler.concurrency` workers, paced by the
+    crawler's per-host rate limit) -> parse -> enrich (`enrich`, e.g. the
+    image lookup) -> write (batched upserts by `writer`). Per-stage timings
+    are printed at the end and kept on `progress.pipeline`.
+
+    Pages are parsed with the `parser` backend (see `parsers`) in
+    `executor`, by default a pool of `parse_workers` processes (see
+    `parsers.parser_pool`) so parsing neither holds the GIL nor blocks the
+    event loop; scrape jobs share one pool for the app's lifetime. `enrich` and the
+    writer run in threads.
+
+    In "new" and "changed" modes (see `incremental`) the stored pieces are
+    loaded up front (or taken from `known`): "new" skips their pages
+    without fetching them, "changed" revalidates them with conditional GETs.
+
+    A `progress` carried over from an interrupted crawl resumes it from its
+    checkpoint, with `max_pieces` counting the pages it already processed.
+    """
+    if mode not in SCRAPE_MODES:
+        raise ValueError(f"Unknown scrape mode {mode!r}, expected one of {SCRAPE_MODES}")
+    backend = parsers.resolve_backend(parser)
+    logger.info("Parsing pages with %s (%s requested)", backend, parser)
+    writer = writer or PieceBulkWriter(piece_dao, on_batch=_print_batch)
+    progress = progress or CrawlProgress()
+    if mode != "full" and known is None:
+        known = await asyncio.to_thread(KnownPieces.load, writer.piece_dao)
+    stats = progress.stats
+    owned = crawler is None
+    crawler = crawler or Crawler()
+    owned_executor = executor is None
+    executor = executor or parsers.parser_pool(parse_workers)
+    loop = asyncio.get_running_loop()
+    try:
+        listing = await crawler.fetch(piece_list_url)
+        piece_pages = await loop.run_in_executor(
+            executor,
+            parsers.parse_piece_list_page,
+            listing.content,
+            piece_list_url,
+            backend,
+        )
+        # (position in the listing, url), from the checkpoint on.
+        todo = list(enumerate(piece_pages))[progress.checkpoint :]
+        if mode == "new":
+            stats["known"] = 0
+            for position, url in todo:
+                if url in known:
+                    stats["known"] += 1
+                    progress.skip(position)
+            todo = [(position, url) for position, url in todo if url not in known]
+        if max_pieces is not None:
+            todo = todo[: max(max_pieces - progress.processed, 0)]
+        progress.total = progress.processed + len(todo)
+        print(f"Found {len(todo)} piece pages")
+
+        async def fetch(item: _Page) -> _Page | None:
+            print(f"[{item.index}/{len(todo)}] {item.url}")
+            headers = item.stored.conditional_headers() if item.stored else None
+            item.page = await crawler.fetch(item.url, headers=headers or None)
+            if item.page.status == 304:
+                stats["unchanged"] += 1
+                progress.handled(item.position)
+                return None
+            return item
+
+        async def parse(item: _Page) -> _Page | None:
+            item.piece = await loop.run_in_executor(
+                executor, parsers.parse_piece_page, item.url, item.page.content, backend
+            )
+            stats["pages"] += 1
+            stored = item.stored
+            _record_source(item.piece, item.url, item.page)
+            if stored and stored.last_updated and (
+                item.piece.last_updated == stored.last_updated
+            ):
+                # Keep the validators current, or every later run downloads
+                # the page again after sending stale ones.
+                if (item.piece.http_etag, item.piece.http_last_modified) != (
+                    stored.etag,
+                    stored.last_modified,
+                ):
+                    await asyncio.to_thread(writer.add_validators, item.piece)
+                stats["unchanged"] += 1
+                progress.handled(item.position)
+                return None
+            item.page = None  # the HTML is no longer needed
+            return item
+
+        async def enrich_piece(item: _Page) -> _Page:
+            # A stored piece keeps its cover image (insert-only field).
+            if item.stored is None:
+                await asyncio.to_thread(enrich, item.piece)
+            return item
+
+        async def write(item: _Page) -> None:
+            await asyncio.to_thread(progress.write, writer, item.piece, item.position)
+
+        def on_error(stage: str, item: _Page, exc: Exception) -> None:
+            stats["errors"] += 1
+            print(f"  {stage.capitalize()} failed for {item.url}:", exc)
+            # A page whose write failed stays before the checkpoint: a resume retries it.
+            if stage != "write":
+                progress.handled(item.position)
+
+        pipeline = Pipeline(
+            [
+                Stage("fetch", fetch, crawler.concurrency),
+                Stage("parse", parse, parse_workers),
+                Stage("enrich", enrich_piece, enrich_workers),
+                Stage("write", write),
+            ],
+            queue_size=queue_size,
+            on_error=on_error,
+        )
+        progress.pipeline = pipeline
+        await pipeline.run(
+            _Page(
+                index,
+                position,
+                url,
+                stored=known.get(url) if mode == "changed" else None,
+            )
+            for index, (position, url) in enumerate(todo, start=1)
+        )
+        await asyncio.to_thread(progress.flush, writer)
+        _print_stages(pipeline.report())
+    finally:
+        if owned:
+            await crawler.aclose()
+        if owned_executor:
+            await asyncio.to_thread(executor.shutdown)
+    return {**stats, **asdict(writer.totals)}
+
+
+def start_scrapping(max_pieces=None, rate=config.SCRAPPING_RATE_PER_HOST, mode="full"):
+    """Blocking entry point for scripts; the API runs crawls as scrape jobs (see jobs)."""
+
+    async def _run() -> dict:
+        async with Crawler(rate_per_host=rate) as crawler:
+            return await crawl(max_pieces, crawler=crawler, mode=mode)
+
+    return asyncio.run(_run())
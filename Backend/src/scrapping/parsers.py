@@ -0,0 +1,272 @@
+"""
+HTML parser backends for Mutopia pages.
+
+"html.parser" (BeautifulSoup's pure-Python builder, always available) is the
+reference. "lxml" (BeautifulSoup on the lxml builder) and "selectolax" (the
+lexbor C parser, without BeautifulSoup) are optional and only used when
+installed; asking for a missing one falls back to "html.parser". Every
+backend must build the same MusicalPiece from a page, which
+`benchmarks.parser_backends` checks on the saved fixture pages.
+
+The module-level `parse_*` functions take and return picklable values, so
+the crawler can run them in a process pool (see `parser_pool`).
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, NavigableString
+
+from src.schemas.musical_piece import MusicalPiece
+from src.scrapping.crawler import decode_html
+from src.utils import util
+
+logger = logging.getLogger(__name__)
+
+# Fastest first: "auto" picks the first one installed.
+PARSER_BACKENDS = ("selectolax", "lxml", "html.parser")
+
+TABLE_LABEL_TO_KEY = {
+    "Instrument(s)": "instruments",
+    "Style": "style",
+    "Opus": "opus",
+    "Date of composition": "date_of_composition",
+    "Source": "source",
+    "Copyright": "copyright",
+    "Last updated": "last_updated",
+    "Music ID Number": "music_id_number",
+}
+
+
+def available_backends() -> list[str]:
+    # Backend names double as the module they need (html.parser is stdlib).
+    return [
+        name
+        for name in PARSER_BACKENDS
+        if name == "html.parser" or importlib.util.find_spec(name) is not None
+    ]
+
+
+def resolve_backend(name: str = "auto") -> str:
+    """The backend to use for `name` ("auto" or one of PARSER_BACKENDS)."""
+    if name != "auto" and name not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser {name!r}, expected one of {PARSER_BACKENDS}")
+    available = available_backends()
+    if name == "auto":
+        return available[0]
+    if name not in available:
+        logger.warning("Parser %s is not installed, using html.parser", name)
+        return "html.parser"
+    return name
+
+
+def parser_pool(max_workers: int | None = None) -> ProcessPoolExecutor:
+    """
+    A process pool for the `parse_*` functions. Its workers are spawned, not
+    forked: a fork of the app would copy its Mongo clients, threads and
+    locks mid-use.
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def _text(html: str | bytes) -> str:
+    return decode_html(html) if isinstance(html, bytes) else html
+
+
+def make_soup(html: str | bytes, backend: str = "auto") -> BeautifulSoup:
+    """
+    BeautifulSoup of a page on the `backend` builder. selectolax has no
+    BeautifulSoup builder: its soups use the next fastest one installed.
+    """
+    backend = resolve_backend(backend)
+    if backend == "selectolax":
+        backend = "lxml" if "lxml" in available_backends() else "html.parser"
+    return BeautifulSoup(_text(html), backend)
+
+
+# --- BeautifulSoup (html.parser, lxml) ----------------------------------------
+
+
+def piece_list_from_soup(soup: BeautifulSoup, base_url: str) -> list[str]:
+    urls = []
+    # Dans piece-list.html, chaque pièce est un lien numéroté vers cgibin/piece-info.cgi?id=XXX
+    for a in soup.find_all("a", href=True):
+        href = a["href"]
+        if "piece-info.cgi" in href:
+            full_url = urljoin(base_url, href)
+            urls.append(full_url)
+
+    # supprimer les doublons en conservant l’ordre
+    return list(dict.fromkeys(urls))
+
+
+def pdf_link_from_soup(piece_url: str, soup: BeautifulSoup) -> str | None:
+    a_tag = soup.find("a", string=util.is_pdf_text)
+    if not a_tag:
+        return None
+
+    pdf_href = a_tag.get("href")
+    pdf_url = urljoin(piece_url, pdf_href)
+    return pdf_url
+
+
+def piece_from_soup(piece_url: str, soup: BeautifulSoup) -> MusicalPiece:
+    payload = {}
+
+    # Grab title and composer from the page header (h2/h4).
+    title_tag = soup.find("h2")
+    if title_tag:
+        payload["title"] = title_tag.get_text(strip=True)
+
+    composer_tag = soup.find("h4")
+    if composer_tag:
+        payload["composer"] = _composer(composer_tag.get_text(" ", strip=True))
+
+    table = soup.find("table", class_=lambda c: c and "result-table" in c.split())
+    if not table:
+        raise ValueError("No metadata table found on piece page")
+
+    for td in table.find_all("td"):
+        label_tag = td.find("b")
+        if not label_tag:
+            continue
+        label = label_tag.get_text(strip=True).rstrip(":")
+        key = TABLE_LABEL_TO_KEY.get(label)
+        # Skip unknown labels to avoid inserting None keys into metadata
+        if not key:
+            continue
+        # Prefer the text right after the label, fallback to the rest of the cell
+        value_node = label_tag.next_sibling
+        if isinstance(value_node, NavigableString):
+            value = str(value_node)
+        else:
+            value = td.get_text(" ", strip=True)
+            value = value.replace(label_tag.get_text(" ", strip=True), "", 1)
+        payload[key] = value.strip(' \n\t"') or None
+
+    return _piece(payload, pdf_link_from_soup(piece_url, soup))
+
+
+def _composer(text: str) -> str | None:
+    if text.lower().startswith("by "):
+        text = text[3:].strip()
+    # Fix common mojibake for en dash ranges (e.g., 1784–1849)
+    text = text.replace("â\x80\x93", "-")
+    return text or None
+
+
+def _piece(payload: dict, pdf_url: str | None) -> MusicalPiece:
+    if pdf_url:
+        payload["pdf_url"] = pdf_url
+        payload["format"] = "PDF"
+    return MusicalPiece.model_validate(util.repair_text_fields(payload))
+
+
+# --- selectolax ---------------------------------------------------------------
+
+
+def _string(node) -> str | None:
+    """BeautifulSoup's `Tag.string`: the text of a node with a single child."""
+    children = list(node.iter(include_text=True))
+    if len(children) != 1:
+        return None
+    child = children[0]
+    return child.text_content if child.tag == "-text" else _string(child)
+
+
+def _selectolax_tree(html: str):
+    from selectolax.lexbor import LexborHTMLParser
+
+    return LexborHTMLParser(html)
+
+
+def _selectolax_piece(piece_url: str, html: str) -> MusicalPiece:
+    tree = _selectolax_tree(html)
+    payload = {}
+
+    title_tag = tree.css_first("h2")
+    if title_tag:
+        payload["title"] = title_tag.text(strip=True)
+
+    composer_tag = tree.css_first("h4")
+    if composer_tag:
+        payload["composer"] = _composer(composer_tag.text(separator=" ", strip=True))
+
+    table = tree.css_first("table.result-table")
+    if not table:
+        raise ValueError("No metadata table found on piece page")
+
+    for td in table.css("td"):
+        label_tag = td.css_first("b")
+        if not label_tag:
+            continue
+        label = label_tag.text(strip=True).rstrip(":")
+        key = TABLE_LABEL_TO_KEY.get(label)
+        if not key:
+            continue
+        value_node = label_tag.next
+        if value_node is not None and value_node.tag == "-text":
+            value = value_node.text_content
+        else:
+            value = td.text(separator=" ", strip=True)
+            value = value.replace(label_tag.text(separator=" ", strip=True), "", 1)
+        payload[key] = value.strip(' \n\t"') or None
+
+    pdf_url = None
+    for a_tag in tree.css("a"):
+        if util.is_pdf_text(_string(a_tag)):
+            pdf_url = urljoin(piece_url, a_tag.attributes.get("href"))
+            break
+    return _piece(payload, pdf_url)
+
+
+def _selectolax_piece_list(html: str, base_url: str) -> list[str]:
+    urls = (a.attributes.get("href") or "" for a in _selectolax_tree(html).css("a[href]"))
+    return list(
+        dict.fromkeys(urljoin(base_url, href) for href in urls if "piece-info.cgi" in href)
+    )
+
+
+# --- entry points -------------------------------------------------------------
+
+
+def parse_piece_page(
+    piece_url: str, html: str | bytes, backend: str = "html.parser"
+) -> MusicalPiece:
+    """MusicalPiece of a piece page (bytes are decoded like FetchResult.text)."""
+    html = _text(html)
+    if backend == "selectolax":
+        return _selectolax_piece(piece_url, html)
+    return piece_from_soup(piece_url, BeautifulSoup(html, backend))
+
+
+def parse_piece_list_page(
+    html: str | bytes, base_url: str, backend: str = "html.parser"
+) -> list[str]:
+    """Piece page URLs listed in piece-list.html, deduplicated in page order."""
+    html = _text(html)
+    if backend == "selectolax":
+        return _selectolax_piece_list(html, base_url)
+    return piece_list_from_soup(BeautifulSoup(html, backend), base_url)
+
+
+__all__ = [
+    "PARSER_BACKENDS",
+    "TABLE_LABEL_TO_KEY",
+    "available_backends",
+    "make_soup",
+    "parse_piece_list_page",
+    "parse_piece_page",
+    "parser_pool",
+    "pdf_link_from_soup",
+    "piece_from_soup",
+    "piece_list_from_soup",
+    "resolve_backend",
+]
@@ -0,0 +1,142 @@
+"""
+Bounded producer/consumer pipeline for the crawler.
+
+Items go through a chain of stages, each with its own workers reading from a
+bounded queue. When a stage falls behind, the queue in front of it fills up
+and the stages upstream block on `put`, so the number of items in flight
+stays capped at the queue sizes plus the workers, however slow the slowest
+stage is.
+
+Every stage records how long its workers were busy, starved (waiting for
+input) and blocked (waiting for room downstream): the bottleneck is the
+stage that is busy while the ones before it are blocked.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable
+
+import src.config as config
+
+# Tells a worker its input is exhausted.
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    name: str
+    # Returns the item for the next stage, or None when it is done with it.
+    func: Callable[[Any], Awaitable[Any]]
+    workers: int = 1
+
+
+@dataclass
+class StageStats:
+    workers: int = 1
+    items: int = 0
+    dropped: int = 0
+    errors: int = 0
+    busy: float = 0.0
+    starved: float = 0.0
+    blocked: float = 0.0
+    queue_peak: int = 0
+
+    def as_dict(self) -> dict:
+        done = self.items + self.errors
+        return {
+            "workers": self.workers,
+            "items": self.items,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy, 3),
+            "starved_seconds": round(self.starved, 3),
+            "blocked_seconds": round(self.blocked, 3),
+            "mean_ms": round(self.busy / done * 1000, 1) if done else None,
+            "queue_peak": self.queue_peak,
+        }
+
+
+class Pipeline:
+    def __init__(
+        self,
+        stages: list[Stage],
+        queue_size: int = config.SCRAPPING_QUEUE_SIZE,
+        on_error: Callable[[str, Any, Exception], None] | None = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.stages = stages
+        self.queue_size = queue_size
+        self.on_error = on_error
+        self._clock = clock
+        self.stats = {stage.name: StageStats(workers=stage.workers) for stage in stages}
+
+    def report(self) -> dict[str, dict]:
+        return {name: stats.as_dict() for name, stats in self.stats.items()}
+
+    async def run(self, items: Iterable[Any]) -> None:
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        running = [stage.workers for stage in self.stages]
+
+        async def feed() -> None:
+            for item in items:
+                await self._put(queues[0], item, self.stats[self.stages[0].name])
+            for _ in range(self.stages[0].workers):
+                await queues[0].put(_DONE)
+
+        async def work(index: int) -> None:
+            stage = self.stages[index]
+            stats = self.stats[stage.name]
+            inbox = queues[index]
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+            downstream = self.stats[self.stages[index + 1].name] if outbox else None
+            while True:
+                start = self._clock()
+                item = await inbox.get()
+                stats.starved += self._clock() - start
+                if item is _DONE:
+                    break
+                start = self._clock()
+                try:
+                    result = await stage.func(item)
+                except Exception as exc:
+                    stats.busy += self._clock() - start
+                    stats.errors += 1
+                    if self.on_error is not None:
+                        self.on_error(stage.name, item, exc)
+                    continue
+                stats.busy += self._clock() - start
+                stats.items += 1
+                if result is None:
+                    stats.dropped += 1
+                elif outbox is not None:
+                    start = self._clock()
+                    await self._put(outbox, result, downstream)
+                    stats.blocked += self._clock() - start
+            # The last worker out closes the next stage's input.
+            running[index] -= 1
+            if running[index] == 0 and outbox is not None:
+                for _ in range(self.stages[index + 1].workers):
+                    await outbox.put(_DONE)
+
+        tasks = [asyncio.create_task(feed())] + [
+            asyncio.create_task(work(index))
+            for index, stage in enumerate(self.stages)
+            for _ in range(stage.workers)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    async def _put(queue: asyncio.Queue, item: Any, stats: StageStats) -> None:
+        await queue.put(item)
+        stats.queue_peak = max(stats.queue_peak, queue.qsize())
+
+
+__all__ = ["Pipeline", "Stage", "StageStats"]
@@ -0,0 +1,80 @@
+"""
+Progress of a crawl, shared between its workers and the job running it.
+
+The checkpoint is a position in the piece listing: every page before it has
+been handled (skipped, failed or parsed) and every piece parsed from those
+pages has been flushed to Mongo, so a crawl restarted from the checkpoint
+loses nothing. Pieces still buffered in the writer hold the checkpoint back
+until their batch is written.
+"""
+
+from __future__ import annotations
+
+import threading
+
+from src.database.bulk_writer import PieceBulkWriter
+from src.schemas.musical_piece import MusicalPiece
+from src.scrapping.pipeline import Pipeline
+
+CRAWL_COUNTERS = ("pages", "errors", "known", "unchanged")
+
+
+class CrawlProgress:
+    def __init__(
+        self, checkpoint: int = 0, processed: int = 0, stats: dict | None = None
+    ) -> None:
+        self.checkpoint = checkpoint
+        # Listed pages handled so far (known pages skipped in "new" mode excluded).
+        self.processed = processed
+        self.total: int | None = None
+        self.stats = dict.fromkeys(CRAWL_COUNTERS, 0) | (stats or {})
+        # Set by the crawl; its per-stage timings show the bottleneck.
+        self.pipeline: Pipeline | None = None
+        # Written from the event loop and from writer threads.
+        self._lock = threading.Lock()
+        self._handled: set[int] = set()
+        self._unwritten: list[int] = []
+
+    def skip(self, position: int) -> None:
+        """A listed page the crawl does not need to fetch."""
+        with self._lock:
+            self._mark([position])
+
+    def handled(self, position: int) -> None:
+        """A page done with, that produced nothing to write."""
+        with self._lock:
+            self.processed += 1
+            self._mark([position])
+
+    def write(self, writer: PieceBulkWriter, piece: MusicalPiece, position: int) -> None:
+        """Hand a piece to `writer`; its page counts once its batch is flushed."""
+        with self._lock:
+            try:
+                flushed = writer.add(piece) is not None
+            except Exception:
+                # The failed batch is gone: its pages must never be marked.
+                self._unwritten = []
+                raise
+            self.processed += 1
+            self._unwritten.append(position)
+            if flushed:
+                self._mark(self._unwritten)
+                self._unwritten = []
+
+    def stage_report(self) -> dict[str, dict]:
+        return self.pipeline.report() if self.pipeline is not None else {}
+
+    def flush(self, writer: PieceBulkWriter) -> None:
+        with self._lock:
+            unwritten, self._unwritten = self._unwritten, []
+            writer.flush()
+            self._mark(unwritten)
+
+    def _mark(self, positions: list[int]) -> None:
+        self._handled.update(positions)
+        while self.checkpoint in self._handled:
+            self._handled.discard(self.checkpoint)
+            self.checkpoint += 1
+
+
+__all__ = ["CRAWL_COUNTERS", "CrawlProgress"]
@@ -0,0 +1,179 @@
+"""
+Typeahead suggestions for titles, composers, styles and instruments.
+
+Each field keeps one sorted array of normalized keys, one key per word start
+of every distinct value ("Frédéric Chopin" -> "frederic chopin", "chopin"),
+so a prefix lookup is a binary search plus a short forward scan. Keys are
+truncated and scans are capped, which bounds both memory and lookup time.
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import re
+import threading
+from typing import Iterable
+
+from src.utils.util import INSTRUMENT_SEPARATORS, fix_mojibake, normalize_key
+
+AUTOCOMPLETE_FIELDS = ("title", "composer", "style", "instruments")
+
+MAX_KEY_LENGTH = 48
+MAX_WORD_STARTS = 6
+MAX_SCAN = 256
+
+WORD_START = re.compile(r"\b\w")
+
+
+def _normalize(text: str) -> str:
+    return normalize_key(fix_mojibake(text))
+
+
+def field_values(doc: dict, field: str) -> list[str]:
+    """Suggestable values of one field; instruments are split per instrument."""
+    value = doc.get(field)
+    if not isinstance(value, str):
+        return []
+    if field == "instruments":
+        return [part.strip() for part in INSTRUMENT_SEPARATORS.split(value) if part.strip()]
+    return [value.strip()] if value.strip() else []
+
+
+def _keys(normalized: str, position: int) -> list[tuple[str, tuple[int, int]]]:
+    """Index keys of a value: one per word start, with the word rank."""
+    starts = [m.start() for m in WORD_START.finditer(normalized)][:MAX_WORD_STARTS]
+    return [
+        (normalized[start : start + MAX_KEY_LENGTH], (position, rank))
+        for rank, start in enumerate(starts)
+    ]
+
+
+class PrefixIndex:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._values: list[str] = []
+        self._normalized: list[str] = []
+        self._positions: dict[str, int] = {}
+        # Parallel sorted arrays: key, and (value position, word rank).
+        self._keys: list[str] = []
+        self._entries: list[tuple[int, int]] = []
+        # Positions of removed values, reused by the next ones added.
+        self._free: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def rebuild(self, values: Iterable[str]) -> None:
+        with self._lock:
+            self._reset()
+            pairs: list[tuple[str, tuple[int, int]]] = []
+            for value in values:
+                pairs.extend(self._register(value))
+            pairs.sort()
+            self._keys = [key for key, _entry in pairs]
+            self._entries = [entry for _key, entry in pairs]
+
+    def add(self, value: str) -> None:
+        with self._lock:
+            for key, entry in self._register(value):
+                index = bisect.bisect_right(self._keys, key)
+                self._keys.insert(index, key)
+                self._entries.insert(index, entry)
+
+    def remove(self, value: str) -> None:
+        with self._lock:
+            position = self._positions.pop(value, None)
+            if position is None:
+                return
+            for key, entry in _keys(self._normalized[position], position):
+                start = bisect.bisect_left(self._keys, key)
+                end = bisect.bisect_right(self._keys, key, start)
+                index = self._entries.index(entry, start, end)
+                del self._keys[index]
+                del self._entries[index]
+            self._values[position] = ""
+            self._normalized[position] = ""
+            self._free.append(position)
+
+    def _register(self, value: str) -> list[tuple[str, tuple[int, int]]]:
+        normalized = _normalize(value)
+        if not normalized or value in self._positions:
+            return []
+        if self._free:
+            position = self._free.pop()
+            self._values[position] = value
+            self._normalized[position] = normalized
+        else:
+            position = len(self._values)
+            self._values.append(value)
+            self._normalized.append(normalized)
+        self._positions[value] = position
+        return _keys(normalized, position)
+
+    def matches(self, prefix: str, limit: int = 10) -> list[tuple[int, str]]:
+        """
+        `(word rank, value)` pairs for values with a word starting with
+        `prefix`; matches on the first word (rank 0) come first.
+        """
+        return self._matches(_normalize(prefix), limit)
+
+    def _matches(self, needle: str, limit: int) -> list[tuple[int, str]]:
+        if not needle:
+            return []
+        probe = needle[:MAX_KEY_LENGTH]
+        with self._lock:
+            start = bisect.bisect_left(self._keys, probe)
+            stop = min(start + MAX_SCAN, len(self._keys))
+            end = bisect.bisect_left(self._keys, probe + "\U0010ffff", start, stop)
+            best: dict[int, int] = {}
+            for position, rank in self._entries[start:end]:
+                if len(needle) > MAX_KEY_LENGTH and needle not in self._normalized[position]:
+                    continue
+                if rank < best.get(position, MAX_WORD_STARTS):
+                    best[position] = rank
+            ranked = heapq.nsmallest(
+                limit, best, key=lambda p: (best[p], len(self._values[p]), self._values[p])
+            )
+            return [(best[p], self._values[p]) for p in ranked]
+
+
+class AutocompleteIndex:
+    def __init__(self, fields: Iterable[str] = AUTOCOMPLETE_FIELDS) -> None:
+        self.fields = {field: PrefixIndex() for field in fields}
+
+    def rebuild(self, docs: Iterable[dict]) -> None:
+        docs = list(docs)
+        for field, index in self.fields.items():
+            index.rebuild(value for doc in docs for value in field_values(doc, field))
+
+    def add(self, doc: dict) -> None:
+        for field, index in self.fields.items():
+            for value in field_values(doc, field):
+                index.add(value)
+
+    def suggest(
+        self, prefix: str, field: str | None = None, limit: int = 10
+    ) -> list[dict]:
+        """
+        Up to `limit` `{"field", "value"}` suggestions, from one field or
+        merged across all of them (first-word matches, then shorter values).
+        """
+        needle = _normalize(prefix)
+        fields = [field] if field is not None else list(self.fields)
+        candidates = [
+            (rank, len(value), order, value, name)
+            for order, name in enumerate(fields)
+            for rank, value in self.fields[name]._matches(needle, limit)
+        ]
+        candidates.sort()
+        return [
+            {"field": name, "value": value}
+            for _rank, _length, _order, value, name in candidates[:limit]
+        ]
+
+
+__all__ = ["AUTOCOMPLETE_FIELDS", "AutocompleteIndex", "PrefixIndex", "field_values"]
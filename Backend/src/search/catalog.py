@@ -0,0 +1,88 @@
+"""In-memory views of the piece catalog, kept in step with repository writes."""
+
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from typing import Iterable
+
+from src.search.autocomplete import AutocompleteIndex, field_values
+from src.search.fuzzy import FuzzyMatcher
+from src.search.search_index import SearchIndex
+
+# Fields the in-memory views are built from (also the rebuild projection).
+CATALOG_FIELDS = ("title", "composer", "style", "instruments")
+
+
+class CatalogIndex:
+    def __init__(self) -> None:
+        self.search = SearchIndex()
+        self.composers = FuzzyMatcher()
+        self.titles = FuzzyMatcher()
+        self.autocomplete = AutocompleteIndex()
+        self.ready = False
+        # The value sets (fuzzy matchers, autocomplete) hold each value once:
+        # count the pieces using it, so an update only drops a value that no
+        # other piece still has. Writes come from the scraper thread too.
+        self._views = {
+            "composer": self.composers,
+            "title": self.titles,
+            **{f"autocomplete:{name}": index for name, index in self.autocomplete.fields.items()},
+        }
+        self._lock = threading.Lock()
+        self._pieces: dict[str, Counter] = {}
+        self._uses: Counter = Counter()
+
+    def _values(self, doc: dict) -> Counter:
+        values = Counter(
+            (name, doc.get(name))
+            for name in ("composer", "title")
+            if isinstance(doc.get(name), str)
+        )
+        for field in self.autocomplete.fields:
+            values.update((f"autocomplete:{field}", v) for v in field_values(doc, field))
+        return values
+
+    def rebuild(self, docs: Iterable[dict]) -> None:
+        docs = list(docs)
+        with self._lock:
+            self._pieces = {}
+            self._uses = Counter()
+            for doc in docs:
+                values = self._values(doc)
+                self._uses.update(values)
+                if doc.get("_id") is not None:
+                    self._pieces[str(doc["_id"])] = values
+            self.search.rebuild(docs)
+            for name, view in self._views.items():
+                view.rebuild(value for view_name, value in self._uses if view_name == name)
+        self.ready = True
+
+    def on_write(self, event: str, doc: dict) -> None:
+        """Repository write listener (see BaseRepository.add_write_listener)."""
+        if event not in ("insert", "update"):
+            return
+        if doc.get("_id") is None and event == "update":
+            # Documents not known: rebuild from Mongo before the next lookup.
+            self.ready = False
+            return
+        values = self._values(doc)
+        with self._lock:
+            self.search.on_write(event, doc)
+            previous = Counter()
+            if doc.get("_id") is not None:
+                previous = self._pieces.get(str(doc["_id"]), Counter())
+                self._pieces[str(doc["_id"])] = values
+            for key in (values - previous) + (previous - values):
+                before = self._uses[key]
+                after = before + values[key] - previous[key]
+                if after:
+                    self._uses[key] = after
+                else:
+                    del self._uses[key]
+                    self._views[key[0]].remove(key[1])
+                if not before:
+                    self._views[key[0]].add(key[1])
+
+
+__all__ = ["CATALOG_FIELDS", "CatalogIndex"]
@@ -0,0 +1,185 @@
+"""
+Typo-tolerant matching of composer names and titles ("Shopin" -> Chopin).
+
+Candidates come from a trigram index over the words of every known value and
+are then ranked by edit distance, so a lookup touches a handful of words
+instead of the whole catalog.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from typing import Iterable
+
+from src.search.search_index import tokenize
+
+MIN_WORD_LENGTH = 2
+MAX_CANDIDATES = 48
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent
+    transpositions), returning `max_distance + 1` as soon as it is exceeded.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous2: list[int] = []
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, start=1):
+            cost = ca != cb
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def allowed_distance(word: str) -> int:
+    # One typo for short words, roughly one more per extra four letters.
+    return max(1, (len(word) - 1) // 4)
+
+
+def _trigrams(word: str) -> set[str]:
+    padded = f"  {word} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyMatcher:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._values: list[str] = []
+        self._positions: dict[str, int] = {}
+        self._value_words: list[list[str]] = []
+        self._word_values: dict[str, set[int]] = {}
+        self._trigram_words: dict[str, set[str]] = {}
+        # Positions of removed values, reused by the next ones added.
+        self._free: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def rebuild(self, values: Iterable[str | None]) -> None:
+        with self._lock:
+            self._reset()
+            for value in values:
+                self._add(value)
+
+    def add(self, value: str | None) -> None:
+        with self._lock:
+            self._add(value)
+
+    def _add(self, value: str | None) -> None:
+        if not isinstance(value, str) or value in self._positions:
+            return
+        words = [w for w in tokenize(value) if len(w) >= MIN_WORD_LENGTH and not w.isdigit()]
+        if not words:
+            return
+        if self._free:
+            position = self._free.pop()
+            self._values[position] = value
+            self._value_words[position] = words
+        else:
+            position = len(self._values)
+            self._values.append(value)
+            self._value_words.append(words)
+        self._positions[value] = position
+        for word in words:
+            if word not in self._word_values:
+                self._word_values[word] = set()
+                for trigram in _trigrams(word):
+                    self._trigram_words.setdefault(trigram, set()).add(word)
+            self._word_values[word].add(position)
+
+    def remove(self, value: str | None) -> None:
+        with self._lock:
+            position = self._positions.pop(value, None)
+            if position is None:
+                return
+            for word in self._value_words[position]:
+                positions = self._word_values[word]
+                positions.discard(position)
+                if positions:
+                    continue
+                del self._word_values[word]
+                for trigram in _trigrams(word):
+                    words = self._trigram_words[trigram]
+                    words.discard(word)
+                    if not words:
+                        del self._trigram_words[trigram]
+            self._values[position] = ""
+            self._value_words[position] = []
+            self._free.append(position)
+
+    def _similar_words(self, word: str) -> dict[str, float]:
+        """Known words within the allowed edit distance, with a 0..1 similarity."""
+        if word in self._word_values:
+            return {word: 1.0}
+        shared: Counter = Counter()
+        for trigram in _trigrams(word):
+            shared.update(self._trigram_words.get(trigram, ()))
+        limit = allowed_distance(word)
+        similar: dict[str, float] = {}
+        for candidate, _count in shared.most_common(MAX_CANDIDATES):
+            distance = edit_distance(word, candidate, limit)
+            if distance <= limit:
+                similar[candidate] = 1 - distance / max(len(word), len(candidate))
+        return similar
+
+    def match(self, query: str, limit: int = 10) -> list[tuple[str, float]]:
+        """
+        Rank known values by how well every query word matches one of their
+        words, allowing typos. Returns `(value, score)` with score in 0..1.
+        """
+        words = [w for w in tokenize(query) if len(w) >= MIN_WORD_LENGTH]
+        if not words:
+            return []
+        with self._lock:
+            scores: dict[int, float] | None = None
+            for word in words:
+                best: dict[int, float] = {}
+                for candidate, similarity in self._similar_words(word).items():
+                    for position in self._word_values[candidate]:
+                        if similarity > best.get(position, 0.0):
+                            best[position] = similarity
+                if scores is None:
+                    scores = best
+                else:
+                    scores = {p: scores[p] + s for p, s in best.items() if p in scores}
+                if not scores:
+                    return []
+            # Prefer values that are mostly made of the query words.
+            ranked = sorted(
+                scores.items(),
+                key=lambda item: (
+                    -item[1],
+                    len(self._value_words[item[0]]),
+                    self._values[item[0]],
+                ),
+            )
+            return [
+                (self._values[position], score / len(words))
+                for position, score in ranked[:limit]
+            ]
+
+    def resolve(self, query: str) -> list[str]:
+        """
+        Canonical value(s) for a possibly misspelled query: the best match
+        plus any value tied with it (e.g. several spellings of one name).
+        """
+        matches = self.match(query)
+        if not matches:
+            return []
+        top = matches[0][1]
+        return [value for value, score in matches if score == top]
+
+
+__all__ = ["FuzzyMatcher", "allowed_distance", "edit_distance"]
@@ -0,0 +1,209 @@
+"""
+In-process inverted index with BM25 ranking for /pieces/search.
+
+The catalog is small enough (thousands of pieces) to keep postings in memory;
+the index is rebuilt at startup and kept current through the repositories'
+write listeners. A re-indexed document frees its slot for the next one added,
+so updates do not grow the index.
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any, Iterable, NamedTuple
+
+from src.utils.util import fix_mojibake, normalize_key
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Title matches matter most, then composer, then style; instruments rarely
+# identify a piece on their own.
+FIELD_BOOSTS = {"title": 3.0, "composer": 2.0, "style": 1.0, "instruments": 0.5}
+
+# Partial words (the user is still typing) count less than whole-word hits.
+PREFIX_WEIGHT = 0.6
+MAX_PREFIX_EXPANSIONS = 64
+
+
+class SearchHits(NamedTuple):
+    total: int
+    ids: list[Any]
+
+
+def tokenize(text: Any) -> list[str]:
+    if not isinstance(text, str):
+        return []
+    return TOKEN_PATTERN.findall(normalize_key(fix_mojibake(text)))
+
+
+class SearchIndex:
+    def __init__(
+        self,
+        field_boosts: dict[str, float] | None = None,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ) -> None:
+        self.field_boosts = field_boosts or FIELD_BOOSTS
+        self.k1 = k1
+        self.b = b
+        # Writes come from the scraper thread, reads from the event loop.
+        self._lock = threading.Lock()
+        self.ready = False
+        self._reset()
+
+    def _reset(self) -> None:
+        self._ids: list[Any] = []
+        self._slots: dict[str, int] = {}
+        # Slots of removed documents, reused by the next ones added.
+        self._free: list[int] = []
+        self._doc_terms: list[dict[str, Counter] | None] = []
+        self._lengths: list[dict[str, int]] = []
+        self._postings: dict[str, dict[str, dict[int, int]]] = {
+            field: {} for field in self.field_boosts
+        }
+        self._total_length: dict[str, int] = dict.fromkeys(self.field_boosts, 0)
+        self._vocabulary: list[str] = []
+        self._live = 0
+
+    def __len__(self) -> int:
+        return self._live
+
+    def rebuild(self, docs: Iterable[dict]) -> None:
+        with self._lock:
+            self._reset()
+            for doc in docs:
+                self._add(doc)
+            self.ready = True
+
+    def add(self, doc: dict) -> None:
+        with self._lock:
+            self._add(doc)
+
+    def on_write(self, event: str, doc: dict) -> None:
+        """Repository write listener: index inserted pieces, re-index updated ones."""
+        if event in ("insert", "update") and doc.get("_id") is not None:
+            self.add(doc)
+
+    def _add(self, doc: dict) -> None:
+        key = str(doc["_id"])
+        if key in self._slots:
+            self._remove(self._slots.pop(key))
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._ids)
+            self._ids.append(None)
+            self._doc_terms.append(None)
+            self._lengths.append({})
+        self._ids[slot] = doc["_id"]
+        self._slots[key] = slot
+        terms: dict[str, Counter] = {}
+        lengths: dict[str, int] = {}
+        for field in self.field_boosts:
+            counts = Counter(tokenize(doc.get(field)))
+            terms[field] = counts
+            lengths[field] = sum(counts.values())
+            self._total_length[field] += lengths[field]
+            postings = self._postings[field]
+            for term, tf in counts.items():
+                if term not in postings:
+                    postings[term] = {}
+                    index = bisect.bisect_left(self._vocabulary, term)
+                    if index == len(self._vocabulary) or self._vocabulary[index] != term:
+                        self._vocabulary.insert(index, term)
+                postings[term][slot] = tf
+        self._doc_terms[slot] = terms
+        self._lengths[slot] = lengths
+        self._live += 1
+
+    def _remove(self, slot: int) -> None:
+        terms = self._doc_terms[slot]
+        if terms is None:
+            return
+        for field, counts in terms.items():
+            self._total_length[field] -= self._lengths[slot][field]
+            postings = self._postings[field]
+            for term in counts:
+                postings[term].pop(slot, None)
+                if not postings[term]:
+                    del postings[term]
+                    self._forget(term)
+        self._ids[slot] = None
+        self._doc_terms[slot] = None
+        self._lengths[slot] = {}
+        self._free.append(slot)
+        self._live -= 1
+
+    def _forget(self, term: str) -> None:
+        """Drop a term from the vocabulary once no field indexes it."""
+        if any(term in postings for postings in self._postings.values()):
+            return
+        index = bisect.bisect_left(self._vocabulary, term)
+        if index < len(self._vocabulary) and self._vocabulary[index] == term:
+            del self._vocabulary[index]
+
+    def _expansions(self, token: str) -> list[tuple[str, float]]:
+        expansions = [(token, 1.0)]
+        start = bisect.bisect_left(self._vocabulary, token)
+        for term in self._vocabulary[start : start + MAX_PREFIX_EXPANSIONS + 1]:
+            if not term.startswith(token):
+                break
+            if term != token:
+                expansions.append((term, PREFIX_WEIGHT))
+        return expansions
+
+    def _term_scores(self, term: str, weight: float) -> dict[int, float]:
+        scores: dict[int, float] = {}
+        for field, boost in self.field_boosts.items():
+            postings = self._postings[field].get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (self._live - df + 0.5) / (df + 0.5))
+            avg_length = self._total_length[field] / self._live or 1.0
+            for slot, tf in postings.items():
+                length = self._lengths[slot][field]
+                norm = tf * (self.k1 + 1) / (
+                    tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                )
+                scores[slot] = scores.get(slot, 0.0) + weight * boost * idf * norm
+        return scores
+
+    def search(self, query: str, limit: int | None = None, offset: int = 0) -> SearchHits:
+        """
+        Rank pieces matching every query word (as a whole word or a prefix)
+        by field-boosted BM25. Returns the total hit count and one page of ids.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            if not tokens or not self._live:
+                return SearchHits(total=0, ids=[])
+            totals: dict[int, float] | None = None
+            for token in tokens:
+                best: dict[int, float] = {}
+                for term, weight in self._expansions(token):
+                    for slot, score in self._term_scores(term, weight).items():
+                        if score > best.get(slot, 0.0):
+                            best[slot] = score
+                if totals is None:
+                    totals = best
+                else:
+                    totals = {
+                        slot: totals[slot] + score
+                        for slot, score in best.items()
+                        if slot in totals
+                    }
+                if not totals:
+                    return SearchHits(total=0, ids=[])
+            ranked = sorted(totals, key=lambda slot: (-totals[slot], slot))
+            end = None if limit is None else offset + limit
+            return SearchHits(
+                total=len(ranked), ids=[self._ids[slot] for slot in ranked[offset:end]]
+            )
+
+
+__all__ = ["SearchHits", "SearchIndex", "tokenize"]
@@ -0,0 +1,254 @@
+"""
+Compact columnar encoding for Tone.js note events.
+
+A list like `[{"time": "0:1:2", "note": "G4", "duration": "8n", "velocity": 0.8}]`
+is packed as one row per sounding pitch (chords become several rows at the
+same tick) into little-endian columns:
+
+    header    b"NT", version u8, ppq u16, rows u32
+    time      u32 ticks from the start (4/4, `PPQ` ticks per quarter note)
+    pitch     u8 MIDI number
+    duration  u32 ticks (0 = no duration given)
+    velocity  u8 hundredths (255 = no velocity given)
+
+Decoding yields canonical Tone.js values ("0:1:2", "G4", "8n", 0.8). By
+default encoding is exact: any event that would not decode back to itself
+raises `NotesEncodingError` and should be stored as JSON instead, whether it
+cannot be represented at all (times in seconds, unknown durations, extra
+keys) or only in another form (`"0:1"` for `"0:1:0"`, `"Db4"` for `"C#4"`, a
+chord, a velocity off the 1/100 grid). `exact=False` accepts the latter and
+canonicalizes them, for clients that only need equivalent events.
+"""
+
+from __future__ import annotations
+
+import re
+import struct
+from typing import Any
+
+PPQ = 192
+MAGIC = b"NT"
+VERSION = 1
+HEADER = struct.Struct("<2sBHI")
+
+NO_DURATION = 0
+NO_VELOCITY = 255
+
+BEATS_PER_BAR = 4
+SIXTEENTH = PPQ // 4
+EVENT_KEYS = {"time", "note", "duration", "velocity"}
+
+NOTE_NAMES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+SEMITONES = {"C": 0, "D": 2, "E": 4, "F": 5, "G": 7, "A": 9, "B": 11}
+ACCIDENTALS = {"": 0, "#": 1, "##": 2, "x": 2, "b": -1, "bb": -2}
+PITCH_PATTERN = re.compile(r"^([A-Ga-g])(##|#|x|bb|b)?(-?\d)$")
+DURATION_PATTERN = re.compile(r"^(\d+)([ntm])(\.?)$")
+TICKS_PATTERN = re.compile(r"^(\d+)i$")
+
+PITCH_NAMES = [f"{NOTE_NAMES[m % 12]}{m // 12 - 1}" for m in range(128)]
+VELOCITIES = [v / 100 for v in range(256)]
+
+
+class NotesEncodingError(ValueError):
+    """Raised when note events cannot be packed without losing information."""
+
+
+def _canonical_durations() -> dict[int, str]:
+    names: dict[int, str] = {}
+    for division in (1, 2, 4, 8, 16, 32, 64):
+        ticks = 4 * PPQ // division
+        names.setdefault(ticks, f"{division}n")
+        names.setdefault(ticks * 3 // 2, f"{division}n.")
+        if ticks * 2 % 3 == 0:
+            names.setdefault(ticks * 2 // 3, f"{division}t")
+    return names
+
+
+DURATION_NAMES = _canonical_durations()
+
+
+def pitch_to_midi(name: str) -> int:
+    match = PITCH_PATTERN.match(name.strip()) if isinstance(name, str) else None
+    if match is None:
+        raise NotesEncodingError(f"unsupported pitch {name!r}")
+    letter, accidental, octave = match.groups()
+    midi = (int(octave) + 1) * 12 + SEMITONES[letter.upper()] + ACCIDENTALS[accidental or ""]
+    if not 0 <= midi <= 127:
+        raise NotesEncodingError(f"pitch {name!r} is outside the MIDI range")
+    return midi
+
+
+def time_to_ticks(value: Any) -> int:
+    """'bars:beats:sixteenths' (beats and sixteenths optional) -> ticks."""
+    if not isinstance(value, str):
+        raise NotesEncodingError(f"unsupported time {value!r}")
+    parts = value.strip().split(":")
+    if not 1 <= len(parts) <= 3:
+        raise NotesEncodingError(f"unsupported time {value!r}")
+    try:
+        bars, beats, sixteenths = (float(p) for p in parts + ["0"] * (3 - len(parts)))
+    except ValueError:
+        raise NotesEncodingError(f"unsupported time {value!r}") from None
+    ticks = ((bars * BEATS_PER_BAR + beats) * 4 + sixteenths) * SIXTEENTH
+    if ticks < 0 or ticks != int(ticks) or ticks > 0xFFFFFFFF:
+        raise NotesEncodingError(f"time {value!r} is not on the tick grid")
+    return int(ticks)
+
+
+def _bar_offset(ticks: int) -> str:
+    beats, rest = divmod(ticks, PPQ)
+    sixteenths = rest / SIXTEENTH
+    return f"{beats}:{int(sixteenths) if sixteenths.is_integer() else sixteenths}"
+
+
+# "beats:sixteenths" for every tick inside a bar, so decoding a time is one
+# divmod and one string join.
+BAR_OFFSETS = [_bar_offset(ticks) for ticks in range(BEATS_PER_BAR * PPQ)]
+
+
+def ticks_to_time(ticks: int) -> str:
+    bars, rest = divmod(ticks, BEATS_PER_BAR * PPQ)
+    return f"{bars}:{BAR_OFFSETS[rest]}"
+
+
+def duration_to_ticks(value: Any) -> int:
+    if value is None:
+        return NO_DURATION
+    if isinstance(value, str):
+        text = value.strip()
+        if match := DURATION_PATTERN.match(text):
+            division, kind, dotted = int(match.group(1)), match.group(2), match.group(3)
+            if division == 0:
+                raise NotesEncodingError(f"unsupported duration {value!r}")
+            ticks = 4 * PPQ * division if kind == "m" else 4 * PPQ / division
+            if kind == "t":
+                ticks = ticks * 2 / 3
+            if dotted:
+                ticks = ticks * 3 / 2
+            if ticks == int(ticks) and 0 < ticks <= 0xFFFFFFFF:
+                return int(ticks)
+        elif match := TICKS_PATTERN.match(text):
+            if 0 < int(match.group(1)) <= 0xFFFFFFFF:
+                return int(match.group(1))
+        elif ":" in text:
+            ticks = time_to_ticks(text)
+            if ticks:
+                return ticks
+    raise NotesEncodingError(f"unsupported duration {value!r}")
+
+
+def ticks_to_duration(ticks: int) -> str:
+    return DURATION_NAMES.get(ticks, f"{ticks}i")
+
+
+def velocity_to_byte(value: Any) -> int:
+    if value is None:
+        return NO_VELOCITY
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 1:
+        raise NotesEncodingError(f"unsupported velocity {value!r}")
+    return round(value * 100)
+
+
+def _decoded_event(ticks: int, pitch: int, duration: int, velocity: int) -> dict:
+    event: dict = {"time": ticks_to_time(ticks), "note": PITCH_NAMES[pitch]}
+    if duration != NO_DURATION:
+        event["duration"] = ticks_to_duration(duration)
+    if velocity != NO_VELOCITY:
+        event["velocity"] = VELOCITIES[velocity]
+    return event
+
+
+def encode_notes(events: list[dict], exact: bool = True) -> bytes:
+    times: list[int] = []
+    pitches: list[int] = []
+    durations: list[int] = []
+    velocities: list[int] = []
+    for event in events:
+        if not isinstance(event, dict) or not set(event) <= EVENT_KEYS:
+            raise NotesEncodingError(f"unsupported event {event!r}")
+        names = event.get("note")
+        names = names if isinstance(names, list) else [names]
+        if not names:
+            raise NotesEncodingError(f"event without pitch {event!r}")
+        ticks = time_to_ticks(event.get("time", "0:0:0"))
+        duration = duration_to_ticks(event.get("duration"))
+        velocity = velocity_to_byte(event.get("velocity"))
+        for name in names:
+            pitch = pitch_to_midi(name)
+            if exact and (decoded := _decoded_event(ticks, pitch, duration, velocity)) != event:
+                raise NotesEncodingError(f"event {event!r} would decode as {decoded!r}")
+            times.append(ticks)
+            pitches.append(pitch)
+            durations.append(duration)
+            velocities.append(velocity)
+    rows = len(times)
+    return b"".join(
+        (
+            HEADER.pack(MAGIC, VERSION, PPQ, rows),
+            struct.pack(f"<{rows}I", *times),
+            bytes(pitches),
+            struct.pack(f"<{rows}I", *durations),
+            bytes(velocities),
+        )
+    )
+
+
+def decode_notes(data: bytes) -> list[dict]:
+    try:
+        magic, version, ppq, rows = HEADER.unpack_from(data)
+    except struct.error:
+        raise NotesEncodingError("truncated notes header") from None
+    if magic != MAGIC or version != VERSION or ppq != PPQ:
+        raise NotesEncodingError("unknown notes encoding")
+    if len(data) != HEADER.size + rows * 10:
+        raise NotesEncodingError("notes payload has the wrong length")
+    offset = HEADER.size
+    times = struct.unpack_from(f"<{rows}I", data, offset)
+    offset += 4 * rows
+    pitches = data[offset : offset + rows]
+    offset += rows
+    durations = struct.unpack_from(f"<{rows}I", data, offset)
+    offset += 4 * rows
+    velocities = data[offset : offset + rows]
+
+    # Rows share few distinct values: format each once, then build the dicts.
+    time_names = {ticks: ticks_to_time(ticks) for ticks in set(times)}
+    duration_names = {ticks: ticks_to_duration(ticks) for ticks in set(durations)}
+    rows_iter = zip(times, pitches, durations, velocities)
+    if NO_DURATION not in duration_names and NO_VELOCITY not in velocities:
+        return [
+            {
+                "time": time_names[ticks],
+                "note": PITCH_NAMES[pitch],
+                "duration": duration_names[duration],
+                "velocity": VELOCITIES[velocity],
+            }
+            for ticks, pitch, duration, velocity in rows_iter
+        ]
+    events: list[dict] = []
+    for ticks, pitch, duration, velocity in rows_iter:
+        event: dict = {"time": time_names[ticks], "note": PITCH_NAMES[pitch]}
+        if duration != NO_DURATION:
+            event["duration"] = duration_names[duration]
+        if velocity != NO_VELOCITY:
+            event["velocity"] = VELOCITIES[velocity]
+        events.append(event)
+    return events
+
+
+def try_encode_notes(events: Any) -> bytes | None:
+    """Exact packed form of `events`, or None when they must stay JSON."""
+    if not isinstance(events, list):
+        return None
+    try:
+        return encode_notes(events)
+    except NotesEncodingError:
+        return None
+
+
+__all__ = [
+    "NotesEncodingError",
+    "decode_notes",
+    "encode_notes",
+    "try_encode_notes",
+]
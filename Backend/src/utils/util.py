@@ -1,5 +1,7 @@
 import asyncio
 import os
+import re
+import unicodedata
 from pymongo import MongoClient
 import logging
 
@@ -45,6 +47,43 @@ def fix_mojibake(text: str) -> str:
         return text
 
 
+def repair_text_fields(payload: dict) -> dict:
+    """
+    Copy of `payload` with `fix_mojibake` applied to every string value; run
+    once when a document is ingested so reads can serve stored text as is.
+    """
+    return {
+        key: fix_mojibake(value) if isinstance(value, str) else value
+        for key, value in payload.items()
+    }
+
+
+def normalize_key(text: str) -> str:
+    """
+    Lookup key for free-text values: accents folded, case-folded and
+    whitespace collapsed (e.g. ' Pièces  Romantiques' -> 'pieces romantiques').
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    folded = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(folded.casefold().split())
+
+
+INSTRUMENT_SEPARATORS = re.compile(r"\s*(?:/|,|&|\+|\band\b)\s*", re.IGNORECASE)
+
+
+def split_instruments(text: str) -> list[str]:
+    """
+    Tokenize Mutopia's joined instrument field ('Piano/Violin', 'Voice, Piano')
+    into normalized keys, keeping the original order and dropping duplicates.
+    """
+    keys: list[str] = []
+    for part in INSTRUMENT_SEPARATORS.split(text):
+        key = normalize_key(part)
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
 def download_pdf(pdf_url, dest_dir):
     """
     Télécharge un PDF vers dest_dir en gardant le nom de fichier.
@@ -1,16 +1,21 @@
 import re
 import sys
+from collections import Counter
 from pathlib import Path
 from types import SimpleNamespace
 from typing import Any, Iterable
 
 from bs4 import BeautifulSoup
+from bson import ObjectId
+from pymongo import InsertOne
 
 # Ensure the project root is on sys.path so `import src...` works in tests.
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+from src.database.pagination import Page  # noqa: E402
+
 
 class FakeCollection:
     def __init__(self, docs: Iterable[dict] | None = None):
@@ -22,34 +27,274 @@ class FakeCollection:
         self.inserted.append(doc)
         self.docs.append(doc)
 
+    def count_documents(self, query: dict) -> int:
+        return sum(1 for doc in self.docs if _matches(doc, query))
+
+    def estimated_document_count(self) -> int:
+        return len(self.docs)
+
+    def bulk_write(self, operations: list, ordered: bool = True) -> SimpleNamespace:
+        result = {"nInserted": 0, "nMatched": 0, "nModified": 0, "upserted": []}
+        for index, operation in enumerate(operations):
+            if isinstance(operation, InsertOne):
+                operation._doc.setdefault("_id", ObjectId())
+                self.docs.append(operation._doc)
+                result["nInserted"] += 1
+                continue
+            doc = next((d for d in self.docs if _matches(d, operation._filter)), None)
+            if doc is None:
+                if operation._upsert:
+                    doc = {"_id": ObjectId(), **_upsert_document(operation._filter)}
+                    _apply_update(doc, operation._doc, inserting=True)
+                    self.docs.append(doc)
+                    result["upserted"].append({"index": index, "_id": doc["_id"]})
+                continue
+            before = dict(doc)
+            _apply_update(doc, operation._doc)
+            result["nMatched"] += 1
+            result["nModified"] += doc != before
+        return SimpleNamespace(
+            modified_count=result["nModified"], bulk_api_result=result
+        )
+
+    def find_one(self, query: dict, projection: dict | None = None) -> dict | None:
+        self.find_one_projections = getattr(self, "find_one_projections", []) + [projection]
+        return next(iter(self.find(query, projection)), None)
+
+    def update_one(
+        self, query: dict, update: dict, upsert: bool = False
+    ) -> SimpleNamespace:
+        for doc in self.docs:
+            if _matches(doc, query):
+                _apply_update(doc, update)
+                return SimpleNamespace(modified_count=1, upserted_id=None)
+        if not upsert:
+            return SimpleNamespace(modified_count=0, upserted_id=None)
+        doc = _upsert_document(query)
+        _apply_update(doc, update, inserting=True)
+        self.docs.append(doc)
+        return SimpleNamespace(modified_count=0, upserted_id=doc.get("_id"))
+
+    def update_many(self, query: dict, update: dict) -> SimpleNamespace:
+        matched = [doc for doc in self.docs if _matches(doc, query)]
+        for doc in matched:
+            _apply_update(doc, update)
+        return SimpleNamespace(modified_count=len(matched))
+
+    def find_one_and_update(
+        self,
+        query: dict,
+        update: dict,
+        sort: list[tuple[str, int]] | None = None,
+        return_document: bool = False,
+    ) -> dict | None:
+        matched = [doc for doc in self.docs if _matches(doc, query)]
+        for key, direction in reversed(sort or []):
+            matched.sort(key=lambda doc: doc.get(key), reverse=direction < 0)
+        if not matched:
+            return None
+        before = dict(matched[0])
+        _apply_update(matched[0], update)
+        return dict(matched[0]) if return_document else before
+
+    def distinct(self, field: str) -> list:
+        self.distinct_calls = getattr(self, "distinct_calls", 0) + 1
+        return list(dict.fromkeys(doc[field] for doc in self.docs if field in doc))
+
     def delete_many(self, query: dict) -> None:
         self.deleted_queries.append(query)
         self.docs.clear()
 
-    def find(self, query: dict) -> list[dict]:
-        results: list[dict] = []
-        if "title" in query:
-            regex = query["title"]["$regex"]
-            flags = query["title"].get("$options") == "i"
-            matcher = re.compile(regex, re.IGNORECASE if flags else 0)
-            for doc in self.docs:
-                if matcher.search(doc.get("title", "")):
-                    results.append(dict(doc))
-        elif "style" in query:
-            candidates = set(query["style"].get("$in", []))
-            for doc in self.docs:
-                if doc.get("style") in candidates:
-                    results.append(dict(doc))
-        return results
+    def find(self, query: dict, projection: dict | None = None) -> list[dict]:
+        return [
+            _project(doc, projection) for doc in self.docs if _matches(doc, query)
+        ]
+
+
+def _upsert_document(query: dict) -> dict:
+    """Equality fields of an upsert filter, as Mongo seeds the new document."""
+    return {
+        k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)
+    }
+
+
+def _apply_update(doc: dict, update: dict, inserting: bool = False) -> None:
+    """Tiny subset of the update operators used by the repositories."""
+    doc.update(update.get("$set", {}))
+    if inserting:
+        doc.update(update.get("$setOnInsert", {}))
+    for key in update.get("$unset", {}):
+        doc.pop(key, None)
+    for key, amount in update.get("$inc", {}).items():
+        doc[key] = doc.get(key, 0) + amount
+    for key, value in update.get("$max", {}).items():
+        if key not in doc or value > doc[key]:
+            doc[key] = value
+
+
+def _matches(doc: dict, query: dict) -> bool:
+    """Tiny subset of the Mongo query language used by the repositories."""
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(_matches(doc, sub) for sub in condition):
+                return False
+            continue
+        if key == "$and":
+            if not all(_matches(doc, sub) for sub in condition):
+                return False
+            continue
+        value = doc.get(key)
+        values = value if isinstance(value, list) else [value]
+        if not isinstance(condition, dict):
+            if condition not in values:
+                return False
+            continue
+        if "$regex" in condition:
+            flags = re.IGNORECASE if condition.get("$options") == "i" else 0
+            matcher = re.compile(condition["$regex"], flags)
+            if not any(isinstance(v, str) and matcher.search(v) for v in values):
+                return False
+        if "$in" in condition and not set(values) & set(condition["$in"]):
+            return False
+        if "$gt" in condition and not (value is not None and value > condition["$gt"]):
+            return False
+        if "$lt" in condition and not (value is not None and value < condition["$lt"]):
+            return False
+        if "$exists" in condition and (key in doc) != condition["$exists"]:
+            return False
+        if condition.get("$type") == "string" and not isinstance(value, str):
+            return False
+        if condition.get("$type") == "array" and not isinstance(value, list):
+            return False
+        if "$ne" in condition and condition["$ne"] in values:
+            return False
+    return True
+
+
+def _aggregate(docs: list[dict], pipeline: list[dict]) -> list[dict]:
+    """Tiny subset of the aggregation stages used by the repositories."""
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            docs = [doc for doc in docs if _matches(doc, spec)]
+        elif name == "$facet":
+            docs = [{key: _aggregate(docs, sub) for key, sub in spec.items()}]
+        elif name == "$sortByCount":
+            counts = Counter(doc.get(spec.lstrip("$")) for doc in docs)
+            docs = [{"_id": value, "count": count} for value, count in counts.most_common()]
+        elif name == "$count":
+            docs = [{spec: len(docs)}] if docs else []
+        else:
+            raise NotImplementedError(name)
+    return docs
+
+
+def _project(doc: dict, projection: dict | None) -> dict:
+    if not projection:
+        return dict(doc)
+    included = {key for key, flag in projection.items() if flag}
+    if included:
+        keep_id = projection.get("_id", 1)
+        return {k: v for k, v in doc.items() if k in included or (k == "_id" and keep_id)}
+    return {k: v for k, v in doc.items() if k not in projection}
+
+
+class FakeAsyncCursor:
+    def __init__(self, docs: list[dict]):
+        self._all = list(docs)
+        self._docs = iter(self._all)
+
+    def sort(self, key: str, direction: int = 1) -> "FakeAsyncCursor":
+        self._all.sort(key=lambda doc: doc.get(key), reverse=direction < 0)
+        self._docs = iter(self._all)
+        return self
+
+    def batch_size(self, size: int) -> "FakeAsyncCursor":
+        return self
+
+    def limit(self, count: int) -> "FakeAsyncCursor":
+        self._all = self._all[:count]
+        self._docs = iter(self._all)
+        return self
+
+    async def to_list(self, length: int | None = None) -> list[dict]:
+        return self._all[:length]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        try:
+            return next(self._docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeAsyncCollection:
+    """Async facade over FakeCollection mimicking pymongo's AsyncCollection."""
+
+    def __init__(self, sync_collection: FakeCollection | None = None):
+        self.sync = sync_collection or FakeCollection()
+
+    @property
+    def docs(self) -> list[dict]:
+        return self.sync.docs
+
+    async def insert_one(self, doc: dict) -> None:
+        self.sync.insert_one(doc)
+
+    async def count_documents(self, query: dict) -> int:
+        return self.sync.count_documents(query)
+
+    async def estimated_document_count(self) -> int:
+        return self.sync.estimated_document_count()
+
+    async def distinct(self, field: str) -> list:
+        return self.sync.distinct(field)
+
+    async def find_one(self, query: dict, projection: dict | None = None) -> dict | None:
+        return self.sync.find_one(query, projection)
+
+    async def update_one(
+        self, query: dict, update: dict, upsert: bool = False
+    ) -> SimpleNamespace:
+        return self.sync.update_one(query, update, upsert=upsert)
+
+    async def update_many(self, query: dict, update: dict) -> SimpleNamespace:
+        return self.sync.update_many(query, update)
+
+    async def find_one_and_update(self, query: dict, update: dict, **options):
+        return self.sync.find_one_and_update(query, update, **options)
+
+    async def create_indexes(self, models: list) -> list[str]:
+        self.indexes = getattr(self, "indexes", []) + [m.document["name"] for m in models]
+        return [m.document["name"] for m in models]
+
+    async def aggregate(self, pipeline: list[dict]) -> FakeAsyncCursor:
+        self.pipelines = getattr(self, "pipelines", []) + [pipeline]
+        return FakeAsyncCursor(_aggregate(self.sync.docs, pipeline))
+
+    def find(self, query: dict, projection: dict | None = None) -> FakeAsyncCursor:
+        return FakeAsyncCursor(self.sync.find(query, projection))
 
 
 class FakeDatabase:
     def __init__(self) -> None:
         self.pieces_collection = FakeCollection()
+        self.async_pieces_collection = FakeAsyncCollection(self.pieces_collection)
+        self.collections: dict[str, FakeAsyncCollection] = {}
         self.client = SimpleNamespace(
             admin=SimpleNamespace(command=lambda *_: {"ok": 1})
         )
 
+    def async_collection(self, name: str) -> FakeAsyncCollection:
+        if name == "pieces_metadata":
+            return self.async_pieces_collection
+        return self.collections.setdefault(name, FakeAsyncCollection())
+
+    async def close_async(self) -> None:
+        return None
+
 
 class FakePieceDAO:
     def __init__(self):
@@ -71,5 +316,22 @@ class FakePieceDAO:
         return list(self.by_style_result)
 
 
+class FakeAsyncPieceDAO(FakePieceDAO):
+    """Async variant of FakePieceDAO for the HTTP routes."""
+
+    async def insert_object_to_db(self, piece: Any) -> None:
+        super().insert_object_to_db(piece)
+
+    async def get_pieces_by_title(self, title: str) -> list[dict]:
+        return super().get_pieces_by_title(title)
+
+    async def get_pieces_by_style(self, style: str) -> list[dict]:
+        return super().get_pieces_by_style(style)
+
+    async def get_pieces_by_style_page(self, style: str, **page: Any) -> Page:
+        self.page_params = page
+        return Page(items=await self.get_pieces_by_style(style))
+
+
 def make_soup(html: str) -> BeautifulSoup:
     return BeautifulSoup(html, "html.parser")
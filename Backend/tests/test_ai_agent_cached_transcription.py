@@ -0,0 +1,113 @@
+import asyncio
+
+import httpx
+
+from src.ai_agent.cached_transcription import CachedTranscriber
+from src.database.ai_output_cache import AIOutputCache
+from tests.conftest import FakeAsyncCollection
+
+NOTES = [{"time": "0:0:0", "note": "C4", "duration": "4n", "velocity": 0.8}]
+
+
+def _transcriber(cache, calls, model="model", digests=None, **options):
+    async def transcribe(agent, pdf_url):
+        calls.append(pdf_url)
+        return NOTES, model
+
+    async def digest(pdf_url):
+        if digests is not None:
+            digests.append(pdf_url)
+        # Two URLs serving the same file.
+        return "sha256-same" if pdf_url in {"a.pdf", "mirror/a.pdf"} else f"sha256-{pdf_url}"
+
+    return CachedTranscriber(
+        cache,
+        transcribe=transcribe,
+        digest=digest,
+        model_names=lambda: ["model", "fallback"],
+        **options,
+    )
+
+
+def test_same_pdf_is_transcribed_once():
+    cache = AIOutputCache(FakeAsyncCollection())
+    calls = []
+    transcriber = _transcriber(cache, calls, prompt_version="v1")
+
+    async def _run():
+        return [await transcriber(None, url) for url in ("a.pdf", "mirror/a.pdf", "b.pdf")]
+
+    assert asyncio.run(_run()) == [NOTES] * 3
+    assert calls == ["a.pdf", "b.pdf"]
+    assert cache.hit_ratio() == 1 / 3
+
+
+def test_prompt_change_misses_the_cache():
+    collection = FakeAsyncCollection()
+    calls = []
+    before = _transcriber(AIOutputCache(collection), calls, prompt_version="v1")
+    after = _transcriber(AIOutputCache(collection), calls, prompt_version="v2")
+
+    asyncio.run(before(None, "a.pdf"))
+    asyncio.run(after(None, "a.pdf"))
+
+    assert calls == ["a.pdf", "a.pdf"]
+    assert len(collection.docs) == 2
+
+
+def test_unreachable_pdf_skips_the_cache():
+    cache = AIOutputCache(FakeAsyncCollection())
+    calls = []
+    transcriber = _transcriber(cache, calls)
+
+    async def unreachable(pdf_url):
+        raise httpx.ConnectError("no route")
+
+    transcriber.digest = unreachable
+
+    assert asyncio.run(transcriber(None, "a.pdf")) == NOTES
+    assert calls == ["a.pdf"]
+    assert cache.hits == cache.misses == 0
+
+
+def test_fallback_output_is_keyed_by_the_model_that_produced_it():
+    collection = FakeAsyncCollection()
+    cache = AIOutputCache(collection)
+    calls = []
+    # The configured model is refused: the fallback one answers.
+    transcriber = _transcriber(cache, calls, model="fallback", prompt_version="v1")
+
+    asyncio.run(transcriber(None, "a.pdf"))
+    asyncio.run(transcriber(None, "a.pdf"))
+
+    assert [doc["_id"] for doc in collection.docs] == ["sha256-same:v1:fallback"]
+    assert calls == ["a.pdf"]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_pdf_is_downloaded_once_per_url():
+    cache = AIOutputCache(FakeAsyncCollection())
+    calls, digests = [], []
+    transcriber = _transcriber(cache, calls, digests=digests)
+
+    async def _run():
+        await asyncio.gather(*(transcriber(None, "b.pdf") for _ in range(3)))
+        await transcriber(None, "b.pdf")
+
+    asyncio.run(_run())
+
+    assert digests == ["b.pdf"]
+
+
+def test_cached_looks_up_without_transcribing():
+    cache = AIOutputCache(FakeAsyncCollection())
+    calls = []
+    transcriber = _transcriber(cache, calls)
+
+    async def _run():
+        missed = await transcriber.cached("a.pdf")
+        await transcriber(None, "a.pdf")
+        return missed, await transcriber.cached("mirror/a.pdf")
+
+    assert asyncio.run(_run()) == (None, NOTES)
+    assert calls == ["a.pdf"]
@@ -0,0 +1,76 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.ai_agent.notes_generation import NotesGenerationPending, NotesGenerator
+from src.database.musical_piece_dao import AsyncMusicalPieceDAO
+from tests.conftest import FakeDatabase
+
+NOTES = [{"time": "0:0:0", "note": "C4", "duration": "4n", "velocity": 0.8}]
+
+
+def _dao(**fields):
+    fake_db = FakeDatabase()
+    fake_db.pieces_collection.docs.append({"_id": "p1", "title": "Prelude", **fields})
+    return fake_db, AsyncMusicalPieceDAO(fake_db)
+
+
+def test_concurrent_requests_transcribe_once():
+    fake_db, dao = _dao(pdf_url="https://example.com/p1.pdf", notes=None)
+    calls = []
+
+    async def transcribe(agent, pdf_url):
+        calls.append(pdf_url)
+        await asyncio.sleep(0.01)
+        return NOTES
+
+    generator = NotesGenerator(dao, transcribe=transcribe, agent_factory=object)
+
+    async def _run():
+        return await asyncio.gather(
+            *(generator.generate("p1", "https://example.com/p1.pdf") for _ in range(5))
+        )
+
+    assert asyncio.run(_run()) == [NOTES] * 5
+    assert calls == ["https://example.com/p1.pdf"]
+    doc = fake_db.pieces_collection.docs[0]
+    assert doc["notes"] is not None
+    assert "notes_lease_owner" not in doc
+
+
+def test_waits_for_notes_saved_by_the_lease_holder():
+    fake_db, dao = _dao(
+        notes=None,
+        notes_lease_owner="other-worker",
+        notes_lease_expires=datetime.now(timezone.utc) + timedelta(seconds=60),
+    )
+
+    async def transcribe(agent, pdf_url):
+        raise AssertionError("lease holder is transcribing")
+
+    generator = NotesGenerator(
+        dao, transcribe=transcribe, agent_factory=object, poll_seconds=0.01
+    )
+
+    async def _run():
+        waiting = asyncio.ensure_future(generator.generate("p1", "url"))
+        await asyncio.sleep(0.02)
+        await dao.update_notes("p1", NOTES)
+        return await waiting
+
+    assert asyncio.run(_run()) == NOTES
+
+
+def test_gives_up_while_the_lease_is_still_held():
+    _fake_db, dao = _dao(
+        notes=None,
+        notes_lease_owner="other-worker",
+        notes_lease_expires=datetime.now(timezone.utc) + timedelta(seconds=60),
+    )
+    generator = NotesGenerator(
+        dao, agent_factory=object, lease_seconds=0.02, poll_seconds=0.01
+    )
+
+    with pytest.raises(NotesGenerationPending):
+        asyncio.run(generator.generate("p1", "url"))
@@ -0,0 +1,156 @@
+import asyncio
+
+from pymongo.errors import AutoReconnect
+
+from src.ai_agent.notes_generation import NotesGenerator
+from src.ai_agent.pretranscription import PretranscriptionPool
+from src.database.musical_piece_dao import AsyncMusicalPieceDAO
+from src.database.notes_jobs import NotesJobQueue
+from tests.conftest import FakeDatabase
+
+NOTES = [{"time": "0:0:0", "note": "C4", "duration": "4n", "velocity": 0.8}]
+
+
+def _pool(docs, transcribe, **options):
+    fake_db = FakeDatabase()
+    fake_db.pieces_collection.docs.extend(docs)
+    dao = AsyncMusicalPieceDAO(fake_db)
+    jobs = NotesJobQueue(fake_db.async_collection("notes_jobs"))
+    generator = NotesGenerator(dao, transcribe=transcribe, agent_factory=object)
+    pool = PretranscriptionPool(dao, jobs, generator, **options)
+    return fake_db, pool
+
+
+def test_seed_queues_pieces_without_notes_by_composer_popularity():
+    docs = [
+        {"_id": "b1", "title": "B1", "composer": "Bach", "pdf_url": "b1.pdf"},
+        {"_id": "b2", "title": "B2", "composer": "Bach", "pdf_url": "b2.pdf"},
+        {"_id": "s1", "title": "S1", "composer": "Satie", "pdf_url": "s1.pdf"},
+        {"_id": "done", "title": "D", "composer": "Bach", "pdf_url": "d.pdf", "notes": NOTES},
+        {"_id": "nopdf", "title": "N", "composer": "Bach"},
+    ]
+    fake_db, pool = _pool(docs, transcribe=None)
+
+    assert asyncio.run(pool.seed()) == 3
+    assert asyncio.run(pool.seed()) == 0
+    jobs = {job["_id"]: job["priority"] for job in fake_db.collections["notes_jobs"].docs}
+    assert jobs == {"b1": 4, "b2": 4, "s1": 1}
+
+
+def test_workers_transcribe_queued_pieces_and_report_stats():
+    docs = [
+        {"_id": f"p{n}", "title": f"P{n}", "composer": "Bach", "pdf_url": f"{n}.pdf"}
+        for n in range(3)
+    ]
+    calls = []
+
+    async def transcribe(agent, pdf_url):
+        calls.append(pdf_url)
+        return NOTES
+
+    fake_db, pool = _pool(
+        docs, transcribe, workers=2, requests_per_minute=60_000, idle_seconds=0.01
+    )
+
+    async def _run():
+        await pool.seed()
+        await pool.start()
+        while pool.completed < 3:
+            await asyncio.sleep(0.01)
+        stats = await pool.stats()
+        await pool.stop()
+        return stats
+
+    stats = asyncio.run(_run())
+    assert sorted(calls) == ["0.pdf", "1.pdf", "2.pdf"]
+    assert all(doc["notes"] is not None for doc in fake_db.pieces_collection.docs)
+    assert stats["queue_depth"] == 0
+    assert stats["jobs"]["done"] == 3
+    assert stats["throughput_per_minute"] == 3
+    assert not pool.running
+
+
+def test_failed_transcriptions_are_requeued():
+    docs = [{"_id": "p1", "title": "P1", "pdf_url": "1.pdf"}]
+
+    async def transcribe(agent, pdf_url):
+        raise RuntimeError("gateway timeout")
+
+    fake_db, pool = _pool(docs, transcribe, requests_per_minute=60_000)
+
+    async def _run():
+        await pool.seed()
+        job = await pool.jobs.claim("worker")
+        await pool._run(job)
+
+    asyncio.run(_run())
+    (job,) = fake_db.collections["notes_jobs"].docs
+    assert job["status"] == "queued" and job["error"] == "gateway timeout"
+    assert pool.failed == 1
+
+
+def test_cached_and_finished_pieces_spend_no_model_token():
+    docs = [
+        {"_id": "cached", "title": "C", "pdf_url": "cached.pdf"},
+        {"_id": "done", "title": "D", "pdf_url": "done.pdf"},
+    ]
+    calls = []
+
+    async def transcribe(agent, pdf_url):
+        calls.append(pdf_url)
+        return NOTES
+
+    async def cached_notes(pdf_url):
+        return NOTES if pdf_url == "cached.pdf" else None
+
+    fake_db, pool = _pool(docs, transcribe, cached_notes=cached_notes)
+
+    class NoBudget:
+        async def acquire(self):
+            raise AssertionError("a model token was spent")
+
+    pool.budget = NoBudget()
+
+    async def _run():
+        await pool.seed()
+        # Notes written by the notes route after the job was queued.
+        fake_db.pieces_collection.docs[1]["notes"] = NOTES
+        while (job := await pool.jobs.claim("worker")) is not None:
+            await pool._run(job)
+
+    asyncio.run(_run())
+    assert calls == []
+    assert fake_db.pieces_collection.docs[0]["notes"] is not None
+    assert (pool.completed, pool.failed, pool.from_cache) == (2, 0, 1)
+
+
+def test_workers_survive_a_job_queue_outage():
+    docs = [{"_id": "p1", "title": "P1", "pdf_url": "1.pdf"}]
+
+    async def transcribe(agent, pdf_url):
+        return NOTES
+
+    fake_db, pool = _pool(
+        docs, transcribe, workers=1, requests_per_minute=60_000, idle_seconds=0.01
+    )
+    claim = pool.jobs.claim
+    outages = [AutoReconnect("primary stepped down")]
+
+    async def flaky_claim(owner):
+        if outages:
+            raise outages.pop()
+        return await claim(owner)
+
+    pool.jobs.claim = flaky_claim
+
+    async def _run():
+        await pool.seed()
+        await pool.start()
+        while pool.completed < 1:
+            assert pool.running
+            await asyncio.sleep(0.01)
+        await pool.stop()
+
+    asyncio.run(asyncio.wait_for(_run(), timeout=5))
+    assert outages == []
+    assert fake_db.pieces_collection.docs[0]["notes"] is not None
@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from src.database.async_db_shared_repository import AsyncRepository
+from src.database.db_shared_repository import SCHEMA_VERSION
+from src.database.pagination import InvalidCursorError, decode_cursor, encode_cursor
+from src.database.musical_piece_dao import AsyncMusicalPieceDAO
+from src.schemas.musical_piece import MusicalPiece
+from tests.conftest import FakeAsyncCollection, FakeCollection, FakeDatabase
+
+
+def test_async_get_object_by_title_filters_with_regex():
+    docs = [
+        {"_id": 1, "title": "Nocturne in E-flat major"},
+        {"_id": 2, "title": "Sonata in C"},
+    ]
+    repo = AsyncRepository(FakeAsyncCollection(FakeCollection(docs)), MusicalPiece)
+
+    results = asyncio.run(repo.get_object_by_title("nocturne"))
+
+    assert [piece["_id"] for piece in results] == ["1"]
+
+
+def test_async_get_object_by_style_skips_invalid_documents():
+    docs = [
+        {"_id": 1, "title": "Work A", "style": "Baroque", "style_key": "baroque"},
+        {"_id": 2, "title": "  ", "style": "Baroque", "style_key": "baroque"},
+    ]
+    repo = AsyncRepository(FakeAsyncCollection(FakeCollection(docs)), MusicalPiece)
+
+    results = asyncio.run(repo.get_object_by_style("baroque"))
+
+    assert len(results) == 1
+    assert results[0]["title"] == "Work A"
+
+
+def test_async_dao_inserts_through_async_collection():
+    fake_db = FakeDatabase()
+    dao = AsyncMusicalPieceDAO(fake_db)
+
+    asyncio.run(dao.insert_object_to_db(MusicalPiece(title="Prelude")))
+
+    assert fake_db.pieces_collection.inserted == [
+        {"title": "Prelude", "schema_version": SCHEMA_VERSION}
+    ]
+
+
+def test_async_queries_do_not_block_each_other():
+    fields = ("style", "composer", "instruments")
+    # Every query waits for the others: they only finish if they overlap.
+    barrier = asyncio.Barrier(len(fields))
+
+    class SlowCollection(FakeAsyncCollection):
+        async def distinct(self, field: str) -> list[str]:
+            await asyncio.wait_for(barrier.wait(), timeout=5)
+            return [field]
+
+    repo = AsyncRepository(SlowCollection(), MusicalPiece)
+
+    async def _run():
+        return await asyncio.gather(
+            repo.get_all_styles(), repo.get_all_composers(), repo.get_all_instruments()
+        )
+
+    assert asyncio.run(_run()) == [[field] for field in fields]
+
+
+def test_find_page_walks_the_collection_with_cursors():
+    docs = [{"_id": i, "title": f"Piece {i}", "notes": [{"n": i}]} for i in range(5)]
+    repo = AsyncRepository(FakeAsyncCollection(FakeCollection(docs)), MusicalPiece)
+
+    first = asyncio.run(repo.get_all_objects_page(limit=2, fields=["title"]))
+    assert [piece["title"] for piece in first.items] == ["Piece 0", "Piece 1"]
+    assert set(first.items[0]) == {"_id", "title"}
+
+    after = decode_cursor(first.next_cursor)
+    second = asyncio.run(repo.get_all_objects_page(limit=2, after=after))
+    third = asyncio.run(
+        repo.get_all_objects_page(limit=2, after=decode_cursor(second.next_cursor))
+    )
+    assert [piece["_id"] for piece in second.items] == ["2", "3"]
+    assert [piece["_id"] for piece in third.items] == ["4"]
+    assert third.next_cursor is None
+
+
+def test_cursor_round_trips_object_ids():
+    object_id = ObjectId()
+    assert decode_cursor(encode_cursor(object_id)) == object_id
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("%%%")
+
+
+def test_count_objects_uses_estimate_only_for_unfiltered_totals():
+    docs = [
+        {"_id": 1, "title": "A", "style_key": "baroque", "composer": "J. S. Bach"},
+        {"_id": 2, "title": "B", "style_key": "baroque", "composer": "Handel"},
+        {"_id": 3, "title": "C", "style_key": "romantic", "composer": "Chopin"},
+    ]
+    calls = []
+
+    class CountingCollection(FakeAsyncCollection):
+        async def estimated_document_count(self) -> int:
+            calls.append("estimate")
+            return await super().estimated_document_count()
+
+    repo = AsyncRepository(CountingCollection(FakeCollection(docs)), MusicalPiece)
+
+    assert asyncio.run(repo.count_objects()) == 3
+    assert asyncio.run(repo.count_objects(exact=True)) == 3
+    assert asyncio.run(repo.count_objects(style="baroque")) == 2
+    assert asyncio.run(repo.count_objects(style="baroque", composer="bach")) == 1
+    assert calls == ["estimate"]
+
+
+def test_list_reads_project_out_notes_by_default():
+    docs = [{"_id": 1, "title": "Prelude", "notes": [{"n": 1}] * 500}]
+    dao = AsyncMusicalPieceDAO(FakeDatabase())
+    dao.db.pieces_collection.docs.extend(docs)
+
+    page = asyncio.run(dao.get_all_pieces_page())
+    titles = asyncio.run(dao.get_pieces_by_title("prelude"))
+    explicit = asyncio.run(dao.get_all_pieces_page(fields=["notes"]))
+
+    assert "notes" not in page.items[0]
+    assert "notes" not in titles[0]
+    assert len(explicit.items[0]["notes"]) == 500
+
+
+def test_notes_lease_is_exclusive_until_released_or_expired():
+    docs = [{"_id": "p1", "title": "Prelude", "notes": None}]
+    repo = AsyncRepository(FakeAsyncCollection(FakeCollection(docs)), MusicalPiece)
+
+    assert asyncio.run(repo.acquire_notes_lease("p1", "a", ttl=60))
+    assert not asyncio.run(repo.acquire_notes_lease("p1", "b", ttl=60))
+
+    asyncio.run(repo.release_notes_lease("p1", "b"))
+    assert docs[0]["notes_lease_owner"] == "a"
+    asyncio.run(repo.release_notes_lease("p1", "a"))
+    assert "notes_lease_owner" not in docs[0]
+
+    assert asyncio.run(repo.acquire_notes_lease("p1", "b", ttl=-1))
+    assert asyncio.run(repo.acquire_notes_lease("p1", "c", ttl=60))
+    assert docs[0]["notes_lease_owner"] == "c"
@@ -4,7 +4,10 @@ from tests.conftest import FakeDatabase
 
 def test_get_container_is_singleton(monkeypatch):
     monkeypatch.setattr(container, "Database", FakeDatabase)
-    monkeypatch.setattr(container, "MusicalPieceDAO", lambda db: ("dao", db))
+    monkeypatch.setattr(container, "MusicalPieceDAO", lambda db, **_: ("dao", db))
+    monkeypatch.setattr(
+        container, "AsyncMusicalPieceDAO", lambda db, **_: ("async_dao", db)
+    )
     container.get_container.cache_clear()
 
     first = container.get_container()
@@ -13,14 +16,18 @@ def test_get_container_is_singleton(monkeypatch):
     assert first is second
     assert isinstance(first.db, FakeDatabase)
     assert first.piece_dao == ("dao", first.db)
+    assert first.async_piece_dao == ("async_dao", first.db)
     container.get_container.cache_clear()
 
 
 def test_get_db_and_piece_dao_helpers(monkeypatch):
     monkeypatch.setattr(container, "Database", FakeDatabase)
-    monkeypatch.setattr(container, "MusicalPieceDAO", lambda db: ("dao", db))
+    monkeypatch.setattr(container, "MusicalPieceDAO", lambda db, **_: ("dao", db))
     container.get_container.cache_clear()
 
     assert container.get_db() is container.get_container().db
     assert container.get_piece_dao() == ("dao", container.get_container().db)
+    assert container.get_async_piece_dao().repository.collection is (
+        container.get_container().db.async_pieces_collection
+    )
     container.get_container.cache_clear()
@@ -1,3 +1,6 @@
+import asyncio
+from types import SimpleNamespace
+
 import pytest
 
 from src.database import database
@@ -37,3 +40,33 @@ def test_database_singleton_and_properties(monkeypatch):
         database.Database()
 
     database.get_database.cache_clear()
+
+
+def test_async_collections_follow_the_current_client(monkeypatch):
+    monkeypatch.setenv("MONGO_CURRENT_DB", "custom_db")
+
+    class FakeAsyncClient:
+        def __init__(self, uri, serverSelectionTimeoutMS=None, connectTimeoutMS=None):
+            self.closed = False
+
+        def __getitem__(self, name):
+            return {"pieces_metadata": SimpleNamespace(client=self)}
+
+        async def close(self):
+            self.closed = True
+
+    monkeypatch.setattr(database.Database, "_instance", None)
+    database.get_database.cache_clear()
+    monkeypatch.setattr(database, "MongoClient", lambda *args, **kwargs: {"custom_db": {"pieces_metadata": None}})
+    monkeypatch.setattr(database, "AsyncMongoClient", FakeAsyncClient)
+
+    db = database.get_database()
+    # Taken at import time by the DAOs, before any client exists.
+    pieces = db.async_pieces_collection
+    first = pieces.client
+    asyncio.run(db.close_async())
+    assert first.closed
+    assert pieces.client is not first
+    assert not pieces.client.closed
+
+    database.get_database.cache_clear()
@@ -0,0 +1,35 @@
+import asyncio
+
+from src.database.ai_output_cache import AIOutputCache
+from tests.conftest import FakeAsyncCollection
+
+NOTES = [{"time": "0:0:0", "note": "C4", "duration": "4n", "velocity": 0.8}]
+
+
+def test_cache_round_trips_notes_and_counts_hits():
+    collection = FakeAsyncCollection()
+    cache = AIOutputCache(collection)
+    key = cache.key("sha256-abc", "v1", "model")
+
+    async def _run():
+        missed = await cache.get(key)
+        await cache.put(key, NOTES, pdf_url="a.pdf")
+        return missed, await cache.get(key), await cache.stats()
+
+    missed, hit, stats = asyncio.run(_run())
+    assert missed is None
+    assert hit == NOTES
+    # Stored packed like piece notes.
+    assert isinstance(collection.docs[0]["notes"], bytes)
+    assert stats == {"entries": 1, "hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+
+def test_unpackable_notes_are_stored_as_json():
+    cache = AIOutputCache(FakeAsyncCollection())
+    notes = [{"time": 1.5, "note": "C4"}]
+
+    async def _run():
+        await cache.put("k", notes)
+        return await cache.get("k")
+
+    assert asyncio.run(_run()) == notes
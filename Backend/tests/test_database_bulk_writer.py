@@ -0,0 +1,31 @@
+from src.database.bulk_writer import BulkWriteReport, PieceBulkWriter
+from src.database.musical_piece_dao import MusicalPieceDAO
+from src.schemas.musical_piece import MusicalPiece
+from tests.conftest import FakeDatabase
+
+
+def test_writer_flushes_full_batches_and_reports_totals():
+    reports = []
+    dao = MusicalPieceDAO(FakeDatabase())
+    writer = PieceBulkWriter(dao, batch_size=2, on_batch=reports.append)
+
+    assert writer.add(MusicalPiece(title="A", pdf_url="a.pdf")) is None
+    first = writer.add(MusicalPiece(title="B", pdf_url="b.pdf"))
+    writer.add(MusicalPiece(title="A again", pdf_url="a.pdf"))
+    last = writer.flush()
+
+    assert first == BulkWriteReport(inserted=2)
+    assert last == BulkWriteReport(updated=1)
+    assert reports == [first, last]
+    assert writer.totals == BulkWriteReport(inserted=2, updated=1)
+    assert writer.flush() is None
+    assert [doc["title"] for doc in dao.db.pieces_collection.docs] == ["A again", "B"]
+
+
+def test_pieces_without_keys_are_inserted_as_is():
+    dao = MusicalPieceDAO(FakeDatabase())
+
+    report = dao.upsert_pieces([MusicalPiece(title="Untitled sketch")] * 2)
+
+    assert report == BulkWriteReport(inserted=2)
+    assert len(dao.db.pieces_collection.docs) == 2
@@ -0,0 +1,90 @@
+import asyncio
+
+from src.database.async_db_shared_repository import AsyncRepository
+from src.database.facet_cache import FacetCache
+from src.schemas.musical_piece import MusicalPiece
+from tests.conftest import FakeAsyncCollection, FakeCollection
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _counting_loader(calls: list, value: list[str], delay: float = 0.0):
+    async def load() -> list[str]:
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return value
+
+    return load
+
+
+def test_cached_value_is_reused_until_the_ttl_expires():
+    clock = Clock()
+    cache = FacetCache(ttl=10, clock=clock)
+    calls: list = []
+    loader = _counting_loader(calls, ["Baroque"])
+
+    async def _run():
+        first = await cache.get("style", loader)
+        clock.now = 5
+        second = await cache.get("style", loader)
+        clock.now = 11
+        third = await cache.get("style", loader)
+        return first, second, third
+
+    assert asyncio.run(_run()) == (["Baroque"], ["Baroque"], ["Baroque"])
+    assert len(calls) == 2
+
+
+def test_concurrent_misses_share_one_load():
+    cache = FacetCache(ttl=10)
+    calls: list = []
+    loader = _counting_loader(calls, ["Bach"], delay=0.02)
+
+    async def _run():
+        return await asyncio.gather(*(cache.get("composer", loader) for _ in range(20)))
+
+    results = asyncio.run(_run())
+
+    assert len(calls) == 1
+    assert all(result == ["Bach"] for result in results)
+
+
+def test_write_during_a_load_keeps_the_result_out_of_the_cache():
+    cache = FacetCache(ttl=10)
+    calls: list = []
+    loader = _counting_loader(calls, ["Old"], delay=0.02)
+
+    async def _run():
+        pending = asyncio.ensure_future(cache.get("style", loader))
+        await asyncio.sleep(0)
+        cache.on_write("insert", {"_id": 1})
+        await pending
+        await cache.get("style", loader)
+
+    asyncio.run(_run())
+
+    assert len(calls) == 2
+
+
+def test_repository_insert_invalidates_facets():
+    collection = FakeCollection([{"_id": 1, "title": "Fugue", "style": "Baroque"}])
+    repo = AsyncRepository(FakeAsyncCollection(collection), MusicalPiece)
+
+    async def _run():
+        before = await repo.get_all_styles()
+        await repo.get_all_styles()
+        await repo.insert_object_to_db(MusicalPiece(title="Waltz", style="Romantic"))
+        after = await repo.get_all_styles()
+        return before, after
+
+    before, after = asyncio.run(_run())
+
+    assert before == ["Baroque"]
+    assert after == ["Baroque", "Romantic"]
+    assert collection.distinct_calls == 2
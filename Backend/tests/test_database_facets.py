@@ -0,0 +1,48 @@
+import asyncio
+
+from src.database.async_db_shared_repository import AsyncRepository
+from src.schemas.musical_piece import MusicalPiece
+from tests.conftest import FakeAsyncCollection, FakeCollection
+
+DOCS = [
+    {"_id": 1, "title": "A", "composer": "Bach", "style": "Baroque", "style_key": "baroque", "instruments": "Organ", "instrument_keys": ["organ"]},
+    {"_id": 2, "title": "B", "composer": "Bach", "style": "Baroque", "style_key": "baroque", "instruments": "Piano", "instrument_keys": ["piano"]},
+    {"_id": 3, "title": "C", "composer": "Chopin", "style": "Romantic", "style_key": "romantic", "instruments": "Piano", "instrument_keys": ["piano"]},
+    {"_id": 4, "title": "D", "composer": "Chopin", "style": "", "instruments": "Piano", "instrument_keys": ["piano"]},
+]
+
+
+def _repo(docs=DOCS):
+    collection = FakeAsyncCollection(FakeCollection([dict(doc) for doc in docs]))
+    return collection, AsyncRepository(collection, MusicalPiece)
+
+
+def test_facets_count_every_value_in_one_aggregation():
+    collection, repo = _repo()
+
+    facets = asyncio.run(repo.get_facets())
+
+    assert facets == {
+        "total": 4,
+        "styles": [{"value": "Baroque", "count": 2}, {"value": "Romantic", "count": 1}],
+        "composers": [{"value": "Bach", "count": 2}, {"value": "Chopin", "count": 2}],
+        "instruments": [{"value": "Piano", "count": 3}, {"value": "Organ", "count": 1}],
+    }
+    assert len(collection.pipelines) == 1
+
+
+def test_active_filter_narrows_the_other_facets_only():
+    _collection, repo = _repo()
+
+    facets = asyncio.run(repo.get_facets(style="baroque"))
+
+    assert facets["total"] == 2
+    assert facets["styles"] == [
+        {"value": "Baroque", "count": 2},
+        {"value": "Romantic", "count": 1},
+    ]
+    assert facets["composers"] == [{"value": "Bach", "count": 2}]
+    assert facets["instruments"] == [
+        {"value": "Organ", "count": 1},
+        {"value": "Piano", "count": 1},
+    ]
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+
+import pytest
+from pymongo.errors import OperationFailure
+
+from src.database import indexes
+from src.database.async_db_shared_repository import AsyncRepository
+from src.database.db_shared_repository import Repository
+from src.schemas.musical_piece import MusicalPiece
+from tests.conftest import FakeAsyncCollection, FakeCollection
+
+COLLSCAN_PLAN = {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}}
+IXSCAN_PLAN = {
+    "queryPlanner": {
+        "winningPlan": {
+            "queryPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}
+        }
+    }
+}
+
+
+class RecordingIndexCollection:
+    def __init__(self, failing: set[str] = frozenset()):
+        self.failing = failing
+        self.created: list[str] = []
+
+    async def create_indexes(self, models):
+        name = models[0].document["name"]
+        if name in self.failing:
+            raise OperationFailure("E11000 duplicate key error", code=11000)
+        self.created.append(name)
+
+
+def test_registry_covers_dedupe_and_filter_fields():
+    specs = {index.document["name"]: index.document for index in indexes.PIECE_INDEXES}
+
+    assert specs["music_id_number_unique"]["unique"] is True
+    assert specs["pdf_url_unique"]["unique"] is True
+    assert {"composer", "style", "instruments", "pieces_text"} <= set(specs)
+
+
+def test_ensure_indexes_is_repeatable_and_skips_failures(caplog):
+    collection = RecordingIndexCollection(failing={"pdf_url_unique"})
+
+    with caplog.at_level(logging.WARNING):
+        first = asyncio.run(indexes.ensure_indexes(collection))
+        second = asyncio.run(indexes.ensure_indexes(collection))
+
+    assert first == second
+    assert "pdf_url_unique" not in first
+    assert "Could not create index pdf_url_unique" in caplog.text
+
+
+def test_winning_plan_stages_walks_nested_plans():
+    assert indexes.winning_plan_stages(IXSCAN_PLAN) == ["FETCH", "IXSCAN"]
+    assert indexes.is_collection_scan(COLLSCAN_PLAN)
+    assert not indexes.is_collection_scan(IXSCAN_PLAN)
+
+
+class ExplainingCollection(FakeCollection):
+    name = "pieces_metadata"
+
+    def __init__(self, docs, plan):
+        super().__init__(docs)
+        self.plan = plan
+
+    def find(self, query, projection=None):
+        collection = self
+
+        class Cursor(list):
+            def explain(self):
+                return collection.plan
+
+        return Cursor(super().find(query, projection))
+
+
+def test_strict_explain_mode_flags_collscan(monkeypatch):
+    monkeypatch.setenv("MONGO_EXPLAIN_QUERIES", "raise")
+    docs = [{"_id": 1, "title": "Nocturne", "style_key": "romantic"}]
+
+    scanning = Repository(ExplainingCollection(docs, COLLSCAN_PLAN), MusicalPiece)
+    with pytest.raises(indexes.CollectionScanError):
+        scanning.get_object_by_style("romantic")
+
+    indexed = Repository(ExplainingCollection(docs, IXSCAN_PLAN), MusicalPiece)
+    assert indexed.get_object_by_style("romantic")[0]["title"] == "Nocturne"
+
+
+def test_explain_mode_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("MONGO_EXPLAIN_QUERIES", raising=False)
+    docs = [{"_id": 1, "title": "Nocturne", "style_key": "romantic"}]
+    repo = AsyncRepository(FakeAsyncCollection(FakeCollection(docs)), MusicalPiece)
+
+    assert asyncio.run(repo.get_object_by_style("romantic"))
@@ -0,0 +1,82 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from src.database.info_cache import InfoCache
+from src.schemas.agent_output import AgentInfosOutput
+from tests.conftest import FakeAsyncCollection
+
+
+def _loader(calls, text="Baroque master"):
+    async def load():
+        calls.append(text)
+        await asyncio.sleep(0)
+        return AgentInfosOutput(info=text)
+
+    return load
+
+
+def test_normalized_names_share_one_entry():
+    collection = FakeAsyncCollection()
+    cache = InfoCache(collection, AgentInfosOutput, namespace="composer")
+    calls = []
+
+    async def _run():
+        return await asyncio.gather(
+            *(cache.get(name, _loader(calls)) for name in ("Bach", " bach", "BÁCH"))
+        )
+
+    results = asyncio.run(_run())
+    assert [result.info for result in results] == ["Baroque master"] * 3
+    assert calls == ["Baroque master"]
+    assert collection.docs[0]["_id"] == "composer:bach"
+    assert collection.indexes == ["expires_at_ttl"]
+
+
+def test_mongo_tier_serves_other_processes():
+    collection = FakeAsyncCollection()
+    calls = []
+    first = InfoCache(collection, AgentInfosOutput, namespace="piece")
+    second = InfoCache(collection, AgentInfosOutput, namespace="piece")
+
+    asyncio.run(first.get("Clair de lune", _loader(calls)))
+    result = asyncio.run(second.get("clair de lune", _loader(calls, "other")))
+
+    assert result.info == "Baroque master"
+    assert calls == ["Baroque master"]
+
+
+def test_expired_entries_are_reloaded():
+    collection = FakeAsyncCollection()
+    collection.docs.append(
+        {
+            "_id": "piece:gymnopedie",
+            "value": {"info": "stale"},
+            "expires_at": datetime.utcnow() - timedelta(seconds=1),
+        }
+    )
+    cache = InfoCache(collection, AgentInfosOutput, namespace="piece")
+    calls = []
+
+    result = asyncio.run(cache.get("Gymnopédie", _loader(calls, "fresh")))
+
+    assert result.info == "fresh"
+    assert collection.docs[0]["value"] == {"info": "fresh"}
+
+
+def test_lru_keeps_the_most_recent_entries():
+    now = [0.0]
+    cache = InfoCache(
+        FakeAsyncCollection(),
+        AgentInfosOutput,
+        namespace="piece",
+        ttl=10,
+        max_entries=2,
+        clock=lambda: now[0],
+    )
+    calls = []
+    for name in ("a", "b", "a", "c"):
+        asyncio.run(cache.get(name, _loader(calls, name)))
+
+    assert list(cache._entries) == ["a", "c"]
+    now[0] = 11
+    assert cache._recall("a") is None
@@ -0,0 +1,79 @@
+from src.database import migrations
+from src.database.db_shared_repository import SCHEMA_VERSION
+from src.utils.notes_codec import decode_notes
+from tests.conftest import FakeCollection
+
+
+def test_backfill_search_keys_updates_only_unmigrated_documents():
+    collection = FakeCollection(
+        [
+            {"_id": 1, "title": "A", "style": "Baroque", "instruments": "Flute, Harpsichord"},
+            {"_id": 2, "title": "B", "style": "Jazz", "style_key": "jazz"},
+            {"_id": 3, "title": "C"},
+        ]
+    )
+
+    assert migrations.backfill_search_keys(collection, batch_size=1) == 1
+    assert collection.docs[0]["style_key"] == "baroque"
+    assert collection.docs[0]["instrument_keys"] == ["flute", "harpsichord"]
+    assert "style_key" not in collection.docs[2]
+
+    assert migrations.backfill_search_keys(collection) == 0
+
+
+def test_stamp_schema_version_repairs_validates_and_stamps_documents():
+    collection = FakeCollection(
+        [
+            {"_id": 1, "title": "A", "notes": '[{"time": "0:0"}]'},
+            {"_id": 2, "title": "   "},
+            {"_id": 3, "title": "PiÃ¨ces", "schema_version": 1},
+            {"_id": 4, "title": "D", "schema_version": SCHEMA_VERSION},
+        ]
+    )
+
+    assert migrations.stamp_schema_version(collection, batch_size=1) == 2
+    assert collection.docs[0]["schema_version"] == SCHEMA_VERSION
+    assert collection.docs[0]["notes"] == [{"time": "0:0"}]
+    assert "schema_version" not in collection.docs[1]
+    assert collection.docs[2]["title"] == "Pièces"
+    assert collection.docs[2]["schema_version"] == SCHEMA_VERSION
+    assert migrations.stamp_schema_version(collection) == 0
+
+
+def test_stamp_schema_version_recomputes_search_keys_of_repaired_text():
+    collection = FakeCollection(
+        [
+            {
+                "_id": 1,
+                "title": "A",
+                "style": "PiÃ¨ces",
+                "style_key": "pia ces",
+                "instruments": "FlÃ»te, Piano",
+                "instrument_keys": ["fla»te", "piano"],
+                "schema_version": 1,
+            },
+            {"_id": 2, "title": "B", "style": "Baroque", "schema_version": 1},
+        ]
+    )
+
+    assert migrations.stamp_schema_version(collection) == 2
+    assert collection.docs[0]["style"] == "Pièces"
+    assert collection.docs[0]["style_key"] == "pieces"
+    assert collection.docs[0]["instrument_keys"] == ["flute", "piano"]
+    assert collection.docs[1]["style_key"] == "baroque"
+
+
+def test_pack_notes_packs_representable_arrays_only():
+    notes = [{"time": "0:0:0", "note": "E4", "duration": "8n", "velocity": 0.8}]
+    collection = FakeCollection(
+        [
+            {"_id": 1, "title": "A", "notes": notes},
+            {"_id": 2, "title": "B", "notes": [{"time": 0.5, "note": "E4"}]},
+            {"_id": 3, "title": "C"},
+        ]
+    )
+
+    assert migrations.pack_notes(collection) == 1
+    assert decode_notes(collection.docs[0]["notes"]) == notes
+    assert isinstance(collection.docs[1]["notes"], list)
+    assert migrations.pack_notes(collection) == 0
@@ -0,0 +1,65 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from src.database.notes_jobs import NotesJobQueue
+from tests.conftest import FakeAsyncCollection
+
+
+def test_enqueue_keeps_one_job_per_piece_and_raises_priority():
+    collection = FakeAsyncCollection()
+    queue = NotesJobQueue(collection)
+
+    assert asyncio.run(queue.enqueue("p1", "a.pdf", priority=1))
+    assert not asyncio.run(queue.enqueue("p1", "a.pdf", priority=5))
+    assert not asyncio.run(queue.enqueue("p1", "a.pdf", priority=2))
+
+    (job,) = collection.docs
+    assert job["status"] == "queued" and job["priority"] == 5
+
+
+def test_claim_takes_the_most_popular_job_first():
+    queue = NotesJobQueue(FakeAsyncCollection())
+
+    async def _run():
+        await queue.enqueue("rare", "r.pdf", priority=1)
+        await queue.enqueue("popular", "p.pdf", priority=9)
+        first = await queue.claim("worker")
+        second = await queue.claim("worker")
+        return first, second, await queue.claim("worker")
+
+    first, second, third = asyncio.run(_run())
+    assert first["_id"] == "popular" and first["status"] == "running"
+    assert first["attempts"] == 1
+    assert second["_id"] == "rare"
+    assert third is None
+
+
+def test_failed_jobs_are_retried_until_attempts_run_out():
+    collection = FakeAsyncCollection()
+    queue = NotesJobQueue(collection, max_attempts=2)
+
+    async def _run():
+        await queue.enqueue("p1", "a.pdf")
+        for _ in range(2):
+            job = await queue.claim("worker")
+            await queue.fail(job, "model down")
+        return await queue.counts()
+
+    counts = asyncio.run(_run())
+    assert counts == {"queued": 0, "running": 0, "done": 0, "failed": 1}
+    assert collection.docs[0]["error"] == "model down"
+
+
+def test_requeue_stale_releases_abandoned_jobs():
+    collection = FakeAsyncCollection()
+    queue = NotesJobQueue(collection)
+    started = datetime.now(timezone.utc) - timedelta(hours=1)
+    collection.docs.extend(
+        [
+            {"_id": "old", "status": "running", "started_at": started},
+            {"_id": "new", "status": "running", "started_at": datetime.now(timezone.utc)},
+        ]
+    )
+
+    assert asyncio.run(queue.requeue_stale(60)) == 1
+    assert [doc["status"] for doc in collection.docs] == ["queued", "running"]
@@ -1,4 +1,6 @@
-from src.database.db_shared_repository import Repository
+from pymongo.errors import BulkWriteError
+
+from src.database.db_shared_repository import SCHEMA_VERSION, Repository
 from src.schemas.musical_piece import MusicalPiece
 from tests.conftest import FakeCollection
 
@@ -23,13 +25,110 @@ def test_serialize_invalid_document_returns_none():
     assert repo._serialize(doc) is None
 
 
+def test_trusted_read_matches_validated_read_for_stamped_documents():
+    repo = Repository(FakeCollection(), MusicalPiece)
+    doc = {
+        "_id": 1,
+        "title": "Nocturne",
+        "style": "Romantic",
+        "style_key": "romantic",
+        "notes": [{"time": "0:0"}],
+        "schema_version": SCHEMA_VERSION,
+    }
+
+    trusted = repo._serialize(doc)
+    validated = repo._validate(doc)
+
+    assert trusted == validated
+    assert list(trusted) == list(validated)
+    assert repo._serialize(doc, fields=["title"]) == {"_id": "1", "title": "Nocturne"}
+
+
+def test_unstamped_documents_are_still_validated_and_repaired():
+    repo = Repository(FakeCollection(), MusicalPiece)
+
+    assert repo._serialize({"_id": 1, "title": "   ", "schema_version": 1}) is None
+    assert repo._serialize({"_id": 2, "title": "PiÃ¨ces"})["title"] == "Pièces"
+
+
+def test_insert_repairs_mojibake_once():
+    collection = FakeCollection()
+    repo = Repository(collection, MusicalPiece)
+
+    repo.insert_object_to_db(MusicalPiece(title="PiÃ¨ces", composer="DvoÅ\x99Ã¡k"))
+
+    assert collection.inserted[0]["title"] == "Pièces"
+    assert collection.inserted[0]["composer"] == "Dvořák"
+    assert repo._serialize(collection.docs[0])["title"] == "Pièces"
+
+
+def test_reads_never_return_crawler_bookkeeping():
+    piece = MusicalPiece(
+        title="Prelude", source_url="http://m/1", http_etag='"abc"', http_last_modified="x"
+    )
+    trusted = {"_id": 1, **Repository._insert_payload(piece)}
+    legacy = {"_id": 2, "title": "Fugue", "source_url": "http://m/2", "http_etag": '"d"'}
+    collection = FakeCollection([trusted, legacy])
+    repo = Repository(collection, MusicalPiece)
+
+    assert trusted["source_url"] == "http://m/1"
+    for doc in (trusted, legacy):
+        data = repo._serialize(doc)
+        assert not set(MusicalPiece.INTERNAL_FIELDS) & set(data)
+
+
+def test_update_notes_validates_before_writing():
+    collection = FakeCollection([{"_id": "a", "title": "Prelude", "schema_version": SCHEMA_VERSION}])
+    repo = Repository(collection, MusicalPiece)
+
+    repo.update_notes("a", '[{"time": "0:0"}]')
+
+    assert collection.docs[0]["notes"] == [{"time": "0:0"}]
+
+
+def test_notes_are_stored_packed_and_read_back_as_events():
+    collection = FakeCollection([{"_id": "a", "title": "Prelude", "schema_version": SCHEMA_VERSION}])
+    repo = Repository(collection, MusicalPiece)
+    notes = [{"time": "0:0:0", "note": "C4", "duration": "4n", "velocity": 0.8}]
+
+    repo.update_notes("a", notes)
+
+    assert isinstance(collection.docs[0]["notes"], bytes)
+    assert repo.get_object_by_id("a", fields=["notes"])["notes"] == notes
+
+
+def test_notes_the_codec_cannot_represent_stay_json():
+    collection = FakeCollection([{"_id": "a", "title": "Prelude"}])
+    repo = Repository(collection, MusicalPiece)
+    notes = [{"time": 0.25, "note": "C4"}]
+
+    repo.update_notes("a", notes)
+
+    assert collection.docs[0]["notes"] == notes
+
+
+def test_notes_the_codec_would_alter_stay_json():
+    collection = FakeCollection([{"_id": "a", "title": "Prelude"}])
+    repo = Repository(collection, MusicalPiece)
+    notes = [
+        {"time": "0:0:0", "note": "Db4", "velocity": 0.853},
+        {"time": "0:1:0", "note": ["C4", "E4"]},
+    ]
+
+    repo.update_notes("a", notes)
+
+    assert collection.docs[0]["notes"] == notes
+
+
 def test_insert_and_delete_methods_delegate():
     collection = FakeCollection()
     repo = Repository(collection, MusicalPiece)
     piece = MusicalPiece.model_validate({"title": "Prelude"})
 
     repo.insert_object_to_db(piece)
-    assert collection.inserted == [piece.model_dump(by_alias=True, exclude_none=True)]
+    assert collection.inserted == [
+        {**piece.model_dump(by_alias=True, exclude_none=True), "schema_version": SCHEMA_VERSION}
+    ]
 
     repo.delete_all_objects_from_db()
     assert collection.deleted_queries == [{}]
@@ -52,8 +151,8 @@ def test_get_object_by_title_filters_with_regex():
 
 def test_get_object_by_style_matches_variants():
     docs = [
-        {"_id": 1, "title": "Work A", "style": "Baroque"},
-        {"_id": 2, "title": "Work B", "style": "Classical"},
+        {"_id": 1, "title": "Work A", "style": "Baroque", "style_key": "baroque"},
+        {"_id": 2, "title": "Work B", "style": "Classical", "style_key": "classical"},
     ]
     collection = FakeCollection(docs)
     repo = Repository(collection, MusicalPiece)
@@ -63,3 +162,116 @@ def test_get_object_by_style_matches_variants():
     assert results and results[0]["_id"] == "1"
     assert results[0]["title"] == "Work A"
     assert results[0]["style"] == "Baroque"
+
+
+def test_insert_stores_normalized_search_keys():
+    collection = FakeCollection()
+    repo = Repository(collection, MusicalPiece)
+
+    repo.insert_object_to_db(
+        MusicalPiece(title="Duo", style="Romantic", instruments="Piano/Violin")
+    )
+
+    stored = collection.inserted[0]
+    assert stored["style_key"] == "romantic"
+    assert stored["instrument_keys"] == ["piano", "violin"]
+
+
+def test_get_object_by_instrument_matches_mixed_instrument_fields():
+    collection = FakeCollection()
+    repo = Repository(collection, MusicalPiece)
+    repo.insert_object_to_db(MusicalPiece(title="Duo", instruments="Piano/Violin"))
+    repo.insert_object_to_db(MusicalPiece(title="Solo", instruments="Guitar"))
+
+    results = repo.get_object_by_instrument("VIOLIN")
+
+    assert [piece["title"] for piece in results] == ["Duo"]
+    assert "instrument_keys" not in results[0]
+
+
+def test_upsert_objects_inserts_updates_and_skips_in_one_bulk_write():
+    fugue = MusicalPiece(title="Fugue", pdf_url="f.pdf", style="Baroque")
+    collection = FakeCollection(
+        [
+            {"_id": 1, "title": "Prelude", "music_id_number": "m1", "image_url": "old.jpg"},
+            # Exactly what a re-scrape of the same page writes.
+            {"_id": 2, **Repository._insert_payload(fugue)},
+        ]
+    )
+    repo = Repository(collection, MusicalPiece)
+    events = []
+    repo.add_write_listener(
+        lambda event, doc: events.append((event, doc.get("_id"), doc.get("title")))
+    )
+
+    report = repo.upsert_objects(
+        [
+            MusicalPiece(title="Prelude (rev.)", music_id_number="m1", image_url="new.jpg"),
+            fugue,
+            MusicalPiece(title="Nocturne", pdf_url="n.pdf", image_url="n.jpg"),
+        ],
+        keys=("music_id_number", "pdf_url"),
+        insert_only=("image_url",),
+    )
+
+    assert (report.inserted, report.updated, report.skipped) == (1, 1, 1)
+    assert collection.docs[0]["title"] == "Prelude (rev.)"
+    assert collection.docs[0]["image_url"] == "old.jpg"
+    assert collection.docs[2]["image_url"] == "n.jpg"
+    assert collection.docs[2]["schema_version"] == SCHEMA_VERSION
+    assert ("insert", collection.docs[2]["_id"], "Nocturne") in events
+    # Updated documents reach the listeners with their stored _id.
+    assert ("update", 1, "Prelude (rev.)") in events
+
+
+def test_upsert_objects_clears_fields_gone_upstream():
+    collection = FakeCollection(
+        [
+            {
+                "_id": 1,
+                "title": "Duo",
+                "music_id_number": "m1",
+                "instruments": "Violin, Cello",
+                "instrument_keys": ["violin", "cello"],
+                "style": "Baroque",
+                "image_url": "cover.jpg",
+            }
+        ]
+    )
+    repo = Repository(collection, MusicalPiece)
+
+    repo.upsert_objects(
+        [MusicalPiece(title="Duo", music_id_number="m1", style="Baroque")],
+        keys=("music_id_number", "pdf_url"),
+        insert_only=("image_url", "notes"),
+    )
+
+    stored = collection.docs[0]
+    assert "instruments" not in stored and "instrument_keys" not in stored
+    assert stored["style"] == "Baroque"
+    # Insert-only fields are never cleared by a re-scrape.
+    assert stored["image_url"] == "cover.jpg"
+
+
+def test_upsert_objects_counts_write_errors_apart_from_no_ops():
+    piece = MusicalPiece(title="Fugue", pdf_url="f.pdf")
+    collection = FakeCollection([{"_id": 1, **Repository._insert_payload(piece)}])
+
+    def bulk_write(operations, ordered=True):
+        raise BulkWriteError(
+            {
+                "nInserted": 0,
+                "nModified": 0,
+                "upserted": [],
+                "writeErrors": [{"index": 1, "code": 11000, "errmsg": "duplicate key"}],
+            }
+        )
+
+    collection.bulk_write = bulk_write
+    repo = Repository(collection, MusicalPiece)
+
+    report = repo.upsert_objects(
+        [piece, MusicalPiece(title="Nocturne", pdf_url="n.pdf")], keys=("pdf_url",)
+    )
+
+    assert (report.inserted, report.updated, report.skipped, report.failed) == (0, 0, 1, 1)
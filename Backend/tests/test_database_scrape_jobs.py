@@ -0,0 +1,60 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.database.scrape_jobs import ScrapeJobConflict, ScrapeJobStore
+from tests.conftest import FakeAsyncCollection
+
+
+def test_one_running_job_per_catalog():
+    store = ScrapeJobStore(FakeAsyncCollection())
+
+    async def _run():
+        job = await store.create("mutopia", "new", 20)
+        with pytest.raises(ScrapeJobConflict) as exc:
+            await store.create("mutopia", "full", None)
+        other = await store.create("imslp", "full", None)
+        await store.finish(job["_id"], "done")
+        return job, exc.value, other, await store.create("mutopia", "full", None)
+
+    job, conflict, other, again = asyncio.run(_run())
+    assert conflict.job_id == job["_id"]
+    assert other["status"] == "running"
+    assert again["_id"] != job["_id"]
+
+
+def test_checkpoint_reports_cancel_requests():
+    collection = FakeAsyncCollection()
+    store = ScrapeJobStore(collection)
+
+    async def _run():
+        job = await store.create("mutopia", "new", None)
+        saved = await store.checkpoint(job["_id"], checkpoint=7, processed=5)
+        assert await store.request_cancel(job["_id"])
+        flagged = await store.checkpoint(job["_id"], checkpoint=9)
+        await store.finish(job["_id"], "cancelled")
+        return saved, flagged, await store.checkpoint(job["_id"], checkpoint=10)
+
+    saved, flagged, finished = asyncio.run(_run())
+    assert saved["checkpoint"] == 7 and "cancel_requested" not in saved
+    assert flagged["cancel_requested"] is True
+    assert finished is None
+    assert collection.docs[0]["checkpoint"] == 9
+
+
+def test_claim_stale_takes_over_jobs_without_heartbeat():
+    collection = FakeAsyncCollection()
+    store = ScrapeJobStore(collection)
+
+    async def _run():
+        fresh = await store.create("mutopia", "new", None)
+        orphan = await store.create("imslp", "new", None)
+        collection.docs[1]["heartbeat_at"] = datetime.now(timezone.utc) - timedelta(
+            minutes=5
+        )
+        return fresh, orphan, await store.claim_stale(60), await store.claim_stale(60)
+
+    fresh, orphan, claimed, again = asyncio.run(_run())
+    assert claimed["_id"] == orphan["_id"]
+    assert again is None
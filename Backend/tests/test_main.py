@@ -21,16 +21,47 @@ def test_lifespan_attaches_db(monkeypatch):
         def close(self):
             closed["closed"] = True
 
+    async def close_async():
+        closed["async_closed"] = True
+
+    async def rebuild_catalog():
+        closed["catalog"] = True
+
+    class FakeScrapeJobs:
+        async def start(self):
+            closed["scrape_jobs"] = "started"
+
+        async def stop(self):
+            closed["scrape_jobs"] = "stopped"
+
     fake_container = types.SimpleNamespace(
-        db=types.SimpleNamespace(client=FakeClient())
+        db=types.SimpleNamespace(
+            client=FakeClient(),
+            close_async=close_async,
+            async_pieces_collection="pieces",
+        ),
+        async_piece_dao=types.SimpleNamespace(
+            rebuild_catalog=rebuild_catalog
+        ),
+        scrape_jobs=FakeScrapeJobs(),
     )
     monkeypatch.setattr(main, "get_container", lambda: fake_container)
 
+    async def fake_ensure_indexes(collection):
+        closed["indexed"] = collection
+
+    monkeypatch.setattr(main, "ensure_indexes", fake_ensure_indexes)
+
     app = main.create_app()
 
     async def _run():
         async with main.lifespan(app):
             assert app.state.db is fake_container.db
+            assert closed["indexed"] == "pieces"
+            assert closed["catalog"] is True
+            assert closed["scrape_jobs"] == "started"
+        assert closed["scrape_jobs"] == "stopped"
         assert closed["closed"] is True
+        assert closed["async_closed"] is True
 
     asyncio.run(_run())
@@ -1,6 +1,7 @@
 import pytest
 
 from src.schemas.musical_piece import MusicalPiece
+from src.schemas.piece_summary import PieceSummary
 
 
 def test_title_validator():
@@ -15,3 +16,14 @@ def test_pdf_url_validator():
     assert MusicalPiece.model_validate({"title": "With PDF", "pdf_url": None})
     with pytest.raises(ValueError):
         MusicalPiece.model_validate({"title": "With PDF", "pdf_url": "   "})
+
+
+def test_piece_summary_follows_musical_piece_fields():
+    expected = [
+        name
+        for name in MusicalPiece.model_fields
+        if name != "notes" and name not in MusicalPiece.INTERNAL_FIELDS
+    ]
+
+    assert list(PieceSummary.model_fields) == expected
+    assert PieceSummary.model_fields["db_id"].alias == "_id"
@@ -1,3 +1,4 @@
+from src.database.facet_cache import FacetCache
 from src.database.musical_piece_dao import MusicalPieceDAO
 from src.schemas.musical_piece import MusicalPiece
 from tests.conftest import FakeDatabase
@@ -7,7 +8,7 @@ def test_musical_piece_dao_inserts_and_reads():
     fake_db = FakeDatabase()
     # Preload collection with one document
     fake_db.pieces_collection.docs.append(
-        {"_id": 1, "title": "Existing", "style": "Jazz"}
+        {"_id": 1, "title": "Existing", "style": "Jazz", "style_key": "jazz"}
     )
     dao = MusicalPieceDAO(fake_db)
 
@@ -22,3 +23,61 @@ def test_musical_piece_dao_inserts_and_reads():
 
     by_style = dao.get_pieces_by_style("jazz")
     assert by_style[0]["style"] == "Jazz"
+
+
+def test_sync_inserts_invalidate_the_shared_facet_cache():
+    facets = FacetCache()
+    facets._entries["style"] = (float("inf"), ["Baroque"])
+    dao = MusicalPieceDAO(FakeDatabase(), facets=facets)
+
+    dao.insert_object_to_db(MusicalPiece(title="Waltz", style="Romantic"))
+
+    assert facets._entries == {}
+
+
+def test_get_scrape_states_reads_only_the_scrape_fields():
+    fake_db = FakeDatabase()
+    fake_db.pieces_collection.docs.append(
+        {
+            "_id": 1,
+            "title": "Prelude",
+            "music_id_number": "Mutopia-2024/03/02-1",
+            "source_url": "https://www.mutopiaproject.org/cgibin/piece-info.cgi?id=1",
+            "notes": [{"pitch": "C4"}],
+        }
+    )
+
+    states = MusicalPieceDAO(fake_db).get_scrape_states()
+    assert states == [
+        {
+            "music_id_number": "Mutopia-2024/03/02-1",
+            "source_url": "https://www.mutopiaproject.org/cgibin/piece-info.cgi?id=1",
+        }
+    ]
+
+
+def test_update_scrape_states_rewrites_only_the_validators():
+    fake_db = FakeDatabase()
+    stored = {
+        "_id": 1,
+        "title": "Prelude",
+        "music_id_number": "Mutopia-2024/01/01-1",
+        "image_url": "cover.png",
+        "http_etag": '"v1"',
+        "http_last_modified": "Mon, 01 Jan 2024 00:00:00 GMT",
+    }
+    fake_db.pieces_collection.docs.append(dict(stored))
+    dao = MusicalPieceDAO(fake_db)
+    scraped = MusicalPiece(
+        title="Prelude (parsed)",
+        music_id_number="Mutopia-2024/01/01-1",
+        source_url="http://mutopia.test/cgibin/piece-info.cgi?id=1",
+        http_etag='"v2"',
+    )
+
+    assert dao.update_scrape_states([scraped, MusicalPiece(title="No key")]) == 1
+    doc = fake_db.pieces_collection.docs[0]
+    assert doc["title"] == "Prelude" and doc["image_url"] == "cover.png"
+    assert doc["http_etag"] == '"v2"'
+    assert doc["source_url"] == "http://mutopia.test/cgibin/piece-info.cgi?id=1"
+    assert "http_last_modified" not in doc
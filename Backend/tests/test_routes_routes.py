@@ -1,24 +1,33 @@
 import asyncio
+import json
 
 import pytest
+from fastapi import Request, Response
 from pymongo.errors import PyMongoError
 
+from src.ai_agent.notes_generation import NotesGenerator
 from src.routes import routes
-from tests.conftest import FakePieceDAO
+from src.database.pagination import encode_cursor
+from src.database.info_cache import InfoCache
+from src.database.scrape_jobs import ScrapeJobConflict
+from src.database.musical_piece_dao import AsyncMusicalPieceDAO
+from src.schemas.composer_piece_info import ComposerPieceInfo
+from src.utils.notes_codec import decode_notes, encode_notes
+from tests.conftest import FakeAsyncCollection, FakeAsyncPieceDAO, FakeDatabase
 
 
 def test_get_pieces_by_style(monkeypatch):
-    fake = FakePieceDAO()
+    fake = FakeAsyncPieceDAO()
     fake.by_style_result = [{"title": "A"}]
     monkeypatch.setattr(routes, "piece_dao", fake)
 
-    result = asyncio.run(routes.get_pieces_by_style("jazz"))
+    result = asyncio.run(routes.get_pieces_by_style("jazz", Response()))
     assert result == [{"title": "A"}]
     assert fake.style_queries == ["jazz"]
 
 
 def test_get_pieces_by_name(monkeypatch):
-    fake = FakePieceDAO()
+    fake = FakeAsyncPieceDAO()
     fake.by_title_result = [{"title": "B"}]
     monkeypatch.setattr(routes, "piece_dao", fake)
 
@@ -28,43 +37,472 @@ def test_get_pieces_by_name(monkeypatch):
 
 
 def test_get_pieces_by_style_raises_on_db_error(monkeypatch):
-    class BoomDAO(FakePieceDAO):
-        def get_pieces_by_style(self, style: str):
+    class BoomDAO(FakeAsyncPieceDAO):
+        async def get_pieces_by_style(self, style: str):
             raise PyMongoError("db down")
 
     monkeypatch.setattr(routes, "piece_dao", BoomDAO())
 
     with pytest.raises(routes.HTTPException) as exc:
-        asyncio.run(routes.get_pieces_by_style("jazz"))
+        asyncio.run(routes.get_pieces_by_style("jazz", Response()))
     assert exc.value.status_code == 500
 
 
-def test_start_scrapping_endpoint_invokes_scraper(monkeypatch):
-    called = {}
+class FakeScrapeJobs:
+    def __init__(self, running: str | None = None):
+        self.submitted = []
+        self.running = running
 
-    def fake_start_scrapping(max_pieces, delay):
-        called["args"] = (max_pieces, delay)
+    async def submit(self, mode, max_pieces):
+        if self.running:
+            raise ScrapeJobConflict(self.running)
+        self.submitted.append((mode, max_pieces))
+        return {"id": "job1", "status": "running"}
 
-    monkeypatch.setattr(routes.mutopia, "start_scrapping", fake_start_scrapping)
-    tasks = routes.BackgroundTasks()
+    async def status(self, job_id):
+        return {"id": job_id, "pages_per_second": 2.5} if job_id == "job1" else None
 
-    result = asyncio.run(routes.start_scrapping_endpoint(tasks))
-    assert result == {"status": "started", "max_pieces": routes.config.MAX_PIECES}
-    assert len(tasks.tasks) == 1
-    assert tasks.tasks[0].func is fake_start_scrapping
-    assert tasks.tasks[0].kwargs["max_pieces"] == routes.config.MAX_PIECES
+    async def cancel(self, job_id):
+        return job_id == "job1"
+
+
+def test_start_scrapping_endpoint_submits_a_job(monkeypatch):
+    jobs = FakeScrapeJobs()
+    monkeypatch.setattr(routes, "scrape_jobs", jobs)
+
+    result = asyncio.run(routes.start_scrapping_endpoint())
+    assert result == {
+        "status": "started",
+        "max_pieces": routes.config.MAX_PIECES,
+        "mode": routes.config.SCRAPPING_MODE,
+        "job_id": "job1",
+    }
+    assert jobs.submitted == [(routes.config.SCRAPPING_MODE, routes.config.MAX_PIECES)]
 
 
 def test_start_scrapping_endpoint_respects_query_param(monkeypatch):
-    called = {}
+    jobs = FakeScrapeJobs()
+    monkeypatch.setattr(routes, "scrape_jobs", jobs)
+
+    result = asyncio.run(routes.start_scrapping_endpoint(max_pieces=5, mode="full"))
+    assert result["max_pieces"] == 5 and result["mode"] == "full"
+    assert jobs.submitted == [("full", 5)]
+
+
+def test_start_scrapping_endpoint_rejects_unknown_mode(monkeypatch):
+    monkeypatch.setattr(routes, "scrape_jobs", FakeScrapeJobs())
+    with pytest.raises(routes.HTTPException) as exc:
+        asyncio.run(routes.start_scrapping_endpoint(mode="all"))
+    assert exc.value.status_code == 400
+
+
+def test_start_scrapping_endpoint_refuses_a_second_crawl(monkeypatch):
+    monkeypatch.setattr(routes, "scrape_jobs", FakeScrapeJobs(running="job0"))
+    with pytest.raises(routes.HTTPException) as exc:
+        asyncio.run(routes.start_scrapping_endpoint_size_provided(10))
+    assert exc.value.status_code == 409
+    assert exc.value.detail["job_id"] == "job0"
+
+
+def test_scrape_job_status_and_cancel(monkeypatch):
+    monkeypatch.setattr(routes, "scrape_jobs", FakeScrapeJobs())
+
+    assert asyncio.run(routes.scrape_job_status("job1"))["pages_per_second"] == 2.5
+    assert asyncio.run(routes.cancel_scrape_job("job1"))["status"] == "cancelling"
+    for endpoint in (routes.scrape_job_status, routes.cancel_scrape_job):
+        with pytest.raises(routes.HTTPException) as exc:
+            asyncio.run(endpoint("nope"))
+        assert exc.value.status_code == 404
+
+
+def test_get_pieces_by_style_forwards_page_params(monkeypatch):
+    fake = FakeAsyncPieceDAO()
+    monkeypatch.setattr(routes, "piece_dao", fake)
+    cursor = encode_cursor(5)
+
+    asyncio.run(
+        routes.get_pieces_by_style(
+            "jazz", Response(), limit=10, after=cursor, fields="title, composer"
+        )
+    )
+    assert fake.page_params == {
+        "limit": 10,
+        "after": 5,
+        "fields": ["title", "composer"],
+    }
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"limit": 0},
+        {"after": "not-a-cursor"},
+        {"fields": "title,secret"},
+        {"fields": "title,http_etag"},
+    ],
+)
+def test_get_pieces_by_style_rejects_bad_page_params(monkeypatch, kwargs):
+    monkeypatch.setattr(routes, "piece_dao", FakeAsyncPieceDAO())
+
+    with pytest.raises(routes.HTTPException) as exc:
+        asyncio.run(routes.get_pieces_by_style("jazz", Response(), **kwargs))
+    assert exc.value.status_code == 400
+
+
+class LazyCursor:
+    """Generates documents on demand, like a driver cursor over a big collection."""
+
+    def __init__(self, count: int):
+        self._ids = iter(range(count))
+        self.consumed = 0
+
+    def sort(self, *_args):
+        return self
+
+    def limit(self, *_args):
+        return self
+
+    def batch_size(self, *_args):
+        return self
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        try:
+            i = next(self._ids)
+        except StopIteration:
+            raise StopAsyncIteration
+        self.consumed += 1
+        return {
+            "_id": i,
+            "title": f"Piece {i}",
+            "composer": "Anonymous",
+            "notes": [{"time": f"0:{n}:0", "note": "C4"} for n in range(4)],
+        }
+
+
+class LazyCollection:
+    def __init__(self, count: int):
+        self.count = count
+        self.cursors: list[LazyCursor] = []
+
+    def find(self, *_args):
+        self.cursors.append(LazyCursor(self.count))
+        return self.cursors[-1]
+
+
+def _ndjson_request() -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/pieces",
+            "query_string": b"",
+            "headers": [(b"accept", b"application/x-ndjson")],
+        }
+    )
+
+
+def test_get_all_pieces_streams_ndjson(monkeypatch):
+    fake_db = FakeDatabase()
+    fake_db.pieces_collection.docs.extend(
+        [{"_id": 1, "title": "Prélude"}, {"_id": 2, "title": "  "}]
+    )
+    monkeypatch.setattr(routes, "piece_dao", AsyncMusicalPieceDAO(fake_db))
+
+    response = asyncio.run(routes.get_all_pieces(_ndjson_request(), Response()))
+
+    async def _collect():
+        return [chunk async for chunk in response.body_iterator]
+
+    lines = asyncio.run(_collect())
+    assert response.media_type == "application/x-ndjson"
+    assert [json.loads(line)["title"] for line in lines] == ["Prélude"]
+
+
+def _stream_lines(response) -> list[dict]:
+    async def _collect():
+        return [json.loads(chunk) async for chunk in response.body_iterator]
+
+    return asyncio.run(_collect())
+
+
+def test_streaming_honours_limit_and_after(monkeypatch):
+    fake_db = FakeDatabase()
+    fake_db.pieces_collection.docs.extend(
+        [{"_id": i, "title": f"Piece {i}"} for i in (3, 1, 4, 2, 5)]
+    )
+    monkeypatch.setattr(routes, "piece_dao", AsyncMusicalPieceDAO(fake_db))
+
+    response = asyncio.run(
+        routes.get_all_pieces(
+            _ndjson_request(), Response(), limit=2, after=encode_cursor(2)
+        )
+    )
+
+    assert [line["title"] for line in _stream_lines(response)] == ["Piece 3", "Piece 4"]
+
+
+def test_streaming_ends_with_an_error_line_when_the_cursor_fails(monkeypatch):
+    class FailingPieces:
+        def stream_all_pieces(self, **_options):
+            async def _pieces():
+                yield {"title": "Prélude"}
+                raise PyMongoError("cursor killed")
+
+            return _pieces()
+
+    monkeypatch.setattr(routes, "piece_dao", FailingPieces())
+
+    response = asyncio.run(routes.get_all_pieces(_ndjson_request(), Response()))
+
+    assert _stream_lines(response) == [{"title": "Prélude"}, {"error": "cursor killed"}]
+
+
+def test_streaming_sends_the_first_line_before_the_cursor_is_exhausted(monkeypatch):
+    fake_db = FakeDatabase()
+    collection = fake_db.async_pieces_collection = LazyCollection(10_000)
+    monkeypatch.setattr(routes, "piece_dao", AsyncMusicalPieceDAO(fake_db))
+
+    async def _stream():
+        response = await routes.get_all_pieces(_ndjson_request(), Response(), stream=True)
+        lines = response.body_iterator
+        first = json.loads(await anext(lines))
+        consumed_at_first_line = collection.cursors[0].consumed
+        rest = [line async for line in lines]
+        return first, consumed_at_first_line, len(rest) + 1
+
+    first, consumed_at_first_line, count = asyncio.run(_stream())
+
+    assert first["title"] == "Piece 0"
+    assert consumed_at_first_line == 1
+    assert count == 10_000
+
+
+def test_get_pieces_number_counts_without_fetching(monkeypatch):
+    fake_db = FakeDatabase()
+    fake_db.pieces_collection.docs.extend(
+        [
+            {"_id": 1, "title": "A", "style": "Baroque", "style_key": "baroque"},
+            {"_id": 2, "title": "B", "style": "Jazz", "style_key": "jazz"},
+        ]
+    )
+    dao = AsyncMusicalPieceDAO(fake_db)
+
+    async def no_fetch():
+        raise AssertionError("count must not materialize the collection")
+
+    dao.get_all_pieces = no_fetch
+    monkeypatch.setattr(routes, "piece_dao", dao)
+
+    assert asyncio.run(routes.get_pieces_number()) == [{"number_of_pieces": 2}]
+    assert asyncio.run(routes.get_pieces_number(style="jazz")) == [
+        {"number_of_pieces": 1}
+    ]
+
+
+def test_search_pieces_returns_ranked_page_with_total(monkeypatch):
+    fake_db = FakeDatabase()
+    fake_db.pieces_collection.docs.extend(
+        [
+            {"_id": 1, "title": "Sonata", "composer": "Beethoven"},
+            {"_id": 2, "title": "Für Elise", "composer": "Beethoven"},
+            {"_id": 3, "title": "Beethoven Variations", "composer": "Liszt"},
+        ]
+    )
+    monkeypatch.setattr(routes, "piece_dao", AsyncMusicalPieceDAO(fake_db))
+    response = Response()
+
+    result = asyncio.run(
+        routes.search_pieces("beethoven", response, limit=1, fields="title")
+    )
+
+    assert result == [{"_id": "3", "title": "Beethoven Variations"}]
+    assert response.headers["X-Total-Count"] == "3"
+
+
+def test_get_pieces_by_composer_fuzzy_resolves_misspelling(monkeypatch):
+    fake_db = FakeDatabase()
+    fake_db.pieces_collection.docs.extend(
+        [
+            {"_id": 1, "title": "Nocturne", "composer": "Frédéric Chopin"},
+            {"_id": 2, "title": "Sonata", "composer": "Ludwig van Beethoven"},
+        ]
+    )
+    monkeypatch.setattr(routes, "piece_dao", AsyncMusicalPieceDAO(fake_db))
+
+    result = asyncio.run(
+        routes.get_pieces_by_composer("Shopin", Response(), fuzzy=True)
+    )
+
+    assert [piece["title"] for piece in result] == ["Nocturne"]
+
+
+def test_autocomplete_returns_suggestions(monkeypatch):
+    fake_db = FakeDatabase()
+    fake_db.pieces_collection.docs.extend(
+        [
+            {"_id": 1, "title": "Nocturne", "composer": "Frédéric Chopin"},
+            {"_id": 2, "title": "Chorale", "composer": "Bach"},
+        ]
+    )
+    monkeypatch.setattr(routes, "piece_dao", AsyncMusicalPieceDAO(fake_db))
+
+    result = asyncio.run(routes.autocomplete("cho", field="composer"))
+
+    assert result == {"suggestions": [{"field": "composer", "value": "Frédéric Chopin"}]}
+
+
+def test_autocomplete_rejects_unknown_field_and_bad_limit():
+    with pytest.raises(routes.HTTPException) as exc:
+        asyncio.run(routes.autocomplete("cho", field="notes"))
+    assert exc.value.status_code == 400
+
+    with pytest.raises(routes.HTTPException) as exc:
+        asyncio.run(routes.autocomplete("cho", limit=0))
+    assert exc.value.status_code == 400
+
+
+def test_get_facets_passes_filters(monkeypatch):
+    fake_db = FakeDatabase()
+    fake_db.pieces_collection.docs.extend(
+        [
+            {"_id": 1, "title": "A", "composer": "Bach", "style": "Baroque", "style_key": "baroque"},
+            {"_id": 2, "title": "B", "composer": "Satie", "style": "Modern", "style_key": "modern"},
+        ]
+    )
+    monkeypatch.setattr(routes, "piece_dao", AsyncMusicalPieceDAO(fake_db))
+
+    result = asyncio.run(routes.get_facets(composer="bach"))
+
+    assert result["total"] == 1
+    assert result["styles"] == [{"value": "Baroque", "count": 1}]
+    assert result["composers"] == [
+        {"value": "Bach", "count": 1},
+        {"value": "Satie", "count": 1},
+    ]
+
+
+def test_get_notes_with_ai_fetches_only_notes_and_pdf_url(monkeypatch):
+    fake_db = FakeDatabase()
+    fake_db.pieces_collection.docs.append(
+        {"_id": "p1", "title": "Prelude", "composer": "Bach", "notes": [{"time": "0:0"}]}
+    )
+    monkeypatch.setattr(routes, "piece_dao", AsyncMusicalPieceDAO(fake_db))
+
+    result = asyncio.run(routes.get_notes_with_ai("p1"))
+
+    assert result == {"notes": [{"time": "0:0"}]}
+    projection = fake_db.pieces_collection.find_one_projections[-1]
+    assert "composer" not in projection
+    assert projection["notes"] == 1 and projection["pdf_url"] == 1
+
+
+def test_get_notes_with_ai_can_send_packed_notes(monkeypatch):
+    notes = [{"time": "0:0:0", "note": "C4", "duration": "4n", "velocity": 0.8}]
+    fake_db = FakeDatabase()
+    fake_db.pieces_collection.docs.append(
+        {"_id": "p1", "title": "Prelude", "notes": encode_notes(notes)}
+    )
+    monkeypatch.setattr(routes, "piece_dao", AsyncMusicalPieceDAO(fake_db))
+
+    packed = asyncio.run(routes.get_notes_with_ai("p1", notes_format="binary"))
+    plain = asyncio.run(routes.get_notes_with_ai("p1"))
+
+    assert packed.media_type == "application/octet-stream"
+    assert decode_notes(packed.body) == notes
+    assert plain == {"notes": notes}
+    with pytest.raises(routes.HTTPException) as exc:
+        asyncio.run(routes.get_notes_with_ai("p1", notes_format="xml"))
+    assert exc.value.status_code == 400
+
+
+def test_get_notes_with_ai_generates_missing_notes_once(monkeypatch):
+    notes = [{"time": "0:0:0", "note": "C4", "duration": "4n", "velocity": 0.8}]
+    fake_db = FakeDatabase()
+    fake_db.pieces_collection.docs.append(
+        {"_id": "p1", "title": "Prelude", "pdf_url": "https://example.com/p1.pdf"}
+    )
+    dao = AsyncMusicalPieceDAO(fake_db)
+    calls = []
+
+    async def transcribe(agent, pdf_url):
+        calls.append(pdf_url)
+        await asyncio.sleep(0.01)
+        return notes
+
+    monkeypatch.setattr(routes, "piece_dao", dao)
+    monkeypatch.setattr(
+        routes,
+        "notes_generator",
+        NotesGenerator(dao, transcribe=transcribe, agent_factory=object),
+    )
+
+    async def _run():
+        return await asyncio.gather(*(routes.get_notes_with_ai("p1") for _ in range(3)))
+
+    assert asyncio.run(_run()) == [{"notes": notes}] * 3
+    assert len(calls) == 1
+
+
+def test_get_notes_with_ai_returns_503_while_another_worker_generates(monkeypatch):
+    class PendingGenerator:
+        async def generate(self, piece_id, pdf_url):
+            raise routes.NotesGenerationPending(piece_id)
+
+    fake_db = FakeDatabase()
+    fake_db.pieces_collection.docs.append(
+        {"_id": "p1", "title": "Prelude", "pdf_url": "https://example.com/p1.pdf"}
+    )
+    monkeypatch.setattr(routes, "piece_dao", AsyncMusicalPieceDAO(fake_db))
+    monkeypatch.setattr(routes, "notes_generator", PendingGenerator())
+
+    with pytest.raises(routes.HTTPException) as exc:
+        asyncio.run(routes.get_notes_with_ai("p1"))
+    assert exc.value.status_code == 503
+
+
+def test_notes_jobs_admin_endpoints(monkeypatch):
+    class FakePool:
+        async def seed(self):
+            return 2
+
+        async def stats(self):
+            return {"queue_depth": 2, "throughput_per_minute": 0.0}
+
+    monkeypatch.setattr(routes, "pretranscription", FakePool())
+
+    assert asyncio.run(routes.seed_notes_jobs()) == {"queued": 2}
+    assert asyncio.run(routes.notes_jobs_stats())["queue_depth"] == 2
+
+
+def test_ai_cache_admin_endpoint_reports_hit_ratio(monkeypatch):
+    class FakeCache:
+        async def stats(self):
+            return {"entries": 3, "hits": 1, "misses": 3, "hit_ratio": 0.25}
+
+    monkeypatch.setattr(routes, "ai_cache", FakeCache())
+
+    assert asyncio.run(routes.ai_cache_stats())["hit_ratio"] == 0.25
+
+
+def test_composer_info_is_served_from_the_cache(monkeypatch):
+    calls = []
+
+    async def fake_composer_info(name):
+        calls.append(name)
+        return ComposerPieceInfo(info="Cantor of Leipzig", image_url="http://img")
 
-    def fake_start_scrapping(max_pieces, delay):
-        called["args"] = (max_pieces, delay)
+    monkeypatch.setattr(routes.repository, "composer_info", fake_composer_info)
+    monkeypatch.setattr(
+        routes,
+        "composer_info_cache",
+        InfoCache(FakeAsyncCollection(), ComposerPieceInfo, namespace="composer"),
+    )
 
-    monkeypatch.setattr(routes.mutopia, "start_scrapping", fake_start_scrapping)
-    tasks = routes.BackgroundTasks()
+    first = asyncio.run(routes.ai_composer_info("Bach"))
+    second = asyncio.run(routes.ai_composer_info("bach"))
 
-    result = asyncio.run(routes.start_scrapping_endpoint(tasks, max_pieces=5))
-    assert result == {"status": "started", "max_pieces": 5}
-    assert len(tasks.tasks) == 1
-    assert tasks.tasks[0].kwargs["max_pieces"] == 5
+    assert first == second
+    assert calls == ["Bach"]
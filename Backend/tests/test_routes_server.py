@@ -25,11 +25,15 @@ def test_health_skips_db(monkeypatch):
 def test_health_reports_ok(monkeypatch):
     monkeypatch.setenv("HEALTHCHECK_DB", "true")
     client = SimpleNamespace(admin=SimpleNamespace(command=lambda *_args: {"ok": 1}))
-    pieces_collection = SimpleNamespace(count_documents=lambda *_args: 2)
+    monkeypatch.setattr(server, "get_db", lambda: SimpleNamespace(client=client))
+
+    async def count_pieces():
+        return 2
+
     monkeypatch.setattr(
         server,
-        "get_db",
-        lambda: SimpleNamespace(client=client, pieces_collection=pieces_collection),
+        "get_async_piece_dao",
+        lambda: SimpleNamespace(count_pieces=count_pieces),
     )
 
     result = asyncio.run(server.health())
@@ -47,12 +51,7 @@ def test_health_reports_unhealthy(monkeypatch):
         raise PyMongoError("no ping")
 
     client = SimpleNamespace(admin=SimpleNamespace(command=failing_command))
-    pieces_collection = SimpleNamespace(count_documents=lambda *_args: 0)
-    monkeypatch.setattr(
-        server,
-        "get_db",
-        lambda: SimpleNamespace(client=client, pieces_collection=pieces_collection),
-    )
+    monkeypatch.setattr(server, "get_db", lambda: SimpleNamespace(client=client))
 
     result = asyncio.run(server.health())
     assert result == {
@@ -0,0 +1,71 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.scrapping.crawler import Crawler, HostRateLimiter, decode_html
+
+
+def _crawler(handler, **options):
+    options = {"rate_per_host": 1000.0, "backoff": 0.0, **options}
+    return Crawler(transport=httpx.MockTransport(handler), **options)
+
+
+def test_fetch_retries_transient_failures():
+    statuses = [503, 429, 200]
+
+    def handler(request):
+        return httpx.Response(statuses.pop(0), content=b"<h2>ok</h2>")
+
+    async def _run():
+        async with _crawler(handler) as crawler:
+            return await crawler.fetch("http://mutopia.test/a"), crawler
+
+    result, crawler = asyncio.run(_run())
+    assert result.status == 200 and result.text == "<h2>ok</h2>"
+    assert crawler.requests == 3 and crawler.retried == 2
+
+
+def test_fetch_gives_up_after_the_last_retry():
+    def handler(request):
+        return httpx.Response(502)
+
+    async def _run():
+        async with _crawler(handler, retries=1) as crawler:
+            await crawler.fetch("http://mutopia.test/a")
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(_run())
+
+
+def test_fetch_does_not_retry_client_errors_and_returns_not_modified():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(404 if request.url.path == "/missing" else 304)
+
+    async def _run():
+        async with _crawler(handler) as crawler:
+            not_modified = await crawler.fetch("http://mutopia.test/same")
+            with pytest.raises(httpx.HTTPStatusError):
+                await crawler.fetch("http://mutopia.test/missing")
+            return not_modified
+
+    assert asyncio.run(_run()).status == 304
+    assert calls == ["/same", "/missing"]
+
+
+def test_rate_limiter_keeps_one_bucket_per_host():
+    limiter = HostRateLimiter(rate=1000.0)
+
+    async def _run():
+        for url in ("http://a.test/1", "http://a.test/2", "http://b.test/1"):
+            await limiter.acquire(url)
+
+    asyncio.run(_run())
+    assert set(limiter._buckets) == {"a.test", "b.test"}
+
+
+def test_decode_html_detects_utf8_without_a_charset_header():
+    assert decode_html("Pièces pour piano".encode("utf-8")) == "Pièces pour piano"
@@ -0,0 +1,39 @@
+from src.scrapping.incremental import (
+    KnownPieces,
+    piece_id_from_music_id,
+    piece_id_from_url,
+)
+
+URL = "https://www.mutopiaproject.org/cgibin/piece-info.cgi?id=1183"
+
+
+def test_piece_ids_from_url_and_music_id_number():
+    assert piece_id_from_url(URL) == "1183"
+    assert piece_id_from_url("https://www.mutopiaproject.org/piece-list.html") is None
+    assert piece_id_from_music_id("Mutopia-2008/01/28-1183") == "1183"
+    assert piece_id_from_music_id(None) is None
+
+
+def test_known_pieces_match_source_url_or_legacy_music_id():
+    known = KnownPieces(
+        [
+            {"source_url": "https://example.com/piece", "http_etag": '"abc"'},
+            {"music_id_number": "Mutopia-2008/01/28-1183", "last_updated": "2008/01/28"},
+        ]
+    )
+
+    assert "https://example.com/piece" in known
+    assert known.get(URL).last_updated == "2008/01/28"
+    assert URL.replace("1183", "1184") not in known
+    assert known.get("https://example.com/piece").conditional_headers() == {
+        "If-None-Match": '"abc"'
+    }
+
+
+def test_known_pieces_load_uses_the_dao_states():
+    class DAO:
+        def get_scrape_states(self):
+            return [{"source_url": URL, "http_last_modified": "Mon, 01 Jan 2024"}]
+
+    headers = KnownPieces.load(DAO()).get(URL).conditional_headers()
+    assert headers == {"If-Modified-Since": "Mon, 01 Jan 2024"}
@@ -0,0 +1,216 @@
+import asyncio
+import functools
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from src.database.bulk_writer import BulkWriteReport
+from src.database.scrape_jobs import ScrapeJobStore
+from src.scrapping import mutopia
+from src.scrapping.crawler import Crawler
+from src.scrapping.jobs import ScrapeJobManager
+from tests.conftest import FakeAsyncCollection
+
+PIECE_HTML = (
+    "<h2>Piece{n}</h2><table class='result-table'>"
+    "<tr><td><b>Style:</b> Baroque</td></tr></table><a href='/{n}.pdf'>A4 PDF</a>"
+)
+
+
+class CollectingDAO:
+    def __init__(self):
+        self.pieces = []
+
+    def upsert_pieces(self, pieces):
+        self.pieces.extend(pieces)
+        return BulkWriteReport(inserted=len(pieces))
+
+
+def _manager(collection, dao, requested, **options):
+    def handler(request):
+        path = request.url.raw_path.decode()
+        requested.append(path)
+        if path == "/piece-list.html":
+            body = "".join(
+                f'<a href="cgibin/piece-info.cgi?id={n}">{n}</a>' for n in range(5)
+            )
+        else:
+            body = PIECE_HTML.format(n=path.rsplit("=", 1)[-1])
+        return httpx.Response(200, content=body.encode())
+
+    return ScrapeJobManager(
+        ScrapeJobStore(collection),
+        dao,
+        crawler_factory=lambda: Crawler(
+            concurrency=2, rate_per_host=1000.0, transport=httpx.MockTransport(handler)
+        ),
+        crawl=functools.partial(
+            mutopia.crawl,
+            piece_list_url="http://mutopia.test/piece-list.html",
+            enrich=lambda piece: None,
+        ),
+        **options,
+    )
+
+
+async def _wait_finished(manager, job_id):
+    while (report := await manager.status(job_id))["status"] == "running":
+        await asyncio.sleep(0.01)
+    return report
+
+
+def test_submitted_job_runs_and_reports_its_counters():
+    dao, requested = CollectingDAO(), []
+    manager = _manager(FakeAsyncCollection(), dao, requested)
+
+    async def _run():
+        job = await manager.submit("full", None)
+        return await _wait_finished(manager, job["id"])
+
+    report = asyncio.run(_run())
+    assert report["status"] == "done"
+    assert report["processed"] == report["total"] == report["checkpoint"] == 5
+    assert report["stats"]["inserted"] == 5 and report["errors"] == 0
+    assert report["eta_seconds"] is None
+    assert report["stages"]["fetch"]["items"] == 5
+    assert len(dao.pieces) == 5
+
+
+def test_orphaned_job_resumes_from_its_checkpoint():
+    collection = FakeAsyncCollection()
+    dao, requested = CollectingDAO(), []
+    manager = _manager(collection, dao, requested)
+    stale = datetime.now(timezone.utc) - timedelta(minutes=5)
+    collection.docs.append(
+        {
+            "_id": "job1",
+            "catalog": "mutopia",
+            "mode": "full",
+            "max_pieces": 4,
+            "status": "running",
+            "checkpoint": 2,
+            "processed": 2,
+            "resumed_from": 0,
+            "total": 4,
+            "stats": {"pages": 2, "errors": 0, "inserted": 2},
+            "created_at": stale,
+            "started_at": stale,
+            "heartbeat_at": stale,
+        }
+    )
+
+    async def _run():
+        assert await manager.resume_stale() == ["job1"]
+        return await _wait_finished(manager, "job1")
+
+    report = asyncio.run(_run())
+    assert sorted(requested[1:]) == [
+        "/cgibin/piece-info.cgi?id=2",
+        "/cgibin/piece-info.cgi?id=3",
+    ]
+    assert sorted(piece.title for piece in dao.pieces) == ["Piece2", "Piece3"]
+    assert report["processed"] == 4 and report["stats"]["inserted"] == 4
+    assert report["status"] == "done"
+
+
+def test_cancel_stops_a_running_job():
+    async def endless_crawl(**options):
+        await asyncio.Event().wait()
+
+    manager = ScrapeJobManager(
+        ScrapeJobStore(FakeAsyncCollection()), CollectingDAO(), crawl=endless_crawl
+    )
+
+    async def _run():
+        job = await manager.submit("new", None)
+        await asyncio.sleep(0)
+        assert (await manager.status(job["id"]))["status"] == "running"
+        assert await manager.cancel(job["id"])
+        report = await _wait_finished(manager, job["id"])
+        return report, await manager.cancel(job["id"])
+
+    report, again = asyncio.run(_run())
+    assert report["status"] == "cancelled"
+    assert again is False
+
+
+def test_shutdown_leaves_the_job_running_for_a_later_resume():
+    collection = FakeAsyncCollection()
+
+    async def endless_crawl(**options):
+        await asyncio.Event().wait()
+
+    manager = ScrapeJobManager(
+        ScrapeJobStore(collection), CollectingDAO(), crawl=endless_crawl
+    )
+
+    async def _run():
+        await manager.start()
+        job = await manager.submit("new", None)
+        await asyncio.sleep(0)
+        await manager.stop()
+        return job
+
+    asyncio.run(_run())
+    assert collection.docs[0]["status"] == "running"
+    assert "one_running_per_catalog" in collection.indexes
+
+
+def test_report_estimates_the_remaining_time():
+    manager = ScrapeJobManager(ScrapeJobStore(FakeAsyncCollection()), CollectingDAO())
+    started = datetime.now(timezone.utc) - timedelta(seconds=10)
+
+    report = manager._report(
+        {
+            "_id": "job1",
+            "catalog": "mutopia",
+            "mode": "new",
+            "status": "running",
+            "max_pieces": None,
+            "checkpoint": 40,
+            "processed": 50,
+            "resumed_from": 30,
+            "total": 130,
+            "stats": {"errors": 3},
+            "created_at": started,
+            "started_at": started,
+        }
+    )
+    assert report["errors"] == 3
+    assert 1.9 < report["pages_per_second"] <= 2.0
+    assert 39 < report["eta_seconds"] < 41
+
+
+def test_jobs_share_one_parse_pool_between_start_and_stop():
+    executors = []
+
+    class FakeExecutor:
+        def __init__(self):
+            self.shut_down = False
+            executors.append(self)
+
+        def shutdown(self):
+            self.shut_down = True
+
+    async def crawl(**options):
+        crawled.append(options["executor"])
+        return {}
+
+    crawled = []
+    manager = ScrapeJobManager(
+        ScrapeJobStore(FakeAsyncCollection()),
+        CollectingDAO(),
+        crawl=crawl,
+        executor_factory=FakeExecutor,
+    )
+
+    async def _run():
+        await manager.start()
+        for _ in range(2):
+            job = await manager.submit("new", None)
+            await _wait_finished(manager, job["id"])
+        await manager.stop()
+
+    asyncio.run(_run())
+    assert len(executors) == 1 and executors[0].shut_down
+    assert crawled == [executors[0], executors[0]]
@@ -1,9 +1,16 @@
-from types import SimpleNamespace
+import asyncio
 from urllib.parse import urljoin
 
+import httpx
+import pytest
+
 from src.scrapping import mutopia
+from src.database.bulk_writer import BulkWriteReport, PieceBulkWriter
+from src.scrapping.crawler import Crawler
+from src.scrapping.incremental import KnownPieces
+from src.scrapping.progress import CrawlProgress
 from src.schemas.musical_piece import MusicalPiece
-from tests.conftest import FakePieceDAO, make_soup
+from tests.conftest import make_soup
 
 
 class FakeResponse:
@@ -65,35 +72,231 @@ def test_extract_piece_metadata(monkeypatch):
     assert piece.pdf_url.endswith("piece.pdf")
 
 
-def test_start_scrapping_inserts_and_honors_limit(monkeypatch):
-    fake_piece_dao = FakePieceDAO()
-    monkeypatch.setattr(mutopia, "piece_dao", fake_piece_dao)
-    monkeypatch.setattr(mutopia, "time", SimpleNamespace(sleep=lambda _delay: None))
+def _mutopia_transport(
+    pages: dict[str, str], requested: list | None = None, etag_version: str = ""
+):
+    def handler(request):
+        path = request.url.raw_path.decode()
+        if requested is not None:
+            requested.append((path, request.headers.get("If-None-Match")))
+        if path not in pages:
+            return httpx.Response(404)
+        etag = f'"{path}{etag_version}"'
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304)
+        return httpx.Response(200, content=pages[path].encode("utf-8"), headers={"ETag": etag})
+
+    return httpx.MockTransport(handler)
+
+
+PIECE_HTML = (
+    "<h2>{title}</h2><h4>by A</h4><table class='result-table'>"
+    "<tr><td><b>Instrument(s):</b> Piano</td></tr></table>"
+    "<a href='/{title}.pdf'>A4 PDF</a>"
+)
+
+
+class CollectingDAO:
+    def __init__(self):
+        self.batches: list[list[MusicalPiece]] = []
+        self.states: list[MusicalPiece] = []
+
+    def upsert_pieces(self, pieces):
+        self.batches.append(pieces)
+        return BulkWriteReport(inserted=len(pieces))
+
+    def update_scrape_states(self, pieces):
+        self.states.extend(pieces)
+        return len(pieces)
 
-    page_urls = ["http://example.com/1", "http://example.com/2"]
-    monkeypatch.setattr(mutopia, "get_piece_pages", lambda: page_urls)
 
-    soups = [
-        make_soup(
-            "<h2>First</h2><h4>by A</h4><table class='result-table'><tr><td><b>Instrument(s):</b> Piano</td></tr></table><a href='/a.pdf'>A4 PDF</a>"
+def _crawl(pages, dao, requested=None, etag_version="", **options):
+    async def _run():
+        async with Crawler(
+            concurrency=2,
+            rate_per_host=1000.0,
+            retries=0,
+            transport=_mutopia_transport(pages, requested, etag_version),
+        ) as crawler:
+            return await mutopia.crawl(
+                crawler=crawler,
+                piece_list_url="http://mutopia.test/piece-list.html",
+                writer=PieceBulkWriter(dao, batch_size=2),
+                enrich=lambda piece: None,
+                **options,
+            )
+
+    return asyncio.run(_run())
+
+
+def test_crawl_writes_pages_in_batches_and_honors_limit():
+    pages = {
+        "/piece-list.html": "".join(
+            f'<a href="cgibin/piece-info.cgi?id={n}">{n}</a>' for n in range(1, 5)
         ),
-        make_soup(
-            "<h2>Second</h2><h4>by B</h4><table class='result-table'><tr><td><b>Instrument(s):</b> Violin</td></tr></table><a href='/b.pdf'>A4 PDF</a>"
+        **{
+            f"/cgibin/piece-info.cgi?id={n}": PIECE_HTML.format(title=f"Piece{n}")
+            for n in range(1, 5)
+        },
+    }
+    dao = CollectingDAO()
+
+    stats = _crawl(pages, dao, max_pieces=3)
+
+    assert stats == {
+        "pages": 3,
+        "errors": 0,
+        "known": 0,
+        "unchanged": 0,
+        "inserted": 3,
+        "updated": 0,
+        "skipped": 0,
+        "failed": 0,
+    }
+    assert [len(batch) for batch in dao.batches] == [2, 1]
+    titles = sorted(piece.title for batch in dao.batches for piece in batch)
+    assert titles == ["Piece1", "Piece2", "Piece3"]
+    assert dao.batches[0][0].pdf_url.startswith("http://mutopia.test/")
+
+
+def _catalog(count: int, last_updated: str = "2024/01/01") -> dict[str, str]:
+    page = PIECE_HTML.replace(
+        "</table>", f"<tr><td><b>Last updated:</b> {last_updated}</td></tr></table>"
+    )
+    return {
+        "/piece-list.html": "".join(
+            f'<a href="cgibin/piece-info.cgi?id={n}">{n}</a>' for n in range(1, count + 1)
         ),
+        **{
+            f"/cgibin/piece-info.cgi?id={n}": page.format(title=f"Piece{n}")
+            for n in range(1, count + 1)
+        },
+    }
+
+
+def _stored(dao) -> KnownPieces:
+    return KnownPieces(
+        piece.model_dump()
+        for batch in dao.batches
+        for piece in batch
+    )
+
+
+def test_crawl_records_source_url_and_validators():
+    dao = CollectingDAO()
+    _crawl(_catalog(1), dao)
+
+    piece = dao.batches[0][0]
+    assert piece.source_url == "http://mutopia.test/cgibin/piece-info.cgi?id=1"
+    assert piece.http_etag == '"/cgibin/piece-info.cgi?id=1"'
+
+
+def test_crawl_new_mode_skips_known_pages_without_fetching():
+    first = CollectingDAO()
+    _crawl(_catalog(2), first)
+    requested = []
+    dao = CollectingDAO()
+
+    stats = _crawl(_catalog(3), dao, requested, mode="new", known=_stored(first))
+
+    assert [path for path, _ in requested] == [
+        "/piece-list.html",
+        "/cgibin/piece-info.cgi?id=3",
+    ]
+    assert stats["known"] == 2 and stats["inserted"] == 1
+    assert [piece.title for piece in dao.batches[0]] == ["Piece3"]
+
+
+def test_crawl_changed_mode_revalidates_known_pages():
+    first = CollectingDAO()
+    _crawl(_catalog(2), first)
+    known = _stored(first)
+    requested = []
+    dao = CollectingDAO()
+
+    stats = _crawl(_catalog(2), dao, requested, mode="changed", known=known)
+
+    assert stats["unchanged"] == 2 and dao.batches == []
+    sent = dict(requested)
+    assert sent["/cgibin/piece-info.cgi?id=1"] == '"/cgibin/piece-info.cgi?id=1"'
+
+
+def test_crawl_changed_mode_stores_rotated_validators_of_unchanged_pages():
+    first = CollectingDAO()
+    _crawl(_catalog(2), first)
+    dao = CollectingDAO()
+
+    stats = _crawl(
+        _catalog(2), dao, mode="changed", known=_stored(first), etag_version="-v2"
+    )
+
+    assert stats["unchanged"] == 2 and dao.batches == []
+    assert sorted(piece.http_etag for piece in dao.states) == [
+        '"/cgibin/piece-info.cgi?id=1-v2"',
+        '"/cgibin/piece-info.cgi?id=2-v2"',
     ]
+    assert all(piece.source_url for piece in dao.states)
+
+
+def test_crawl_changed_mode_refetches_updated_pieces():
+    # No validators stored: the page is fetched and "Last updated" decides.
+    known = KnownPieces(
+        [
+            {"music_id_number": "Mutopia-2024/01/01-1", "last_updated": "2024/01/01"},
+            {"music_id_number": "Mutopia-2023/05/01-2", "last_updated": "2023/05/01"},
+        ]
+    )
+    dao = CollectingDAO()
+
+    stats = _crawl(_catalog(2), dao, mode="changed", known=known)
+
+    assert stats["unchanged"] == 1
+    assert [piece.title for piece in dao.batches[0]] == ["Piece2"]
+
+
+def test_crawl_exposes_stage_timings():
+    progress = CrawlProgress()
+
+    _crawl(_catalog(3), CollectingDAO(), progress=progress)
 
-    def fake_fetch(url):
-        return soups.pop(0)
+    report = progress.stage_report()
+    assert list(report) == ["fetch", "parse", "enrich", "write"]
+    assert report["fetch"]["workers"] == 2
+    assert report["write"]["items"] == 3 and report["write"]["errors"] == 0
 
-    monkeypatch.setattr(mutopia, "fetch_piece_page", fake_fetch)
 
-    def fake_extract(url, soup=None):
-        return MusicalPiece.model_validate(
-            {"title": f"Title {url[-1]}", "instruments": "Piano"}
-        )
+def test_crawl_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        _crawl(_catalog(1), CollectingDAO(), mode="everything")
 
-    monkeypatch.setattr(mutopia, "extract_piece_metadata", fake_extract)
 
-    mutopia.start_scrapping(max_pieces=1, delay=0)
-    assert len(fake_piece_dao.inserted) == 1
-    assert fake_piece_dao.inserted[0].title == "Title 1"
+def test_crawl_counts_failed_pages():
+    pages = {"/piece-list.html": '<a href="cgibin/piece-info.cgi?id=9">9</a>'}
+    dao = CollectingDAO()
+
+    assert _crawl(pages, dao)["errors"] == 1
+    assert dao.batches == []
+
+
+def test_attach_image_keeps_going_without_an_image(monkeypatch):
+    def no_images(query):
+        raise ValueError("No photos returned for query")
+
+    monkeypatch.setattr(mutopia, "search_images", no_images)
+    piece = MusicalPiece(title="Prelude")
+
+    mutopia.attach_image(piece)
+    assert piece.image_url is None
+
+
+def test_extract_piece_metadata_repairs_mojibake():
+    html = """
+    <html>
+        <h2>PiÃ¨ces</h2>
+        <table class="result-table">
+            <tr><td><b>Style:</b> Romantic</td></tr>
+        </table>
+    </html>
+    """
+    piece = mutopia.extract_piece_metadata("http://example.com/page", soup=make_soup(html))
+    assert piece.title == "Pièces"
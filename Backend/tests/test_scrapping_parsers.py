@@ -0,0 +1,78 @@
+from pathlib import Path
+
+import pytest
+
+from src.scrapping import parsers
+
+FIXTURES = Path(__file__).parents[1] / "benchmarks" / "fixtures" / "mutopia"
+BASE_URL = "https://www.mutopiaproject.org/cgibin/piece-info.cgi?id=1"
+
+TRICKY_PAGE = """
+<h2>Étude <i>in</i> C</h2>
+<h4>by  Frédéric   Chopin</h4>
+<table class="result-table big">
+  <tr><td><b>Style:</b><a href="#">Romantic</a></td><td><b>Opus:</b></td></tr>
+  <tr><td><b>Unknown:</b> skipped</td><td>no label</td></tr>
+  <tr><td><b>Source:</b> "Paderewski" edition</td></tr>
+</table>
+<a href="split.pdf">A4 <b>pdf</b></a>
+<a href="../ftp/etude-a4.pdf"><span>A4 .pdf file</span></a>
+"""
+
+BACKENDS = parsers.available_backends()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backends_build_the_same_pieces_as_html_parser(backend):
+    pages = sorted(FIXTURES.glob("piece-[0-9]*.html"))
+    for page in pages:
+        content = page.read_bytes()
+        expected = parsers.parse_piece_page(BASE_URL, content)
+        assert parsers.parse_piece_page(BASE_URL, content, backend) == expected
+
+    expected = parsers.parse_piece_page(BASE_URL, TRICKY_PAGE)
+    assert expected.style == "Romantic" and expected.opus is None
+    assert expected.pdf_url.endswith("/ftp/etude-a4.pdf")
+    assert parsers.parse_piece_page(BASE_URL, TRICKY_PAGE, backend) == expected
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backends_list_the_same_piece_pages(backend):
+    listing = (FIXTURES / "piece-list.html").read_bytes()
+    expected = parsers.parse_piece_list_page(listing, BASE_URL)
+    assert expected
+    assert parsers.parse_piece_list_page(listing, BASE_URL, backend) == expected
+
+
+def test_missing_metadata_table_is_an_error_for_every_backend():
+    for backend in BACKENDS:
+        with pytest.raises(ValueError):
+            parsers.parse_piece_page(BASE_URL, "<h2>Title</h2>", backend)
+
+
+def test_resolve_backend_falls_back_to_html_parser(monkeypatch):
+    monkeypatch.setattr(parsers, "available_backends", lambda: ["html.parser"])
+
+    assert parsers.resolve_backend("auto") == "html.parser"
+    assert parsers.resolve_backend("selectolax") == "html.parser"
+    with pytest.raises(ValueError):
+        parsers.resolve_backend("html5lib")
+
+
+def test_parser_pool_spawns_workers_that_can_parse():
+    listing = (FIXTURES / "piece-list.html").read_bytes()
+
+    with parsers.parser_pool(1) as pool:
+        assert pool._mp_context.get_start_method() == "spawn"
+        urls = pool.submit(parsers.parse_piece_list_page, listing, BASE_URL).result()
+
+    assert urls == parsers.parse_piece_list_page(listing, BASE_URL)
+
+
+def test_make_soup_uses_a_beautifulsoup_builder_for_selectolax(monkeypatch):
+    monkeypatch.setattr(parsers, "available_backends", lambda: ["selectolax", "html.parser"])
+
+    soup = parsers.make_soup(b"<h2>Title</h2>", "auto")
+
+    assert soup.builder.NAME == "html.parser"
+    assert soup.find("h2").text == "Title"
@@ -0,0 +1,59 @@
+import asyncio
+
+from src.scrapping.pipeline import Pipeline, Stage
+
+
+def test_items_flow_through_the_stages():
+    written, errors = [], []
+
+    async def double(n):
+        if n == 3:
+            raise ValueError("bad item")
+        return n * 2
+
+    async def keep_small(n):
+        return n if n < 10 else None
+
+    async def write(n):
+        written.append(n)
+
+    pipeline = Pipeline(
+        [Stage("double", double, 2), Stage("filter", keep_small), Stage("write", write)],
+        queue_size=2,
+        on_error=lambda stage, item, exc: errors.append((stage, item, str(exc))),
+    )
+    asyncio.run(pipeline.run(range(7)))
+
+    assert sorted(written) == [0, 2, 4, 8]
+    assert errors == [("double", 3, "bad item")]
+    report = pipeline.report()
+    assert report["double"]["items"] == 6 and report["double"]["errors"] == 1
+    assert report["filter"]["dropped"] == 2
+    assert report["write"]["items"] == 4 and report["write"]["workers"] == 1
+
+
+def test_a_slow_stage_bounds_the_items_in_flight():
+    fetched, written = [], []
+    peak = 0
+
+    async def fetch(n):
+        fetched.append(n)
+        return n
+
+    async def slow_write(n):
+        nonlocal peak
+        peak = max(peak, len(fetched) - len(written))
+        await asyncio.sleep(0.001)
+        written.append(n)
+
+    pipeline = Pipeline(
+        [Stage("fetch", fetch, 4), Stage("write", slow_write)], queue_size=2
+    )
+    asyncio.run(pipeline.run(range(50)))
+
+    assert len(written) == 50
+    # 4 fetch workers holding one item each, 2 queued, 1 being written.
+    assert peak <= 4 + 2 + 1
+    report = pipeline.report()
+    assert report["fetch"]["blocked_seconds"] > 0
+    assert report["write"]["queue_peak"] == 2
@@ -0,0 +1,54 @@
+from src.database.bulk_writer import BulkWriteReport, PieceBulkWriter
+from src.schemas.musical_piece import MusicalPiece
+from src.scrapping.progress import CrawlProgress
+
+
+class DAO:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+
+    def upsert_pieces(self, pieces):
+        if self.fail:
+            raise RuntimeError("mongo down")
+        return BulkWriteReport(inserted=len(pieces))
+
+
+def test_checkpoint_waits_for_buffered_pieces_to_be_written():
+    writer = PieceBulkWriter(DAO(), batch_size=2)
+    progress = CrawlProgress()
+
+    progress.write(writer, MusicalPiece(title="A"), 0)
+    progress.handled(1)
+    assert progress.checkpoint == 0  # piece 0 is still buffered
+
+    progress.write(writer, MusicalPiece(title="B"), 3)  # flushes 0 and 3
+    assert progress.checkpoint == 2  # 2 is not handled yet
+    progress.skip(2)
+    assert progress.checkpoint == 4
+    assert progress.processed == 3
+
+
+def test_flush_releases_the_checkpoint():
+    writer = PieceBulkWriter(DAO(), batch_size=10)
+    progress = CrawlProgress(checkpoint=5, processed=5)
+
+    progress.write(writer, MusicalPiece(title="A"), 5)
+    progress.flush(writer)
+    assert progress.checkpoint == 6 and progress.processed == 6
+
+
+def test_pages_of_a_failed_batch_hold_the_checkpoint():
+    dao = DAO()
+    writer = PieceBulkWriter(dao, batch_size=2)
+    progress = CrawlProgress()
+
+    progress.write(writer, MusicalPiece(title="A"), 0)
+    dao.fail = True
+    try:
+        progress.write(writer, MusicalPiece(title="B"), 1)
+    except RuntimeError:
+        pass
+    dao.fail = False
+    progress.handled(2)
+    progress.flush(writer)
+    assert progress.checkpoint == 0
@@ -0,0 +1,93 @@
+import random
+
+from src.search.autocomplete import AutocompleteIndex, PrefixIndex
+from src.search.catalog import CatalogIndex
+
+DOCS = [
+    {"_id": 1, "title": "Nocturne in E-flat", "composer": "Frédéric Chopin", "style": "Romantic", "instruments": "Piano"},
+    {"_id": 2, "title": "Chorale Prelude", "composer": "Johann Sebastian Bach", "style": "Baroque", "instruments": "Organ"},
+    {"_id": 3, "title": "Sonata", "composer": "Ludwig van Beethoven", "style": "Classical", "instruments": "Piano/Violin"},
+]
+
+
+def test_prefix_matches_any_word_and_ranks_first_word_higher():
+    index = PrefixIndex()
+    index.rebuild(["Frédéric Chopin", "Chorale Prelude", "Chopin"])
+
+    assert index.matches("cho") == [(0, "Chopin"), (0, "Chorale Prelude"), (1, "Frédéric Chopin")]
+    assert index.matches("FRED") == [(0, "Frédéric Chopin")]
+    assert index.matches("") == []
+
+
+def test_suggest_merges_fields_and_splits_instruments():
+    index = AutocompleteIndex()
+    index.rebuild(DOCS)
+
+    assert index.suggest("vio") == [{"field": "instruments", "value": "Violin"}]
+    assert index.suggest("cho", field="title") == [{"field": "title", "value": "Chorale Prelude"}]
+    assert [s["field"] for s in index.suggest("cho")] == ["title", "composer"]
+    assert index.suggest("p", field="instruments", limit=1) == [{"field": "instruments", "value": "Piano"}]
+
+
+def test_catalog_adds_inserted_values_to_autocomplete():
+    catalog = CatalogIndex()
+    catalog.rebuild(DOCS)
+
+    catalog.on_write("insert", {"_id": 4, "title": "Gymnopédie No. 1", "composer": "Erik Satie"})
+
+    assert catalog.autocomplete.suggest("gym") == [{"field": "title", "value": "Gymnopédie No. 1"}]
+    assert catalog.autocomplete.suggest("sat", field="composer") == [{"field": "composer", "value": "Erik Satie"}]
+
+
+def test_catalog_replaces_updated_values_in_autocomplete():
+    catalog = CatalogIndex()
+    catalog.rebuild(DOCS)
+
+    catalog.on_write(
+        "update",
+        {"_id": 3, "title": "Violin Sonata", "composer": "Ludwig van Beethoven", "instruments": "Violin"},
+    )
+
+    assert catalog.autocomplete.suggest("son", field="title") == [
+        {"field": "title", "value": "Violin Sonata"}
+    ]
+    assert catalog.autocomplete.suggest("classical") == []
+    # Piece 1 still plays the piano.
+    assert catalog.autocomplete.suggest("pia", field="instruments") == [
+        {"field": "instruments", "value": "Piano"}
+    ]
+
+
+def test_removed_prefix_values_free_their_keys():
+    index = PrefixIndex()
+    index.rebuild(["Frédéric Chopin", "Chorale Prelude"])
+    index.remove("Frédéric Chopin")
+    index.add("Chopin")
+
+    assert index.matches("cho") == [(0, "Chopin"), (0, "Chorale Prelude")]
+    assert index.matches("fred") == []
+    assert len(index._values) == 2
+
+
+def test_lookup_finds_every_word_prefix_on_a_large_catalog():
+    rng = random.Random(5)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    values = [
+        " ".join("".join(rng.choices(letters, k=rng.randint(3, 9))) for _ in range(4))
+        for _ in range(20_000)
+    ]
+    index = PrefixIndex()
+    index.rebuild(values)
+
+    for query in ("ch", "sona", "xyz"):
+        expected = {
+            (rank, value)
+            for value in set(values)
+            for rank, word in enumerate(value.split())
+            if word.startswith(query) and not any(
+                earlier.startswith(query) for earlier in value.split()[:rank]
+            )
+        }
+        found = index.matches(query, limit=len(values))
+        assert set(found) == expected
+        assert [rank for rank, _ in found] == sorted(rank for rank, _ in found)
@@ -0,0 +1,100 @@
+import random
+
+from src.search.catalog import CatalogIndex
+from src.search.fuzzy import FuzzyMatcher, edit_distance
+
+COMPOSERS = [
+    "Frédéric Chopin (1810-1849)",
+    "Ludwig van Beethoven",
+    "Pyotr Ilyich Tchaikovsky",
+    "Johann Sebastian Bach",
+    "Carl Philipp Emanuel Bach",
+    "Antonín Dvořák",
+    "Erik Satie",
+]
+
+
+def _matcher() -> FuzzyMatcher:
+    matcher = FuzzyMatcher()
+    matcher.rebuild(COMPOSERS)
+    return matcher
+
+
+def test_edit_distance_counts_transpositions_and_stops_early():
+    assert edit_distance("shopin", "chopin", 2) == 1
+    assert edit_distance("bahc", "bach", 2) == 1
+    assert edit_distance("mozart", "satie", 1) == 2
+
+
+def test_resolve_common_misspellings():
+    matcher = _matcher()
+
+    assert matcher.resolve("Shopin") == ["Frédéric Chopin (1810-1849)"]
+    assert matcher.resolve("Bethoven") == ["Ludwig van Beethoven"]
+    assert matcher.resolve("Tchaikovski") == ["Pyotr Ilyich Tchaikovsky"]
+    assert matcher.resolve("dvorak") == ["Antonín Dvořák"]
+    assert matcher.resolve("Johan Bach") == ["Johann Sebastian Bach"]
+
+
+def test_resolve_keeps_ties_and_rejects_unrelated_names():
+    matcher = _matcher()
+
+    assert matcher.resolve("Bach") == ["Johann Sebastian Bach", "Carl Philipp Emanuel Bach"]
+    assert matcher.resolve("Rachmaninoff") == []
+
+
+def test_catalog_index_picks_up_inserted_composers():
+    catalog = CatalogIndex()
+    catalog.rebuild([{"_id": 1, "title": "Gymnopédie", "composer": "Erik Satie"}])
+
+    catalog.on_write("insert", {"_id": 2, "title": "Liebestraum", "composer": "Franz Liszt"})
+
+    assert catalog.composers.resolve("List") == ["Franz Liszt"]
+    assert catalog.titles.resolve("Liebestram") == ["Liebestraum"]
+
+
+def test_catalog_index_follows_updated_composers_and_titles():
+    catalog = CatalogIndex()
+    catalog.rebuild(
+        [
+            {"_id": 1, "title": "Gymnopédie", "composer": "Erik Satie"},
+            {"_id": 2, "title": "Gnossienne", "composer": "Erik Satie"},
+        ]
+    )
+
+    catalog.on_write("update", {"_id": 1, "title": "Liebestraum", "composer": "Franz Liszt"})
+
+    assert catalog.composers.resolve("List") == ["Franz Liszt"]
+    assert catalog.titles.resolve("Liebestram") == ["Liebestraum"]
+    assert catalog.titles.resolve("Gymnopedie") == []
+    # Still the composer of piece 2.
+    assert catalog.composers.resolve("Satei") == ["Erik Satie"]
+
+    catalog.on_write("update", {"_id": 2, "title": "Gnossienne", "composer": "Eric Satie"})
+    assert catalog.composers.resolve("Erik Satie") == ["Eric Satie"]
+    assert len(catalog.composers) == 2
+
+
+def test_removed_values_free_their_words_and_positions():
+    matcher = _matcher()
+    matcher.remove("Erik Satie")
+    matcher.add("Claude Debussy")
+
+    assert matcher.resolve("Satie") == []
+    assert matcher.resolve("Debusy") == ["Claude Debussy"]
+    assert len(matcher._values) == len(COMPOSERS)
+
+
+def test_match_finds_composers_in_a_large_catalog():
+    rng = random.Random(3)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    names = [
+        " ".join("".join(rng.choices(letters, k=rng.randint(4, 10))) for _ in range(3))
+        for _ in range(5_000)
+    ]
+    matcher = FuzzyMatcher()
+    matcher.rebuild(names + COMPOSERS)
+
+    assert matcher.resolve("Shopin") == ["Frédéric Chopin (1810-1849)"]
+    assert matcher.resolve("Bethoven") == ["Ludwig van Beethoven"]
+    assert matcher.resolve("Tchaikovski") == ["Pyotr Ilyich Tchaikovsky"]
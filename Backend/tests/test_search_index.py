@@ -0,0 +1,88 @@
+from src.search.catalog import CatalogIndex
+from src.search.search_index import SearchIndex, tokenize
+
+DOCS = [
+    {"_id": 1, "title": "Slavonic Dance", "composer": "Antonín Dvořák", "style": "Romantic"},
+    {"_id": 2, "title": "Trois Pièces", "composer": "Erik Satie", "style": "Modern"},
+    {"_id": 3, "title": "Romance", "composer": "Dvořák", "style": "Romantic"},
+    {"_id": 4, "title": "Nocturne", "composer": "Chopin", "style": "Romantic"},
+    {"_id": 5, "title": "Romantic Nocturne", "composer": "Field", "instruments": "Piano"},
+]
+
+
+def _index() -> SearchIndex:
+    index = SearchIndex()
+    index.rebuild(DOCS)
+    return index
+
+
+def test_tokenize_folds_accents_and_mojibake():
+    assert tokenize("Dvořák: Pièces") == ["dvorak", "pieces"]
+    assert tokenize("PiÃ¨ces") == ["pieces"]
+    assert tokenize(None) == []
+
+
+def test_search_is_accent_insensitive():
+    index = _index()
+
+    assert index.search("dvorak").ids == [3, 1]
+    assert index.search("pieces").ids == [2]
+
+
+def test_title_matches_outrank_style_matches():
+    hits = _index().search("romantic")
+
+    assert hits.total == 4
+    assert hits.ids[0] == 5
+
+
+def test_all_words_must_match_and_last_word_can_be_partial():
+    index = _index()
+
+    assert index.search("nocturne chopin").ids == [4]
+    assert index.search("noct").total == 2
+    assert index.search("nocturne satie").total == 0
+
+
+def test_limit_and_offset_page_through_ranked_hits():
+    index = _index()
+    everything = index.search("romantic").ids
+
+    assert index.search("romantic", limit=2).ids == everything[:2]
+    assert index.search("romantic", limit=2, offset=2).ids == everything[2:4]
+
+
+def test_on_write_indexes_inserts_and_replaces_existing_ids():
+    index = _index()
+
+    index.on_write("insert", {"_id": 6, "title": "Gymnopédie", "composer": "Satie"})
+    index.on_write("insert", {"_id": 4, "title": "Waltz", "composer": "Chopin"})
+    index.on_write("update_notes", {"_id": 1})
+
+    assert index.search("gymnopedie").ids == [6]
+    assert index.search("nocturne").ids == [5]
+    assert len(index) == 6
+
+
+def test_updates_reuse_the_slot_of_the_replaced_document():
+    index = _index()
+    for title in ("Waltz", "Mazurka", "Polonaise"):
+        index.on_write("update", {"_id": 4, "title": title, "composer": "Chopin"})
+
+    assert index.search("polonaise").ids == [4]
+    assert index.search("mazurka").total == 0
+    assert len(index._ids) == len(DOCS)
+    assert "mazurka" not in index._vocabulary
+
+
+def test_catalog_reindexes_updated_pieces_and_reloads_unknown_updates():
+    catalog = CatalogIndex()
+    catalog.rebuild(DOCS)
+
+    catalog.on_write("update", {"_id": 4, "title": "Ballade", "composer": "Chopin"})
+    assert catalog.search.search("ballade").ids == [4]
+    assert catalog.search.search("nocturne").ids == [5]
+
+    # An update whose documents are unknown: rebuilt on the next lookup.
+    catalog.on_write("update", {})
+    assert not catalog.ready
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from src.utils.notes_codec import (
+    NotesEncodingError,
+    decode_notes,
+    encode_notes,
+    try_encode_notes,
+)
+
+EVENTS = [
+    {"time": "0:0:0", "note": "C4", "duration": "4n", "velocity": 0.8},
+    {"time": "0:1:2", "note": "G#4", "duration": "8n.", "velocity": 0.65},
+    {"time": "1:0:0", "note": "A3", "duration": "8t"},
+    {"time": "1:2:1.5", "note": "C-1", "velocity": 1.0},
+]
+
+
+def test_round_trip_preserves_canonical_events():
+    packed = encode_notes(EVENTS)
+
+    assert decode_notes(packed) == EVENTS
+    assert len(packed) < len(json.dumps(EVENTS)) / 3
+
+
+def test_equivalent_spellings_decode_to_canonical_form():
+    events = [{"time": "2:1", "note": ["Db4", "F4"], "duration": "96i", "velocity": 0.5}]
+
+    assert decode_notes(encode_notes(events, exact=False)) == [
+        {"time": "2:1:0", "note": "C#4", "duration": "8n", "velocity": 0.5},
+        {"time": "2:1:0", "note": "F4", "duration": "8n", "velocity": 0.5},
+    ]
+
+
+@pytest.mark.parametrize(
+    "event",
+    [
+        {"time": 0.5, "note": "C4"},
+        {"time": "0:0:0.1", "note": "C4"},
+        {"time": "0:0:0", "note": "H4"},
+        {"time": "0:0:0", "note": "C4", "duration": "0.5"},
+        {"time": "0:0:0", "note": "C4", "velocity": 2},
+        {"time": "0:0:0", "note": "C4", "instrument": "piano"},
+    ],
+)
+def test_unrepresentable_events_are_rejected(event):
+    with pytest.raises(NotesEncodingError):
+        encode_notes([event])
+
+
+@pytest.mark.parametrize(
+    "event",
+    [
+        {"time": "0:0:0", "note": "C4", "velocity": 0.853},
+        {"time": "0:0:0", "note": ["C4", "E4"]},
+        {"time": "0:0:0", "note": "Db4"},
+        {"time": "0:1", "note": "C4"},
+        {"time": "0:0:0", "note": "C4", "duration": "96i"},
+        {"time": "0:0:0", "note": "C4", "duration": None},
+        {"note": "C4"},
+    ],
+)
+def test_exact_encoding_rejects_events_that_would_decode_differently(event):
+    with pytest.raises(NotesEncodingError):
+        encode_notes([event])
+    assert try_encode_notes([event]) is None
+    assert decode_notes(encode_notes([event], exact=False))
+
+
+def test_decode_rejects_foreign_or_truncated_payloads():
+    packed = encode_notes(EVENTS)
+
+    with pytest.raises(NotesEncodingError):
+        decode_notes(packed[:-1])
+    with pytest.raises(NotesEncodingError):
+        decode_notes(b"XX" + packed[2:])
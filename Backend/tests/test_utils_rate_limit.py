@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from src.utils.rate_limit import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_bucket_spaces_requests_to_the_budget():
+    clock = FakeClock()
+    bucket = TokenBucket.per_minute(6, clock=clock, sleep=clock.sleep)
+
+    async def _run():
+        for _ in range(3):
+            await bucket.acquire()
+
+    asyncio.run(_run())
+    # First token is free, then one every 10 seconds.
+    assert clock.sleeps == pytest.approx([10.0, 10.0])
+    assert clock.now == pytest.approx(20.0)
+
+
+def test_bucket_allows_a_burst_up_to_capacity():
+    clock = FakeClock()
+    bucket = TokenBucket(1.0, capacity=3, clock=clock, sleep=clock.sleep)
+
+    async def _run():
+        for _ in range(4):
+            await bucket.acquire()
+
+    asyncio.run(_run())
+    assert clock.sleeps == pytest.approx([1.0])
+
+
+def test_bucket_rejects_non_positive_rates():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from src.utils.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_task():
+    flights = SingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def _run():
+        return await asyncio.gather(*(flights.run("k", load) for _ in range(5)))
+
+    assert asyncio.run(_run()) == ["value"] * 5
+    assert len(calls) == 1
+    assert "k" not in flights
+
+
+def test_errors_reach_every_caller_and_are_not_cached():
+    flights = SingleFlight()
+    calls = []
+
+    async def boom():
+        calls.append(1)
+        await asyncio.sleep(0)
+        raise ValueError("nope")
+
+    async def _run():
+        return await asyncio.gather(
+            flights.run("k", boom), flights.run("k", boom), return_exceptions=True
+        )
+
+    results = asyncio.run(_run())
+    assert all(isinstance(result, ValueError) for result in results)
+    with pytest.raises(ValueError):
+        asyncio.run(flights.run("k", boom))
+    assert len(calls) == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_task():
+    flights = SingleFlight()
+
+    async def load():
+        await asyncio.sleep(0.02)
+        return 42
+
+    async def _run():
+        first = asyncio.ensure_future(flights.run("k", load))
+        second = asyncio.ensure_future(flights.run("k", load))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(_run()) == 42